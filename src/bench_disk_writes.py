@@ -0,0 +1,134 @@
+"""
+Benchmark: network throughput while the disk stalls
+
+Downloads segments from a local aiohttp server with several requests in
+flight and writes every chunk to a sink whose writes occasionally stall
+(simulated disk latency spikes). Compares writing on the event loop (the old
+`f.write` after each `read`) with `core.file_writer.BackgroundFileWriter`.
+Reports wall time, network throughput and the longest event loop stall.
+
+Usage:
+    python bench_disk_writes.py [--segments 64] [--segment-kb 1024]
+        [--concurrency 8] [--spike-ms 200] [--spike-every-mb 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.file_writer import BackgroundFileWriter
+
+
+class StallingSink:
+    """File-like sink that blocks for `spike` seconds every `every` bytes"""
+
+    def __init__(self, spike: float, every: int):
+        self.spike = spike
+        self.every = every
+        self.written = 0
+        self._next_spike = every
+
+    def write(self, data) -> int:
+        self.written += len(data)
+        while self.written >= self._next_spike:
+            time.sleep(self.spike)
+            self._next_spike += self.every
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def make_app(segment: bytes) -> web.Application:
+    """Server sending each segment in 64 KiB writes, like a CDN edge"""
+    async def handler(request):
+        response = web.StreamResponse()
+        response.content_length = len(segment)
+        await response.prepare(request)
+        view = memoryview(segment)
+        for offset in range(0, len(segment), 65536):
+            await response.write(view[offset:offset + 65536])
+        return response
+
+    app = web.Application()
+    app.router.add_get('/{name}', handler)
+    return app
+
+
+async def run(mode: str, args, segment: bytes):
+    """Download every segment once; return (seconds, max loop stall)"""
+    sink = StallingSink(args.spike_ms / 1000, args.spike_every_mb * 1024 * 1024)
+    writer = BackgroundFileWriter(sink) if mode == "background" else None
+    lock = asyncio.Lock()  # one output: segments are appended one at a time
+    stalls = []
+
+    async def ticker():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.monotonic()
+            stalls.append(now - last)
+            last = now
+
+    async with TestServer(make_app(segment)) as server:
+        async with aiohttp.ClientSession() as session:
+            pending = iter(range(args.segments))
+
+            async def worker():
+                for index in pending:
+                    async with session.get(server.make_url(f'/seg{index}.m4v')) as response:
+                        data = bytearray()
+                        while True:
+                            chunk = await response.content.read(8192)
+                            if not chunk:
+                                break
+                            data.extend(chunk)
+                    async with lock:
+                        if writer:
+                            await writer.write(data)
+                        else:
+                            sink.write(data)
+
+            tick = asyncio.create_task(ticker())
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            network = time.perf_counter() - started
+            if writer:
+                await writer.close()
+            total = time.perf_counter() - started
+            tick.cancel()
+
+    assert sink.written == len(segment) * args.segments
+    return network, total, max(stalls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=64)
+    parser.add_argument('--segment-kb', type=int, default=1024)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--spike-ms', type=float, default=200)
+    parser.add_argument('--spike-every-mb', type=int, default=8)
+    args = parser.parse_args()
+
+    segment = os.urandom(args.segment_kb * 1024)
+    size_mb = len(segment) * args.segments / 1e6
+    print(f"{args.segments} x {args.segment_kb} KiB segments, {args.concurrency} in flight, "
+          f"{args.spike_ms:.0f} ms disk stall every {args.spike_every_mb} MiB")
+
+    print(f"\n{'writes':<12} {'network':>10} {'net MB/s':>10} {'total':>10} {'max stall':>10}")
+    for mode in ("event-loop", "background"):
+        network, total, stall = asyncio.run(run(mode, args, segment))
+        print(f"{mode:<12} {network:8.2f} s {size_mb / network:10.1f} {total:8.2f} s {stall * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: parsing large media playlists and time-range lookups
+
+Compares the old list-of-dicts parser plus a linear range walk with
+`core.playlist.parse_media_playlist` (column arrays + bisect) on a synthetic
+playlist. Reports best-of-N parse time, peak allocation while parsing and
+the retained size of the parsed playlist.
+
+Usage:
+    python bench_playlist.py [--segments 50000] [--repeat 5] [--lookups 1000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.playlist import parse_media_playlist
+
+
+def make_playlist(segments: int) -> str:
+    """Create a synthetic fMP4 playlist with signed segment URLs"""
+    rng = random.Random(0)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        "#EXT-X-TARGETDURATION:4",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        '#EXT-X-MAP:URI="init.m4v?token=abcdef0123456789"',
+        "#EXT-X-PROGRAM-DATE-TIME:2024-01-01T00:00:00.000Z",
+    ]
+    for idx in range(segments):
+        if idx and idx % 5000 == 0:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines.append(f"#EXTINF:{rng.choice(('4.000000', '3.966667', '2.002000'))},")
+        lines.append(f"segment_{idx:06d}.m4v?token=abcdef0123456789&exp=1700000000")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def legacy_parse(content: str):
+    """Previous implementation: one dict per segment"""
+    init_segment = None
+    media_segments = []
+    current_duration = 0.0
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if line.startswith('#EXT-X-MAP:'):
+            uri_match = re.search(r'URI="([^"]+)"', line)
+            if uri_match:
+                init_segment = uri_match.group(1)
+        elif line.startswith('#EXTINF:'):
+            try:
+                current_duration = float(line.split(':')[1].split(',')[0])
+            except:
+                current_duration = 0.0
+        elif line and not line.startswith('#'):
+            media_segments.append({'url': line, 'duration': current_duration})
+            current_duration = 0.0
+    return {'init_segment': init_segment, 'media_segments': media_segments}
+
+
+def legacy_range(manifest, start_time: float, end_time: float):
+    """Previous implementation: walk every segment"""
+    positions = []
+    current_time = 0.0
+    for position, seg in enumerate(manifest['media_segments']):
+        duration = seg.get('duration', 0)
+        if current_time + duration > start_time and current_time < end_time:
+            positions.append(position)
+        current_time += duration
+    return positions
+
+
+def best_time(func, repeat: int) -> float:
+    """Best wall time of `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_memory(func):
+    """(peak bytes while running, bytes still held by the result)"""
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    content = make_playlist(args.segments)
+    print(f"Playlist: {args.segments} segments, {len(content) / 1e6:.1f} MB")
+
+    print(f"\n{'parse':<10} {'best':>10} {'peak':>12} {'retained':>12}")
+    for name, func in (("legacy", legacy_parse), ("playlist", parse_media_playlist)):
+        elapsed = best_time(lambda: func(content), args.repeat)
+        peak, retained = measure_memory(lambda: func(content))
+        print(f"{name:<10} {elapsed * 1000:8.1f} ms {peak / 1e6:9.1f} MB {retained / 1e6:9.1f} MB")
+
+    manifest = legacy_parse(content)
+    playlist = parse_media_playlist(content)
+    rng = random.Random(1)
+    ranges = []
+    for _ in range(args.lookups):
+        start = rng.uniform(0, playlist.total_duration)
+        ranges.append((start, start + rng.uniform(10, 600)))
+    assert all(legacy_range(manifest, *r) == list(playlist.range_indices(*r)) for r in ranges[:20])
+
+    print(f"\n{'lookup':<10} {'per range':>12}")
+    elapsed = best_time(lambda: [legacy_range(manifest, *r) for r in ranges], 1)
+    print(f"{'linear':<10} {elapsed / len(ranges) * 1e6:9.1f} us")
+    elapsed = best_time(lambda: [playlist.range_indices(*r) for r in ranges], args.repeat)
+    print(f"{'bisect':<10} {elapsed / len(ranges) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
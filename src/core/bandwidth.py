@@ -0,0 +1,145 @@
+"""
+Bandwidth Limiter
+Process-wide token-bucket rate limiting shared by all downloads
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket measured in bytes
+
+    Consumers reserve the bytes they just received and sleep for the returned
+    delay. Tokens may go negative (debt), so concurrent consumers queue up
+    behind each other and the long-run rate stays at `rate` regardless of how
+    many threads or tasks share the bucket. Idle time accumulates at most
+    `burst` bytes of credit.
+    """
+
+    # Minimum burst, so one read chunk never has to wait for a partial refill
+    MIN_BURST = 64 * 1024
+
+    def __init__(self, rate: float = 0):
+        """
+        Args:
+            rate: Bytes per second (0 = unlimited)
+        """
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.rate = 0.0
+        self.burst = 0.0
+        self.set_rate(rate)
+
+    def set_rate(self, rate: float):
+        """Change the rate; takes effect for the next reservation"""
+        with self._lock:
+            self._refill()
+            self.rate = max(float(rate or 0), 0.0)
+            # Roughly 100 ms of credit
+            self.burst = max(self.rate * 0.1, self.MIN_BURST)
+            self._tokens = min(self._tokens, self.burst)
+
+    def reserve(self, size: int) -> float:
+        """
+        Take `size` bytes from the bucket
+
+        Returns:
+            Seconds the caller should wait before consuming more
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill()
+            self._tokens -= size
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def _refill(self):
+        """Add tokens for the time elapsed since the last update"""
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class JobBucket(TokenBucket):
+    """Per-job bucket that follows the limiter's default unless given its own cap"""
+
+    def __init__(self, rate: Optional[float], default_rate: float):
+        self.follows_default = rate is None
+        super().__init__(default_rate if rate is None else rate)
+
+
+class BandwidthLimiter:
+    """Total bandwidth cap for the process plus optional per-job caps
+
+    The manual segment path throttles per received chunk with `throttle`;
+    the yt-dlp path reserves with `delay` for each progress hook call and
+    pauses its worker process for that long (blocking threads can use
+    `throttle_sync`). All draw from the same total bucket, so the cap holds across every
+    active download, and rates can be changed while jobs are running.
+    """
+
+    def __init__(self, total_rate: float = 0, per_job_rate: float = 0):
+        """
+        Args:
+            total_rate: Bytes per second across all downloads (0 = unlimited)
+            per_job_rate: Default bytes per second per job (0 = unlimited)
+        """
+        self.total = TokenBucket(total_rate)
+        self.per_job_rate = per_job_rate
+        self._jobs = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def configure(self, total_rate: float, per_job_rate: float):
+        """Apply new caps to the total and to every job without its own cap"""
+        self.total.set_rate(total_rate)
+        with self._lock:
+            self.per_job_rate = per_job_rate
+            jobs = list(self._jobs)
+        for job in jobs:
+            if job.follows_default:
+                job.set_rate(per_job_rate)
+
+    def create_job_bucket(self, rate: Optional[float] = None) -> JobBucket:
+        """
+        Create the bucket of one job
+
+        Args:
+            rate: Cap for this job in bytes per second; None follows the
+                limiter's per-job default (0 = unlimited)
+        """
+        job = JobBucket(rate, self.per_job_rate)
+        with self._lock:
+            self._jobs.add(job)
+        return job
+
+    def delay(self, size: int, job: Optional[TokenBucket] = None) -> float:
+        """Reserve `size` bytes and return how long to wait"""
+        wait = self.total.reserve(size)
+        if job is not None:
+            wait = max(wait, job.reserve(size))
+        return wait
+
+    async def throttle(self, size: int, job: Optional[TokenBucket] = None):
+        """Account for `size` received bytes, sleeping if over the cap"""
+        wait = self.delay(size, job)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttle_sync(self, size: int, job: Optional[TokenBucket] = None):
+        """Blocking variant of `throttle` for worker threads"""
+        wait = self.delay(size, job)
+        if wait > 0:
+            time.sleep(wait)
+
+
+_bandwidth_limiter = BandwidthLimiter()
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter:
+    """Return the process-wide bandwidth limiter"""
+    return _bandwidth_limiter
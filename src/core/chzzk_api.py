@@ -2,11 +2,12 @@
 Chzzk API Client
 Handles fetching metadata from Chzzk API
 """
-import aiohttp
 import re
 import json
 from typing import Dict, Optional, List
 
+from core.http_client import get_http_client
+
 class ChzzkAPI:
     """Client for Chzzk API"""
     
@@ -54,7 +55,7 @@ class ChzzkAPI:
         
         url = f"{self.BASE_URL}/service/v3/videos/{video_id}"
         
-        async with aiohttp.ClientSession() as session:
+        async with get_http_client().bind(self.headers) as session:
             async with session.get(url, headers=headers) as response:
                 if response.status != 200:
                     raise Exception(f"Failed to fetch metadata: HTTP {response.status}")
@@ -103,7 +104,7 @@ class ChzzkAPI:
         
         url = f"{self.BASE_URL}/service/v1/clips/{clip_id}"
         
-        async with aiohttp.ClientSession() as session:
+        async with get_http_client().bind(self.headers) as session:
             async with session.get(url, headers=headers) as response:
                 if response.status != 200:
                     raise Exception(f"Failed to fetch metadata: HTTP {response.status}")
@@ -205,6 +206,10 @@ class ChzzkAPI:
         """
         Extract m3u8 URL for a specific quality from liveRewindPlaybackJson
         
+        The URL is guessed from Chzzk's path layout. Downloads use
+        `get_master_playlist_url` instead and pick the variant from the
+        master playlist's attributes.
+        
         Args:
             video_data: Video metadata dict (from fetch_vod_metadata)
             quality: Quality to extract (e.g., '1080p', '720p')
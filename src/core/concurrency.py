@@ -0,0 +1,208 @@
+"""
+Concurrency Limiters
+Control how many segment requests are in flight at once
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Optional
+
+from core.retry import HttpStatusError
+
+
+class ConcurrencyLimiter:
+    """Fixed in-flight limit whose value can be changed while in use"""
+
+    def __init__(self, limit: int, on_limit_change: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            limit: Maximum number of concurrent holders
+            on_limit_change: Called with the new limit whenever it changes
+        """
+        self.limit = max(1, int(limit))
+        self.in_flight = 0
+        self.on_limit_change = on_limit_change
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._notify_limit()
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting or overtaking waiters"""
+        if self.in_flight >= self.limit or self._waiters:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        """Give a slot back"""
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def set_limit(self, limit: int):
+        """Change the limit; extra holders finish, new waiters start at once"""
+        limit = max(1, int(limit))
+        if limit == self.limit:
+            return
+        self.limit = limit
+        self._notify_limit()
+        self._wake_waiters()
+
+    def record_success(self, size: int, latency: float):
+        """Report a completed request (used by adaptive subclasses)"""
+
+    def record_error(self, error: BaseException):
+        """Report a failed request attempt (used by adaptive subclasses)"""
+
+    def _notify_limit(self):
+        """Tell the listener about the current limit"""
+        if self.on_limit_change:
+            self.on_limit_change(self.limit)
+
+    def _wake_waiters(self):
+        """Wake as many waiters as there are free slots"""
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """AIMD controller for the number of in-flight segment requests
+
+    Completed requests are grouped into measurement windows of roughly one
+    request per slot. At the end of each window:
+
+    - if latency rose well above the best latency seen, the limit shrinks
+      (multiplicative decrease) because the link or CDN is saturated;
+    - if throughput improved over the previous window, the limit grows by
+      one (additive increase);
+    - otherwise the limit holds, probing one step higher after a few flat
+      windows in case conditions changed.
+
+    Throttling responses (429/503), other server errors and connection
+    failures shrink the limit immediately, at most once per window.
+    """
+
+    THROTTLE_STATUSES = {429, 503}
+
+    def __init__(
+        self,
+        initial: int = 2,
+        max_limit: int = 16,
+        min_limit: int = 1,
+        gain_threshold: float = 0.05,
+        latency_tolerance: float = 2.0,
+        on_limit_change: Optional[Callable[[int], None]] = None
+    ):
+        """
+        Args:
+            initial: Starting limit
+            max_limit: Upper bound for the limit
+            min_limit: Lower bound for the limit
+            gain_threshold: Relative throughput gain that justifies growing
+            latency_tolerance: Latency factor over the baseline that counts
+                as congestion
+            on_limit_change: Called with the new limit whenever it changes
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.gain_threshold = gain_threshold
+        self.latency_tolerance = latency_tolerance
+        super().__init__(
+            min(max(initial, self.min_limit), self.max_limit),
+            on_limit_change
+        )
+
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_count = 0
+        self._decreased_in_window = False
+        self._last_throughput: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+        self._flat_windows = 0
+
+    def set_limit(self, limit: int):
+        super().set_limit(min(max(limit, self.min_limit), self.max_limit))
+
+    def record_success(self, size: int, latency: float):
+        self._window_bytes += size
+        self._window_latency += latency
+        self._window_count += 1
+
+        if self._window_count >= max(self.limit, 4):
+            self._end_window()
+
+    def record_error(self, error: BaseException):
+        if self._decreased_in_window:
+            return
+        if isinstance(error, HttpStatusError) and error.status in self.THROTTLE_STATUSES:
+            factor = 0.5
+        else:
+            factor = 0.75
+        self._decrease(factor)
+
+    def _end_window(self):
+        """Evaluate the finished window and adjust the limit"""
+        elapsed = max(time.monotonic() - self._window_start, 1e-6)
+        throughput = self._window_bytes / elapsed
+        latency = self._window_latency / self._window_count
+
+        if self._latency_baseline is None:
+            self._latency_baseline = latency
+        else:
+            # Let the baseline drift up slowly so a globally slower CDN is tolerated
+            self._latency_baseline = min(latency, self._latency_baseline * 1.02)
+
+        if self._decreased_in_window:
+            pass
+        elif latency > self._latency_baseline * self.latency_tolerance and self.limit > self.min_limit:
+            self._decrease(0.8)
+        elif self._last_throughput is None or throughput > self._last_throughput * (1 + self.gain_threshold):
+            self._flat_windows = 0
+            self.set_limit(self.limit + 1)
+        else:
+            self._flat_windows += 1
+            if self._flat_windows >= 3:
+                self._flat_windows = 0
+                self.set_limit(self.limit + 1)
+
+        self._last_throughput = throughput
+        self._reset_window()
+
+    def _decrease(self, factor: float):
+        """Multiplicative decrease"""
+        self.set_limit(int(self.limit * factor))
+        self._decreased_in_window = True
+        self._flat_windows = 0
+
+    def _reset_window(self):
+        """Start a new measurement window"""
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_count = 0
+        self._decreased_in_window = False
@@ -6,6 +6,8 @@ import os
 from pathlib import Path
 from typing import Dict, Any
 
+from core.segment_downloader import SegmentDownloader
+
 class Config:
     """Application configuration manager"""
     
@@ -17,6 +19,14 @@ class Config:
         },
         "default_quality": "1080p",
         "concurrent_downloads": 3,
+        "segment_concurrency": SegmentDownloader.DEFAULT_CONCURRENCY,
+        "adaptive_concurrency": True,
+        "hedged_requests": True,  # duplicate unusually slow segment requests
+        "follow_live_playlists": True,  # keep polling growing (live rewind) playlists
+        "bandwidth_limit": 0,  # bytes/s across all downloads, 0 = unlimited
+        "bandwidth_limit_per_job": 0,  # bytes/s per download, 0 = unlimited
+        "segment_retries": 5,
+        "segment_cache_size": 0,  # bytes of cached segments, 0 = disabled
         "theme": "dark"
     }
     
@@ -66,6 +76,19 @@ class Config:
         path.mkdir(parents=True, exist_ok=True)
         return path
     
+    def get_segment_cache_dir(self) -> Path:
+        """Get the directory of the shared segment cache"""
+        return self.config_dir / "segment_cache"
+    
+    def get_engine_choices_path(self) -> Path:
+        """Get the file of the remembered download engine choices"""
+        return self.config_dir / "engine_choices.json"
+    
+    def get_job_store_path(self) -> Path:
+        """Get the database of unfinished downloads"""
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        return self.config_dir / "jobs.db"
+    
     def get_cookies(self) -> str:
         """Get cookies in Netscape format for yt-dlp"""
         cookies = self.config.get("cookies", {})
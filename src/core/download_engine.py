@@ -0,0 +1,86 @@
+"""
+Download Engine
+One asyncio event loop, on a background thread, running every async download
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+
+class DownloadEngine:
+    """Runs download coroutines as tasks of one long-lived event loop
+
+    Every manual and direct download is a task here instead of a thread
+    with an event loop of its own, so the number of threads stays constant
+    however many jobs are queued, and all jobs share the loop's HTTP
+    session (`core.http_client`) with its connection pool and DNS cache.
+    Jobs report progress by emitting Qt signals from the loop thread, which
+    Qt delivers to the UI thread.
+
+    The loop and its thread are started by the first `submit`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The engine's event loop, started on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop,), name="download-engine", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Run `coro` as a task of the engine loop
+
+        Returns:
+            Future of the coroutine's result; cancelling it cancels the task
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def shutdown(self, timeout: Optional[float] = 10):
+        """Cancel running jobs, close the shared HTTP session and stop the loop"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+
+        async def stop():
+            from core.http_client import get_http_client
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await get_http_client().close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+
+_download_engine = DownloadEngine()
+
+
+def get_download_engine() -> DownloadEngine:
+    """Return the process-wide download engine"""
+    return _download_engine
@@ -0,0 +1,177 @@
+"""
+Download Statistics
+Counters collected while a manual download runs
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class DownloadStats:
+    """Per-job statistics of the segment pipeline"""
+
+    # Seconds between receive-rate samples, and the EWMA weight of a new sample
+    RATE_INTERVAL = 0.5
+    RATE_ALPHA = 0.3
+
+    def __init__(self):
+        self.retries = 0
+        self.retry_wait = 0.0  # seconds spent sleeping before retries
+        self.concurrency = 0  # current in-flight request limit
+        self.concurrency_history: List[Tuple[float, int]] = []  # (seconds, limit)
+        self.url_refreshes = 0  # times expired playlist signatures were renewed
+
+        # Throughput: bytes off the wire and a smoothed receive rate
+        self.bytes_received = 0
+        self.rate = 0.0  # bytes/s (EWMA)
+        self._sample_start = time.monotonic()
+        self._sample_bytes = 0
+
+        # Media accounting for ETA: completed segment bytes vs. media seconds
+        self.media_total = 0.0  # seconds of media in the job
+        self.media_done = 0.0  # seconds of media in completed segments
+        self.segment_bytes = 0  # bytes of completed segments
+        self.resumed_bytes = 0  # bytes taken over from an earlier attempt
+        self._started = time.monotonic()
+
+        # Segment cache lookups (only counted while the cache is enabled)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_bytes = 0  # bytes copied from the cache instead of fetched
+
+        # Segments taken from another job's request in flight (overlapping downloads)
+        self.shared_fetches = 0
+        self.shared_bytes = 0
+
+        # Hedged requests: duplicates issued for slow segments, and how many finished first
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        # Connections of the shared HTTP client: opened for this job vs. kept alive
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def record_retry(self, error: BaseException, delay: float):
+        """Count one retry and the backoff delay before it"""
+        self.retries += 1
+        self.retry_wait += delay
+
+    def record_concurrency(self, limit: int):
+        """Track a change of the in-flight request limit"""
+        self.concurrency = limit
+        self.concurrency_history.append((round(time.monotonic() - self._started, 2), limit))
+
+    def record_bytes(self, size: int):
+        """Count bytes as they arrive and update the smoothed receive rate"""
+        self.bytes_received += size
+        self._sample_bytes += size
+
+        now = time.monotonic()
+        elapsed = now - self._sample_start
+        if elapsed >= self.RATE_INTERVAL:
+            sample = self._sample_bytes / elapsed
+            if self.rate:
+                self.rate = self.RATE_ALPHA * sample + (1 - self.RATE_ALPHA) * self.rate
+            else:
+                self.rate = sample
+            self._sample_start = now
+            self._sample_bytes = 0
+
+    def start_media(self, total_duration: float, done_bytes: int = 0, done_duration: float = 0.0):
+        """
+        Set the job's media duration, including segments resumed from disk
+
+        Args:
+            total_duration: Seconds of media the job covers
+            done_bytes: Bytes already in the output (resumed jobs)
+            done_duration: Seconds of media those bytes hold
+        """
+        self.media_total = total_duration
+        self.resumed_bytes = done_bytes
+        self.segment_bytes = done_bytes
+        self.media_done = done_duration
+
+    def record_connection(self, reused: bool):
+        """Count whether a request got a kept-alive connection"""
+        if reused:
+            self.connections_reused += 1
+        else:
+            self.connections_created += 1
+
+    def add_media(self, duration: float):
+        """Grow the job's media duration (segments appended to a followed playlist)"""
+        self.media_total += duration
+
+    def record_cache_hit(self, size: int):
+        """Count a segment served from the segment cache"""
+        self.cache_hits += 1
+        self.cache_bytes += size
+
+    def record_cache_miss(self):
+        """Count a segment that had to be fetched despite the cache"""
+        self.cache_misses += 1
+
+    def record_shared_fetch(self, size: int):
+        """Count a segment delivered by another job's request"""
+        self.shared_fetches += 1
+        self.shared_bytes += size
+
+    def record_hedge(self):
+        """Count a duplicate request issued for a slow segment"""
+        self.hedges += 1
+
+    def record_hedge_win(self):
+        """Count a duplicate request that finished before the original"""
+        self.hedge_wins += 1
+
+    def cache_hit_rate(self) -> Optional[float]:
+        """Fraction of cache lookups that hit (None before the first lookup)"""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def record_segment(self, size: int, duration: float):
+        """Account for a completed segment of `duration` media seconds"""
+        self.segment_bytes += size
+        self.media_done += duration
+
+    def bytes_per_media_second(self) -> Optional[float]:
+        """Observed bitrate of the media in bytes per second of playback"""
+        if self.media_done <= 0:
+            return None
+        return self.segment_bytes / self.media_done
+
+    def progress(self) -> Optional[float]:
+        """Fraction of the job's estimated bytes received (0-1), if known"""
+        bitrate = self.bytes_per_media_second()
+        if not bitrate or self.media_total <= 0:
+            return None
+        expected = bitrate * self.media_total
+        return min(1.0, (self.resumed_bytes + self.cache_bytes + self.shared_bytes + self.bytes_received) / expected)
+
+    def eta(self) -> Optional[float]:
+        """Seconds left: remaining media duration x observed bytes/s of media / rate"""
+        bitrate = self.bytes_per_media_second()
+        if not bitrate or not self.rate:
+            return None
+        remaining = max(self.media_total - self.media_done, 0.0)
+        return remaining * bitrate / self.rate
+
+    def as_dict(self) -> Dict:
+        """Return the statistics as a plain dictionary"""
+        return {
+            'retries': self.retries,
+            'retry_wait': round(self.retry_wait, 2),
+            'concurrency': self.concurrency,
+            'concurrency_history': list(self.concurrency_history),
+            'url_refreshes': self.url_refreshes,
+            'bytes_received': self.bytes_received,
+            'rate': round(self.rate, 1),
+            'eta': self.eta(),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hit_rate(),
+            'shared_fetches': self.shared_fetches,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+        }
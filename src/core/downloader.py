@@ -2,23 +2,55 @@
 Download Manager with automatic method selection
 """
 import os
+import time
 import uuid
-import tempfile
 import asyncio
+import tempfile
+import threading
+from functools import partial
 from pathlib import Path
-from typing import Dict, Optional
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
-import yt_dlp
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
 
+from core.bandwidth import get_bandwidth_limiter
+from core.hedging import HedgePolicy
+from core.download_engine import get_download_engine
+from core.engine_selector import MANUAL, YTDLP, EngineSelector, get_engine_selector
+from core.job_scheduler import FINISHED, PAUSED, QUEUED, RUNNING, JobScheduler
+from core.job_store import FAILED, JobStore
+from core.progress_aggregator import ProgressAggregator, Status
+from core.range_downloader import RangeDownloader
+from core.retry import RetryPolicy
+from core.segment_cache import SegmentCache
 from core.segment_downloader import SegmentDownloader
+from core.shared_fetches import SharedFetches
+from core.ytdlp_process import get_ytdlp_pool
 
-class DownloadWorker(QThread):
-    """Worker thread for downloading videos"""
+class DownloadWorker(QObject):
+    """A video download job
+    
+    Manual and direct downloads run as tasks of the shared download engine
+    loop; `stop` cancels the task right away instead of waiting for the job
+    to poll `should_stop`. yt-dlp downloads run in a worker process of
+    `core.ytdlp_process`, waited on by a thread that relays their progress.
+    Either way the job reports through its signals, which Qt delivers to the
+    UI thread, and emits `finished` once it has stopped running.
+    """
     
     progress_updated = pyqtSignal(int, float, int)  # progress%, speed, eta
     status_changed = pyqtSignal(str)  # status message
     download_completed = pyqtSignal(str)  # output_path
     download_error = pyqtSignal(str)  # error_message
+    finished = pyqtSignal()  # the job stopped running (done, failed or stopped)
+    
+    # Seconds of media the engine probe downloads with the manual path
+    PROBE_SECONDS = 30
+    
+    # Bytes yt-dlp fetches in its probe if the manual probe failed
+    PROBE_BYTES = 8 * 1024 * 1024
+    
+    # Seconds the yt-dlp probe may take at most
+    PROBE_TIMEOUT = 60
     
     def __init__(
         self, 
@@ -29,7 +61,16 @@ class DownloadWorker(QThread):
         video_id: Optional[str] = None,
         quality: Optional[str] = None,
         start_time: Optional[float] = None,
-        end_time: Optional[float] = None
+        end_time: Optional[float] = None,
+        concurrency: int = SegmentDownloader.DEFAULT_CONCURRENCY,
+        retries: int = 5,
+        adaptive_concurrency: bool = True,
+        rate_limit: Optional[float] = None,
+        hedged_requests: bool = True,
+        follow_live: bool = False,
+        direct_download: bool = False,
+        engine_key: Optional[str] = None,
+        progress: Optional[ProgressAggregator] = None
     ):
         super().__init__()
         self.url = url
@@ -40,177 +81,582 @@ class DownloadWorker(QThread):
         self.quality = quality
         self.start_time = start_time
         self.end_time = end_time
+        self.concurrency = concurrency
+        self.retries = retries
+        self.adaptive_concurrency = adaptive_concurrency
+        self.hedged_requests = hedged_requests
+        self.follow_live = follow_live
+        self.direct_download = direct_download
+        # Engine selector key: measure both engines on the first run unless
+        # the selector already knows the faster one (None: use_manual_download)
+        self.engine_key = engine_key
+        # Coalesces progress and status reports (None: emit every one)
+        self.progress = progress
+        self.rate_limit = rate_limit
+        self.bandwidth = get_bandwidth_limiter()
+        self.job_bucket = self.bandwidth.create_job_bucket(rate_limit)
+        self._hook_bytes = {}  # filename -> downloaded_bytes seen by the last hook call
+        self.stats = None  # DownloadStats of the manual download
         self.should_stop = False
-        self.cookie_file = None
+        self.is_completed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # engine loop of the job
+        self._task: Optional[asyncio.Task] = None  # engine task of the running job
+        
+        # Time ranges sharing this worker's pipeline (multi-range manual downloads)
+        self.parts: List[DownloadPart] = []
+        self._parts_lock = threading.Lock()
+        self._starting: List[DownloadPart] = []  # started, not yet taken by a batch
+        # Engine loop only: running batch task and its held parts, per part
+        self._batches: Dict[DownloadPart, Tuple[asyncio.Task, set]] = {}
+        
+        # Set while the job is not running
+        self._done = threading.Event()
+        self._done.set()
     
-    def run(self):
-        """Run the download"""
+    def start(self):
+        """Start the download unless it is running"""
+        if self.isRunning():
+            return
+        self._done.clear()
+        if self.engine_key:
+            self._submit(self._run_selected())
+        elif self.use_manual_download or self.direct_download:
+            self._submit(self._run_async())
+        else:
+            threading.Thread(target=self._run_thread, name="yt-dlp-download", daemon=True).start()
+    
+    def isRunning(self) -> bool:
+        return not self._done.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has stopped running (False on timeout)"""
+        return self._done.wait(timeout)
+    
+    def _submit(self, coro):
+        """Run a job coroutine as a task of the engine loop"""
+        engine = get_download_engine()
+        self._loop = engine.loop
+        future = engine.submit(self._run_task(coro))
+        future.add_done_callback(lambda _: self._finish())
+    
+    async def _run_task(self, coro):
+        """Run a job coroutine, reporting its cancellation by `stop`"""
+        self._task = asyncio.current_task()
+        try:
+            if self.should_stop:
+                # Stopped before the task got to run
+                coro.close()
+                raise asyncio.CancelledError()
+            await coro
+        except asyncio.CancelledError:
+            if not self.is_completed:
+                self._report_error(self, "Download cancelled by user")
+        finally:
+            self._task = None
+    
+    def _cancel_task(self):
+        """Engine loop: cancel the running job's task"""
+        if self._task is not None:
+            self._task.cancel()
+    
+    async def _in_thread(self, fn, *args):
+        """
+        Run a blocking yt-dlp call in a thread
+        
+        A cancelled job sets `should_stop` and waits for the call to see it
+        and return, so no yt-dlp job outlives its task.
+        """
+        future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Also reached when the engine shuts down
+            self.should_stop = True
+            await asyncio.wait([future])
+            raise
+    
+    async def _run_async(self):
+        """Run a manual or direct download on the engine loop"""
         try:
             if self.use_manual_download:
-                self._run_manual_download()
+                await self._run_manual_download([self])
             else:
-                self._run_ytdlp_download()
+                await self._run_range_download()
         except Exception as e:
-            self.download_error.emit(str(e))
+            self._report_error(self, str(e))
     
-    def _run_manual_download(self):
-        """Run manual segment download"""
+    async def _run_selected(self):
+        """Pick the engine for `engine_key`, measuring both if needed, then download"""
         try:
-            self.status_changed.emit("수동 다운로드 시작 중...")
+            engine = get_engine_selector().lookup(self.engine_key)
+            if engine is None:
+                engine = await self._probe_engines()
+            # Later runs (resume) continue with the same engine and its partial output
+            self.engine_key = None
+            self.use_manual_download = engine == MANUAL
             
-            # Create event loop for async operations
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            if self.should_stop:
+                raise Exception("Download cancelled by user")
+            if self.use_manual_download:
+                await self._run_manual_download([self])
+            else:
+                await self._in_thread(self._run_ytdlp_download)
+        except Exception as e:
+            self._report_error(self, str(e))
+    
+    async def _probe_engines(self) -> str:
+        """
+        Download the first seconds with both engines and record the faster
+        
+        The engines run one after the other, so neither measures against the
+        other's traffic; yt-dlp stops once it has fetched as many bytes as
+        the manual probe. If both probes fail, the `use_manual_download`
+        default is used and nothing is recorded.
+        """
+        self._report_status(self, "다운로드 방식 측정 중...")
+        with tempfile.TemporaryDirectory(prefix="engine-probe-") as probe_dir:
+            manual_rate, manual_bytes = await self._probe_manual(os.path.join(probe_dir, "manual"))
+            if self.should_stop:
+                raise Exception("Download cancelled by user")
+            ytdlp_rate = await self._in_thread(
+                self._probe_ytdlp, os.path.join(probe_dir, "ytdlp"), manual_bytes or self.PROBE_BYTES
+            )
+        self._hook_bytes = {}
+        if self.should_stop:
+            # An interrupted probe measures nothing; the next run probes again
+            raise Exception("Download cancelled by user")
+        
+        rates = {MANUAL: manual_rate, YTDLP: ytdlp_rate}
+        engine = EngineSelector.choose(rates)
+        if engine is None:
+            return MANUAL if self.use_manual_download else YTDLP
+        get_engine_selector().record(self.engine_key, engine, rates)
+        return engine
+    
+    async def _probe_manual(self, output_path: str) -> Tuple[Optional[float], int]:
+        """Time the manual path on the first PROBE_SECONDS; returns (bytes/s or None, bytes)"""
+        from core.chzzk_api import ChzzkAPI
+        try:
+            started = time.monotonic()
+            m3u8_url = await self._fetch_master_url(ChzzkAPI())
+            downloader = SegmentDownloader(
+                concurrency=self.concurrency,
+                retry_policy=RetryPolicy(attempts=2),
+                adaptive=self.adaptive_concurrency,
+                bandwidth=self.bandwidth,
+                rate_limit=self.rate_limit,
+                # Cached or shared segments would flatter the manual path
+                cache=SegmentCache(),
+                shared_fetches=SharedFetches()
+            )
+            start = self.start_time or 0
+            end = start + self.PROBE_SECONDS
+            if self.end_time is not None:
+                end = min(end, self.end_time)
+            await downloader.download_video(
+                m3u8_url,
+                output_path,
+                headers=self._request_headers(),
+                cookies=self._cookies_dict(),
+                target_quality=self.quality,
+                start_time=start,
+                end_time=end,
+                resume=False
+            )
+        except Exception as e:
+            print(f"Manual engine probe failed: {e}")
+            return None, 0
+        received = downloader.stats.bytes_received
+        return received / max(time.monotonic() - started, 1e-3), received
+    
+    def _probe_ytdlp(self, output_path: str, target_bytes: int) -> Optional[float]:
+        """Time yt-dlp until it has fetched `target_bytes`; returns bytes/s or None"""
+        started = time.monotonic()
+        received = 0
+        elapsed = None
+        
+        def on_progress(d):
+            nonlocal received, elapsed
+            received = max(received, d.get('downloaded_bytes') or 0)
+            if elapsed is None and received >= target_bytes:
+                elapsed = time.monotonic() - started
+            return self._throttle_hook(d) if d['status'] == 'downloading' else 0
+        
+        def cancelled():
+            return (
+                self.should_stop or elapsed is not None
+                or time.monotonic() - started > self.PROBE_TIMEOUT
+            )
+        
+        job = {
+            'url': self.url,
+            'output_path': output_path,
+            'cookies': self.cookies,
+            'start_time': self.start_time,
+            'end_time': self.end_time
+        }
+        try:
+            get_ytdlp_pool().run(job, on_progress=on_progress, cancelled=cancelled)
+        except Exception as e:
+            # Stopping the probe early ends the job with an error
+            if not received:
+                print(f"yt-dlp engine probe failed: {e}")
+                return None
+        return received / max(elapsed or time.monotonic() - started, 1e-3)
+    
+    def _run_thread(self):
+        """Run a yt-dlp download"""
+        try:
+            self._run_ytdlp_download()
+        except Exception as e:
+            self._report_error(self, str(e))
+        finally:
+            self._finish()
+    
+    def _finish(self):
+        if self.progress:
+            # A resumed run starts from a clean slate
+            self.progress.discard(self)
+        self._done.set()
+        self.finished.emit()
+    
+    def add_part(self, start_time: Optional[float], end_time: Optional[float], output_path: str) -> 'DownloadPart':
+        """Add a time range to download with this worker's manual pipeline"""
+        part = DownloadPart(self, start_time, end_time, output_path)
+        self.parts.append(part)
+        return part
+    
+    def start_part(self, part: 'DownloadPart'):
+        """
+        Start a part right away
+        
+        Parts started together (e.g. by one scheduler pass) share a batch:
+        one metadata fetch, playlist fetch and segment pipeline. A part
+        started while other batches run gets a batch of its own instead of
+        waiting for them; segments it shares with them are still fetched
+        once, through the shared fetches and the segment cache.
+        """
+        with self._parts_lock:
+            if part.isRunning():
+                return
+            part.should_stop = False
+            part.idle.clear()
+            self._starting.append(part)
+            if len(self._starting) > 1:
+                # The batch about to start takes this part too
+                return
+        get_download_engine().submit(self._run_parts())
+    
+    def stop_part(self, part: 'DownloadPart'):
+        """Stop a part; its batch is cancelled once none of its parts is wanted"""
+        part.should_stop = True
+        if part.isRunning():
+            get_download_engine().loop.call_soon_threadsafe(self._cancel_stopped_batch, part)
+    
+    def _cancel_stopped_batch(self, part: 'DownloadPart'):
+        """Engine loop: cancel the batch holding `part` if all its parts are stopped"""
+        task, held = self._batches.get(part, (None, ()))
+        if task is not None and all(other.should_stop for other in held):
+            task.cancel()
+    
+    async def _run_parts(self):
+        """Download the parts started together through one shared pipeline"""
+        with self._parts_lock:
+            batch, self._starting = self._starting, []
+        
+        # Each part is let go as soon as its range is closed, freeing its slot
+        held = set(batch)
+        for part in batch:
+            self._batches[part] = (asyncio.current_task(), held)
+        for part in [part for part in batch if part.should_stop]:
+            batch.remove(part)
+            self._release_part(held, part)
+        try:
+            if batch:
+                await self._run_manual_download(batch, partial(self._release_part, held))
+        except asyncio.CancelledError:
+            # Every part still held was stopped (or the engine shut down)
+            for part in held:
+                if not part.is_completed:
+                    self._report_error(part, "Download cancelled by user")
+        finally:
+            for part in list(held):
+                self._release_part(held, part)
+    
+    def _release_part(self, held: set, part: 'DownloadPart'):
+        """Let go of a part of a batch (once): it may be started again"""
+        if part not in held:
+            return
+        held.discard(part)
+        self._batches.pop(part, None)
+        if self.progress:
+            self.progress.discard(part)
+        part.idle.set()
+        part.finished.emit()
+    
+    async def _run_manual_download(
+        self,
+        targets: List[Union['DownloadWorker', 'DownloadPart']],
+        target_done: Optional[Callable[[Union['DownloadWorker', 'DownloadPart']], None]] = None
+    ):
+        """
+        Run manual segment download
+        
+        Args:
+            targets: Objects with the worker's range attributes (start_time,
+                end_time, output_path, should_stop, is_completed, stats) and
+                signals; the worker itself for a single download, or its parts
+            target_done: Called with each target once its completion or
+                error is reported, while the other targets may still run
+        """
+        # Targets whose outcome was reported
+        done = set()
+        
+        def range_done(index, result):
+            if index in done:
+                return
+            done.add(index)
+            target = targets[index]
+            if isinstance(result, BaseException):
+                self._report_error(target, f"수동 다운로드 실패: {str(result)}")
+            else:
+                self._complete_target(target, result)
+            if target_done:
+                target_done(target)
+        
+        try:
+            for target in targets:
+                self._report_status(target, "수동 다운로드 시작 중...")
             
             # Fetch fresh m3u8 URL (signatures expire quickly)
             from core.chzzk_api import ChzzkAPI
             api = ChzzkAPI()
+            m3u8_url = await self._fetch_master_url(api)
             
-            try:
-                # Get fresh metadata with valid m3u8 URL
-                fresh_metadata = loop.run_until_complete(
-                    api.fetch_vod_metadata(self.video_id, self.cookies)
-                )
-                
-                # Extract Master Playlist URL first
-                m3u8_url = api.get_master_playlist_url(fresh_metadata)
-                
-                # Fallback to direct media URL if master not available
-                if not m3u8_url:
-                    m3u8_url = api.get_m3u8_url(fresh_metadata, self.quality)
-                
-                if not m3u8_url:
-                    raise Exception("Failed to extract m3u8 URL from metadata")
-                    
-            except Exception as e:
-                raise Exception(f"Failed to fetch fresh m3u8 URL: {str(e)}")
+            downloader = SegmentDownloader(
+                concurrency=self.concurrency,
+                retry_policy=RetryPolicy(attempts=self.retries + 1),
+                adaptive=self.adaptive_concurrency,
+                bandwidth=self.bandwidth,
+                rate_limit=self.rate_limit,
+                hedging=HedgePolicy() if self.hedged_requests else None
+            )
+            for target in targets:
+                target.stats = downloader.stats
             
-            downloader = SegmentDownloader()
+            # A live-rewind playlist is still growing; keep polling it for new
+            # segments (one range at a time; a batch of ranges uses a snapshot)
+            follow = self.follow_live and len(targets) == 1
             
-            def progress_callback(current, total):
-                if self.should_stop:
+            def progress_callback(index, current, total):
+                target = targets[index]
+                if target.should_stop:
                     raise Exception("Download cancelled by user")
                 
-                progress = int((current / total) * 100) if total > 0 else 0
-                self.progress_updated.emit(progress, 0, 0)
-                self.status_changed.emit(f"다운로드 중... ({current}/{total} 세그먼트)")
+                stats = downloader.stats
+                # Formatted when delivered, at the UI rate
+                self._report_status(target, partial(self._segment_status, stats, current, total, follow))
+                
+                # Byte-based progress and ETA once the media bitrate is known
+                # (the byte estimate covers the whole job, so only for one range)
+                fraction = stats.progress() if len(targets) == 1 else None
+                if fraction is None:
+                    fraction = current / total if total > 0 else 0
+                self._report_progress(target, int(fraction * 100), stats.rate, int(stats.eta() or 0))
             
-            # Parse cookies
-            cookies_dict = {}
-            if self.cookies:
-                for cookie in self.cookies.split(';'):
-                    if '=' in cookie:
-                        key, value = cookie.strip().split('=', 1)
-                        cookies_dict[key] = value
+            cookies_dict = self._cookies_dict()
+            headers = self._request_headers()
             
-            # Use same headers as yt-dlp
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Referer': 'https://chzzk.naver.com/',
-                'Origin': 'https://chzzk.naver.com'
-            }
+            async def refresh_m3u8_url():
+                # Signed playlist URLs expire during long downloads; re-sign them
+                metadata = await api.fetch_vod_metadata(self.video_id, self.cookies)
+                url = api.get_master_playlist_url(metadata)
+                if not url:
+                    raise Exception("Failed to extract m3u8 URL from metadata")
+                return url
             
-            # Run async download
-            output_path = loop.run_until_complete(
-                downloader.download_video(
+            if follow:
+                results = [await downloader.follow_video(
+                    m3u8_url,
+                    targets[0].output_path,
+                    lambda current, total: progress_callback(0, current, total),
+                    headers=headers,
+                    cookies=cookies_dict,
+                    target_quality=self.quality,
+                    start_time=targets[0].start_time,
+                    end_time=targets[0].end_time,
+                    url_refresher=refresh_m3u8_url,
+                    cancelled=lambda: targets[0].should_stop,
+                    video_id=self.video_id
+                )]
+            else:
+                # Run async download: one playlist fetch and pipeline for every range
+                results = await downloader.download_ranges(
                     m3u8_url,
-                    self.output_path,
+                    [(target.start_time, target.end_time) for target in targets],
+                    [target.output_path for target in targets],
                     progress_callback,
                     headers=headers,
                     cookies=cookies_dict,
                     target_quality=self.quality,
-                    start_time=self.start_time,
-                    end_time=self.end_time
+                    url_refresher=refresh_m3u8_url,
+                    range_cancelled=lambda index: targets[index].should_stop,
+                    video_id=self.video_id,
+                    range_done=range_done
                 )
-            )
-            
-            loop.close()
             
-            self.status_changed.emit("완료")
-            self.download_completed.emit(output_path)
+            for index, result in enumerate(results):
+                range_done(index, result)
             
         except Exception as e:
-            self.download_error.emit(f"수동 다운로드 실패: {str(e)}")
+            for index in range(len(targets)):
+                range_done(index, e)
     
-    def _run_ytdlp_download(self):
-        """Run yt-dlp download"""
-        actual_output_path = None
-        
+    async def _run_range_download(self):
+        """Download a single-file video (clip) over parallel HTTP Range requests"""
         try:
-            # Create cookie file if cookies provided
-            if self.cookies:
-                self.cookie_file = tempfile.NamedTemporaryFile(
-                    mode='w', 
-                    suffix='.txt', 
-                    delete=False
-                )
-                self.cookie_file.write(self.cookies)
-                self.cookie_file.close()
+            self._report_status(self, "다운로드 시작 중...")
             
-            # Configure yt-dlp options
-            ydl_opts = {
-                'format': 'bestvideo+bestaudio/best',
-                'outtmpl': self.output_path + '.%(ext)s',  # Let yt-dlp add extension
-                'merge_output_format': 'mp4',
-                'progress_hooks': [self._progress_hook],
-                'quiet': True,
-                'no_warnings': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-                }
-            }
+            downloader = RangeDownloader(
+                connections=min(self.concurrency, RangeDownloader.DEFAULT_CONNECTIONS),
+                retry_policy=RetryPolicy(attempts=self.retries + 1),
+                bandwidth=self.bandwidth,
+                rate_limit=self.rate_limit
+            )
+            self.stats = downloader.stats
             
-            # Add range download support
-            if self.start_time is not None or self.end_time is not None:
-                def download_ranges_callback(info_dict, ydl):
-                    return [{
-                        'start_time': self.start_time if self.start_time is not None else 0,
-                        'end_time': self.end_time if self.end_time is not None else float('inf')
-                    }]
-                ydl_opts['download_ranges'] = download_ranges_callback
-                # Force keyframes at cuts for precision (optional, might re-encode)
-                # ydl_opts['force_keyframes_at_cuts'] = True 
+            def progress_callback(done, total):
+                if self.should_stop:
+                    raise Exception("Download cancelled by user")
+                rate = downloader.stats.rate
+                eta = int((total - done) / rate) if total and rate else 0
+                self._report_progress(self, int(done / total * 100) if total else 0, rate, eta)
             
-            if self.cookie_file:
-                ydl_opts['cookiefile'] = self.cookie_file.name
+            output_path = await downloader.download(
+                self.url, self.output_path, progress_callback, headers=self._request_headers()
+            )
             
-            # Start download
-            self.status_changed.emit("다운로드 시작 중...")
+            self._complete_target(self, output_path)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                if self.should_stop:
-                    return
-                
-                # Download and get info
-                info = ydl.extract_info(self.url, download=True)
-                
-                # Get the actual output filename
-                if info:
-                    actual_output_path = ydl.prepare_filename(info)
+        except Exception as e:
+            self._report_error(self, f"다운로드 실패: {str(e)}")
+    
+    async def _fetch_master_url(self, api) -> str:
+        """Freshly signed master playlist URL of the VOD"""
+        try:
+            # Get fresh metadata with valid m3u8 URL
+            fresh_metadata = await api.fetch_vod_metadata(self.video_id, self.cookies)
+            
+            # The downloader picks the variant from the master playlist's
+            # EXT-X-STREAM-INF attributes, so no chunklist URL is guessed
+            m3u8_url = api.get_master_playlist_url(fresh_metadata)
+            
+            if not m3u8_url:
+                raise Exception("Failed to extract m3u8 URL from metadata")
+            return m3u8_url
+        
+        except Exception as e:
+            raise Exception(f"Failed to fetch fresh m3u8 URL: {str(e)}")
+    
+    def _cookies_dict(self) -> Dict[str, str]:
+        """Parse the cookie string for aiohttp"""
+        cookies_dict = {}
+        if self.cookies:
+            for cookie in self.cookies.split(';'):
+                if '=' in cookie:
+                    key, value = cookie.strip().split('=', 1)
+                    cookies_dict[key] = value
+        return cookies_dict
+    
+    @staticmethod
+    def _request_headers() -> Dict[str, str]:
+        """Use same headers as yt-dlp"""
+        return {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Referer': 'https://chzzk.naver.com/',
+            'Origin': 'https://chzzk.naver.com'
+        }
+    
+    def _complete_target(self, target: Union['DownloadWorker', 'DownloadPart'], output_path: str):
+        """Report a finished range once"""
+        if target.is_completed:
+            return
+        target.is_completed = True
+        if self.progress:
+            self.progress.discard(target)
+        target.status_changed.emit("완료")
+        target.download_completed.emit(output_path)
+    
+    def _report_progress(self, target: Union['DownloadWorker', 'DownloadPart'], progress: int, speed: float, eta: int):
+        """Report progress of a range, coalesced if there is an aggregator"""
+        if self.progress:
+            self.progress.report_progress(target, progress, speed, eta)
+        else:
+            target.progress_updated.emit(progress, speed, eta)
+    
+    def _report_status(self, target: Union['DownloadWorker', 'DownloadPart'], status: Status):
+        """Report the status text of a range, coalesced if there is an aggregator"""
+        if self.progress:
+            self.progress.report_status(target, status)
+        else:
+            target.status_changed.emit(status() if callable(status) else status)
+    
+    def _report_error(self, target: Union['DownloadWorker', 'DownloadPart'], error_message: str):
+        """Report a failed range; updates not yet delivered are dropped"""
+        if self.progress:
+            self.progress.discard(target)
+        target.download_error.emit(error_message)
+    
+    @staticmethod
+    def _segment_status(stats, current: int, total: int, follow: bool) -> str:
+        """Status text of a manual download after `current` of `total` segments"""
+        status = f"다운로드 중... ({current}/{total} 세그먼트, 동시 요청 {stats.concurrency}"
+        if stats.retries:
+            status += f", 재시도 {stats.retries}회"
+        if stats.cache_hits:
+            status += f", 캐시 {stats.cache_hits}개"
+        if follow:
+            status += ", 추적 중"
+        return status + ")"
+    
+    def _run_ytdlp_download(self):
+        """Run yt-dlp download in a worker process of the shared pool"""
+        try:
+            # Start download
+            self._report_status(self, "다운로드 시작 중...")
+            if self.should_stop:
+                return
             
-            self.status_changed.emit("완료")
+            # The worker writes (and removes) the cookie file itself
+            job = {
+                'url': self.url,
+                'output_path': self.output_path,
+                'cookies': self.cookies,
+                'start_time': self.start_time,
+                'end_time': self.end_time
+            }
+            final_path = get_ytdlp_pool().run(
+                job,
+                on_progress=self._progress_hook,
+                cancelled=lambda: self.should_stop
+            )
             
-            # Use actual path if available, otherwise fallback to expected path
-            final_path = actual_output_path if actual_output_path else (self.output_path + '.mp4')
-            self.download_completed.emit(final_path)
+            self._complete_target(self, final_path)
             
         except Exception as e:
-            self.download_error.emit(str(e))
-        
-        finally:
-            # Cleanup cookie file
-            if self.cookie_file and os.path.exists(self.cookie_file.name):
-                try:
-                    os.remove(self.cookie_file.name)
-                except:
-                    pass
-    
-    def _progress_hook(self, d):
-        """Progress hook for yt-dlp"""
-        if self.should_stop:
-            raise Exception("Download cancelled by user")
+            self._report_error(self, str(e))
+    
+    def _progress_hook(self, d) -> float:
+        """
+        Progress hook for yt-dlp, relayed from its worker process
         
+        Returns:
+            Seconds the worker should pause to stay under the bandwidth caps
+        """
+        delay = 0
         if d['status'] == 'downloading':
+            delay = self._throttle_hook(d)
+            
             try:
                 total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
                 downloaded_bytes = d.get('downloaded_bytes', 0)
@@ -222,36 +668,171 @@ class DownloadWorker(QThread):
                 speed = d.get('speed', 0) or 0
                 eta = d.get('eta', 0) or 0
                 
-                self.progress_updated.emit(progress, speed, eta)
+                self._report_progress(self, progress, speed, eta)
                 
                 # Update status with fragment info if available
                 fragment_index = d.get('fragment_index', 0)
                 fragment_count = d.get('fragment_count', 0)
                 if fragment_count > 0:
-                    self.status_changed.emit(
-                        f"다운로드 중... ({fragment_index}/{fragment_count} 조각)"
-                    )
+                    self._report_status(self, f"다운로드 중... ({fragment_index}/{fragment_count} 조각)")
                 else:
-                    self.status_changed.emit("다운로드 중...")
+                    self._report_status(self, "다운로드 중...")
                     
             except Exception:
                 pass
         
         elif d['status'] == 'finished':
-            self.status_changed.emit("병합 중...")
-            self.progress_updated.emit(100, 0, 0)
+            self._report_status(self, "병합 중...")
+            self._report_progress(self, 100, 0, 0)
+        
+        return delay
+    
+    def _throttle_hook(self, d) -> float:
+        """Charge yt-dlp's new bytes to the shared bandwidth caps; returns the pause"""
+        filename = d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        previous = self._hook_bytes.get(filename, 0)
+        self._hook_bytes[filename] = downloaded
+        
+        # A restarted file reports from zero again
+        received = downloaded - previous if downloaded >= previous else downloaded
+        if received > 0:
+            return self.bandwidth.delay(received, self.job_bucket)
+        return 0
     
     def stop(self):
-        """Stop the download"""
+        """Stop the download; a job on the engine loop is cancelled at once"""
         self.should_stop = True
+        if self._loop is not None and self.isRunning() and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._cancel_task)
+    
+    def discard_partial(self):
+        """Delete the partial output and segment journal of an unfinished manual or direct download"""
+        if not (self.use_manual_download or self.direct_download) or self.is_completed:
+            return
+        _discard_manual_output(self.output_path)
+
+
+class DownloadPart(QObject):
+    """One time range of a multi-range manual download
+    
+    Offers the signals and controls of `DownloadWorker`, so the UI and
+    `DownloadManager` handle it like a download of its own, while the owning
+    worker runs the ranges started together through one metadata fetch,
+    playlist fetch, HTTP session and segment pipeline. The worker lets go
+    of each range as soon as its file is closed.
+    """
+    
+    progress_updated = pyqtSignal(int, float, int)  # progress%, speed, eta
+    status_changed = pyqtSignal(str)  # status message
+    download_completed = pyqtSignal(str)  # output_path
+    download_error = pyqtSignal(str)  # error_message
+    finished = pyqtSignal()  # the worker let go of this range (done, failed or stopped)
+    
+    use_manual_download = True
+    
+    def __init__(self, worker: DownloadWorker, start_time: Optional[float], end_time: Optional[float], output_path: str):
+        super().__init__()
+        self.worker = worker
+        self.start_time = start_time
+        self.end_time = end_time
+        self.output_path = output_path
+        self.should_stop = False
+        self.is_completed = False
+        self.stats = None  # DownloadStats of the pipeline running this range
+        
+        # Set while no batch of the worker holds this range
+        self.idle = threading.Event()
+        self.idle.set()
+    
+    def start(self):
+        """Start (or resume) this range"""
+        self.worker.start_part(self)
+    
+    def stop(self):
+        """Stop this range; the other ranges keep downloading"""
+        self.worker.stop_part(self)
+    
+    def isRunning(self) -> bool:
+        return not self.idle.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the worker has let go of this range (False on timeout)"""
+        return self.idle.wait(timeout)
+    
+    def discard_partial(self):
+        """Delete the partial output and segment journal of this range"""
+        if not self.is_completed:
+            _discard_manual_output(self.output_path)
+
+
+def _manual_output_path(output_path: str) -> str:
+    """Final file of a manual download"""
+    return output_path if output_path.endswith('.mp4') else f"{output_path}.mp4"
+
+
+def _discard_manual_output(output_path: str):
+    """Delete a manual download's output and segment journal"""
+    final_output = _manual_output_path(output_path)
+    for path in (final_output, f"{final_output}.journal"):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 
 class DownloadManager(QObject):
-    """Manages multiple downloads"""
+    """Manages multiple downloads
+    
+    Downloads are run by a `JobScheduler`: at most `max_active` run at once
+    and the rest wait in a priority queue, where they can be paused,
+    promoted or reordered. `queue_changed` is emitted whenever a download's
+    scheduling state or queue position changed.
+    
+    Downloads are keyed by video, quality and time range: asking again for
+    a download that is still unfinished returns the existing one instead of
+    a second job writing the same file.
+    
+    Workers report progress and status through a `ProgressAggregator`,
+    which hands them to the UI in batches at a fixed rate.
+    
+    With a `JobStore`, every unfinished download is kept on disk with its
+    parameters, state and progress; `restore_jobs` recreates them after a
+    restart. Completed and cancelled downloads are dropped from the store.
+    """
+    
+    queue_changed = pyqtSignal()
+    
+    # Milliseconds between writes of buffered progress to the job store
+    FLUSH_INTERVAL = 2000
     
-    def __init__(self):
+    def __init__(self, max_active: int = 3, job_store: Optional[JobStore] = None):
+        """
+        Args:
+            max_active: Downloads allowed to run at once
+            job_store: Store keeping the queue across restarts (None: memory only)
+        """
         super().__init__()
-        self.active_downloads: Dict[str, DownloadWorker] = {}
+        self.active_downloads: Dict[str, Union[DownloadWorker, DownloadPart]] = {}
+        self.job_store = job_store
+        self.progress = ProgressAggregator(parent=self)
+        self._job_keys: Dict[str, Tuple] = {}  # download_id -> (video_id, quality, start, end)
+        self._job_params: Dict[str, Dict] = {}  # download_id -> stored parameters
+        self._stored_states: Dict[str, Tuple[str, int]] = {}  # download_id -> (state, priority)
+        self._cancelled: Dict[str, Union[DownloadWorker, DownloadPart]] = {}  # still stopping
+        self.scheduler = JobScheduler(
+            self._start_job,
+            self._stop_job,
+            max_active=max_active,
+            on_change=self.queue_changed.emit
+        )
+        
+        if job_store:
+            self.queue_changed.connect(self._store_queue)
+            self._flush_timer = QTimer(self)
+            self._flush_timer.timeout.connect(job_store.flush)
+            self._flush_timer.start(self.FLUSH_INTERVAL)
     
     def start_download(
         self, 
@@ -263,7 +844,18 @@ class DownloadManager(QObject):
         cookies: str = "",
         use_manual_download: bool = False,
         start_time: Optional[float] = None,
-        end_time: Optional[float] = None
+        end_time: Optional[float] = None,
+        concurrency: int = SegmentDownloader.DEFAULT_CONCURRENCY,
+        retries: int = 5,
+        adaptive_concurrency: bool = True,
+        rate_limit: Optional[float] = None,
+        hedged_requests: bool = True,
+        follow_live: bool = False,
+        direct_download: bool = False,
+        engine_key: Optional[str] = None,
+        thumbnail: str = "",
+        download_id: Optional[str] = None,
+        output_path: Optional[str] = None
     ) -> str:
         """
         Start a new download
@@ -278,11 +870,56 @@ class DownloadManager(QObject):
             use_manual_download: Whether to use manual segment download
             start_time: Start time in seconds
             end_time: End time in seconds
+            concurrency: Segment requests in flight, or the upper bound when
+                adaptive (manual download only)
+            retries: Retries per segment/playlist request (manual download only)
+            adaptive_concurrency: Tune the in-flight limit automatically
+                (manual download only)
+            rate_limit: Bandwidth cap for this job in bytes/s (None: the
+                per-job default from settings, 0: unlimited)
+            hedged_requests: Duplicate requests for unusually slow segments
+                (manual download only)
+            follow_live: Keep polling a still-growing (live rewind) playlist
+                for new segments until it ends (manual download only)
+            direct_download: `url` is a single video file (clips); fetch it
+                with parallel Range requests instead of yt-dlp
+            engine_key: `EngineSelector` key of the job; the first job of a
+                key measures yt-dlp and the manual path and keeps the faster
+                (use_manual_download is then only the fallback)
+            thumbnail: Thumbnail URL, kept with the job for the restored queue
+            download_id: ID to use (restored jobs); a new one by default
+            output_path: Output path to use (restored jobs); by default
+                derived from the title and quality
         
         Returns:
-            download_id
+            download_id; that of the unfinished download of the same video,
+            quality and range if there is one
         """
-        download_id = str(uuid.uuid4())
+        if download_id is None:
+            existing = self.find_download(video_id, quality, start_time, end_time)
+            if existing:
+                return existing
+            download_id = str(uuid.uuid4())
+        params = {
+            'kind': 'single',
+            'video_id': video_id,
+            'url': url,
+            'title': title,
+            'quality': quality,
+            'output_dir': str(output_dir),
+            'use_manual_download': use_manual_download,
+            'start_time': start_time,
+            'end_time': end_time,
+            'concurrency': concurrency,
+            'retries': retries,
+            'adaptive_concurrency': adaptive_concurrency,
+            'rate_limit': rate_limit,
+            'hedged_requests': hedged_requests,
+            'follow_live': follow_live,
+            'direct_download': direct_download,
+            'engine_key': engine_key,
+            'thumbnail': thumbnail
+        }
         
         # Sanitize filename and add quality
         safe_title = self._sanitize_filename(title)
@@ -296,7 +933,8 @@ class DownloadManager(QObject):
              pass
              
         filename = f"{safe_title}_{filename_suffix}"
-        output_path = str(output_dir / filename)
+        output_path = output_path or self._unused_output_path(str(Path(output_dir) / filename))
+        params['output_path'] = output_path
         
         # Create worker
         worker = DownloadWorker(
@@ -307,27 +945,384 @@ class DownloadManager(QObject):
             video_id=video_id,
             quality=quality,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            concurrency=concurrency,
+            retries=retries,
+            adaptive_concurrency=adaptive_concurrency,
+            rate_limit=rate_limit,
+            hedged_requests=hedged_requests,
+            follow_live=follow_live,
+            direct_download=direct_download,
+            engine_key=engine_key,
+            progress=self.progress
         )
-        self.active_downloads[download_id] = worker
+        self._add_job(download_id, worker, params)
         
         # NOTE: Worker is NOT started here anymore. 
-        # Caller must connect signals first and then call worker.start()
+        # Caller must connect signals first and then call enqueue_download()
         
         return download_id
     
+    def start_range_downloads(
+        self,
+        video_id: str,
+        url: str,
+        titles: List[str],
+        quality: str,
+        output_dir: Path,
+        ranges: List[Tuple[Optional[float], Optional[float]]],
+        cookies: str = "",
+        concurrency: int = SegmentDownloader.DEFAULT_CONCURRENCY,
+        retries: int = 5,
+        adaptive_concurrency: bool = True,
+        rate_limit: Optional[float] = None,
+        hedged_requests: bool = True,
+        thumbnail: str = "",
+        download_ids: Optional[List[str]] = None,
+        output_paths: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Start a manual download of several time ranges of one video
+        
+        The ranges share one worker: ranges started together fetch metadata
+        and playlists once, one session serves their segments, and segments
+        shared by adjacent or overlapping ranges are downloaded once. Each
+        range still gets its own file and download id, and `get_worker`
+        returns a `DownloadPart` with the usual signals.
+        
+        Args:
+            titles: Title per range (used for the file names)
+            ranges: (start, end) in seconds per range
+            download_ids: IDs to use (restored jobs); new ones by default
+            output_paths: Output path per range (restored jobs)
+            Other arguments as for `start_download`
+        
+        Returns:
+            download_id per range; ranges already being downloaded get the
+            existing download's id and are not fetched again
+        """
+        output_dir = Path(output_dir)
+        if download_ids is None:
+            download_ids = [self.find_download(video_id, quality, *time_range) for time_range in ranges]
+        else:
+            download_ids = list(download_ids)
+        new_parts = [i for i, download_id in enumerate(download_ids) if download_id is None or download_id not in self.active_downloads]
+        if not new_parts:
+            return download_ids
+        
+        worker = DownloadWorker(
+            url,
+            str(output_dir / f"{self._sanitize_filename(titles[new_parts[0]])}_{quality}"),
+            cookies,
+            use_manual_download=True,
+            video_id=video_id,
+            quality=quality,
+            concurrency=concurrency,
+            retries=retries,
+            adaptive_concurrency=adaptive_concurrency,
+            rate_limit=rate_limit,
+            hedged_requests=hedged_requests,
+            progress=self.progress
+        )
+        
+        group_id = None
+        for i in new_parts:
+            download_id = download_ids[i] = download_ids[i] or str(uuid.uuid4())
+            group_id = group_id or download_id
+            title = titles[i]
+            start_time, end_time = ranges[i]
+            if output_paths and output_paths[i]:
+                output_path = output_paths[i]
+            else:
+                output_path = self._unused_output_path(str(output_dir / f"{self._sanitize_filename(title)}_{quality}"))
+            params = {
+                'kind': 'range',
+                'group_id': group_id,
+                'video_id': video_id,
+                'url': url,
+                'title': title,
+                'quality': quality,
+                'output_dir': str(output_dir),
+                'start_time': start_time,
+                'end_time': end_time,
+                'concurrency': concurrency,
+                'retries': retries,
+                'adaptive_concurrency': adaptive_concurrency,
+                'rate_limit': rate_limit,
+                'hedged_requests': hedged_requests,
+                'thumbnail': thumbnail,
+                'output_path': output_path
+            }
+            self._add_job(download_id, worker.add_part(start_time, end_time, output_path), params)
+        
+        # As with start_download, the caller connects signals and then
+        # enqueues the parts; each is its own job in the queue, and the parts
+        # the scheduler starts together run as one batch of the shared worker
+        return download_ids
+    
+    def enqueue_download(self, download_id: str, priority: int = 0) -> bool:
+        """
+        Queue a download; it starts as soon as a slot is free
+        
+        Args:
+            download_id: Download ID
+            priority: Higher starts first; equal priorities start in order
+        
+        Returns:
+            False if the download is unknown, already queued or running
+        """
+        if download_id not in self.active_downloads:
+            return False
+        return self.scheduler.enqueue(download_id, priority)
+    
+    def pause_download(self, download_id: str) -> bool:
+        """Take a download out of the queue, or stop it if running"""
+        return self.scheduler.pause(download_id)
+    
+    def promote_download(self, download_id: str) -> bool:
+        """Move a queued or paused download to the front of the queue"""
+        return self.scheduler.promote(download_id)
+    
+    def move_download(self, download_id: str, offset: int) -> bool:
+        """Move a queued download `offset` places back (negative: forward)"""
+        return self.scheduler.move(download_id, offset)
+    
+    def set_max_active(self, max_active: int):
+        """Change the number of downloads run at once"""
+        self.scheduler.set_max_active(max_active)
+    
+    def get_state(self, download_id: str) -> Optional[str]:
+        """Scheduling state of a download (see `core.job_scheduler`)"""
+        return self.scheduler.state(download_id)
+    
+    def get_queue_position(self, download_id: str) -> Optional[int]:
+        """0-based place of a queued download (None if not queued)"""
+        return self.scheduler.position(download_id)
+    
     def cancel_download(self, download_id: str):
-        """Cancel a download"""
-        if download_id in self.active_downloads:
-            worker = self.active_downloads[download_id]
-            worker.stop()
-            worker.wait()  # Wait for thread to finish
-            del self.active_downloads[download_id]
-    
-    def get_worker(self, download_id: str) -> Optional[DownloadWorker]:
+        """
+        Cancel a download without waiting for its job to stop
+        
+        A running job keeps its slot until it reports `finished`; its partial
+        output is deleted then.
+        """
+        worker = self.active_downloads.pop(download_id, None)
+        if worker is None:
+            return
+        self._job_keys.pop(download_id, None)
+        self._forget(download_id)
+        worker.stop()
+        if worker.isRunning():
+            self._cancelled[download_id] = worker
+        else:
+            worker.discard_partial()
+            self.scheduler.remove(download_id)
+    
+    def resume_download(self, download_id: str) -> bool:
+        """
+        Queue a paused, stopped or failed download again
+        
+        Manual downloads continue after the last segment recorded in their
+        journal; yt-dlp downloads continue their partial file.
+        
+        Returns:
+            True if the download was queued
+        """
+        worker = self.active_downloads.get(download_id)
+        if not worker or worker.is_completed:
+            return False
+        return self.scheduler.enqueue(download_id)
+    
+    def get_worker(self, download_id: str) -> Optional[Union[DownloadWorker, DownloadPart]]:
         """Get download worker by ID"""
         return self.active_downloads.get(download_id)
     
+    def find_download(
+        self,
+        video_id: str,
+        quality: str,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None
+    ) -> Optional[str]:
+        """ID of the unfinished download of this video, quality and range, if any"""
+        key = self._job_key(video_id, quality, start_time, end_time)
+        for download_id, job_key in self._job_keys.items():
+            if job_key == key and not self.active_downloads[download_id].is_completed:
+                return download_id
+        return None
+    
+    def restore_jobs(self, cookies: str = "") -> List[Dict]:
+        """
+        Recreate the downloads kept in the job store
+        
+        The downloads are registered paused or finished; connect their
+        signals, then call `resume_restored` to queue the ones that were
+        queued or running when the app closed.
+        
+        Args:
+            cookies: Cookie string for the jobs (cookies are not stored)
+        
+        Returns:
+            Stored jobs in creation order: id, params, state, priority,
+            position, progress, bytes_done, journal_path, error
+        """
+        if not self.job_store:
+            return []
+        jobs = [job for job in self.job_store.load() if job['id'] not in self.active_downloads]
+        
+        groups: Dict[str, List[Dict]] = {}
+        for job in jobs:
+            params = dict(job['params'])
+            kind = params.pop('kind', 'single')
+            if kind == 'range':
+                groups.setdefault(params['group_id'], []).append(job)
+            else:
+                self.start_download(**params, cookies=cookies, download_id=job['id'])
+        
+        for parts in groups.values():
+            params = parts[0]['params']
+            self.start_range_downloads(
+                video_id=params['video_id'],
+                url=params['url'],
+                titles=[part['params']['title'] for part in parts],
+                quality=params['quality'],
+                output_dir=Path(params['output_dir']),
+                ranges=[(part['params']['start_time'], part['params']['end_time']) for part in parts],
+                cookies=cookies,
+                concurrency=params['concurrency'],
+                retries=params['retries'],
+                adaptive_concurrency=params['adaptive_concurrency'],
+                rate_limit=params['rate_limit'],
+                hedged_requests=params['hedged_requests'],
+                thumbnail=params['thumbnail'],
+                download_ids=[part['id'] for part in parts],
+                output_paths=[part['params'].get('output_path') for part in parts]
+            )
+        
+        for job in jobs:
+            self._stored_states[job['id']] = (job['state'], job['priority'])
+            self.scheduler.register(job['id'], job['priority'], paused=job['state'] == PAUSED)
+        return jobs
+    
+    def resume_restored(self, jobs: List[Dict]):
+        """Queue restored jobs that were queued or running, in their old order"""
+        waiting = [job for job in jobs if job['state'] in (QUEUED, RUNNING)]
+        # Running jobs first, then the queue as it was
+        waiting.sort(key=lambda job: (job['state'] != RUNNING, job['position'] is None, job['position'] or 0))
+        for job in waiting:
+            self.scheduler.enqueue(job['id'], job['priority'])
+    
+    def close(self):
+        """Write buffered progress and close the job store"""
+        if self.job_store:
+            self._flush_timer.stop()
+            self.job_store.close()
+    
+    def _add_job(self, download_id: str, worker: Union[DownloadWorker, DownloadPart], params: Dict):
+        """Register (and store) a download; its slot is freed when its job lets go of it"""
+        self.active_downloads[download_id] = worker
+        self._job_keys[download_id] = self._job_key(
+            params['video_id'], params['quality'], params['start_time'], params['end_time']
+        )
+        worker.finished.connect(partial(self._job_finished, download_id))
+        if not self.job_store:
+            return
+        
+        self._job_params[download_id] = params
+        journal_path = None
+        if params['kind'] == 'range' or params['use_manual_download'] or params['engine_key']:
+            journal_path = f"{_manual_output_path(worker.output_path)}.journal"
+        # Restored jobs keep their row
+        self.job_store.add(download_id, params, QUEUED, params.get('group_id'), journal_path)
+        
+        worker.progress_updated.connect(partial(self._store_progress, download_id))
+        worker.download_completed.connect(partial(self._store_completed, download_id))
+        worker.download_error.connect(partial(self._store_error, download_id))
+    
+    def _job_finished(self, download_id: str):
+        """A download's job stopped running"""
+        cancelled = self._cancelled.pop(download_id, None)
+        if cancelled is not None:
+            # The job let go of its output and its slot
+            cancelled.discard_partial()
+            self.scheduler.remove(download_id)
+            return
+        self.scheduler.finished(download_id)
+        worker = self.active_downloads.get(download_id)
+        params = self._job_params.get(download_id)
+        if params is not None and isinstance(worker, DownloadWorker):
+            # Keep the engine picked by the first run, so a restart resumes with it
+            if (params['use_manual_download'], params['engine_key']) != (worker.use_manual_download, worker.engine_key):
+                params.update(use_manual_download=worker.use_manual_download, engine_key=worker.engine_key)
+                self.job_store.update(download_id, params=params)
+    
+    def _store_queue(self):
+        """Persist scheduling states, priorities and queue positions"""
+        positions = {}
+        for download_id in self._job_params:
+            state = self.scheduler.state(download_id)
+            if state is None:
+                continue
+            positions[download_id] = self.scheduler.position(download_id)
+            if state == FINISHED:
+                # Completed jobs are removed; others failed or were stopped
+                state = FAILED
+            stored = (state, self.scheduler.priority(download_id))
+            if self._stored_states.get(download_id) != stored:
+                self._stored_states[download_id] = stored
+                self.job_store.update(download_id, state=stored[0], priority=stored[1])
+        self.job_store.set_positions(positions)
+    
+    def _store_progress(self, download_id: str, progress: int, speed: float, eta: int):
+        stats = self.active_downloads[download_id].stats if download_id in self.active_downloads else None
+        self.job_store.update_progress(download_id, progress, stats.bytes_received if stats else 0)
+    
+    def _store_completed(self, download_id: str, output_path: str):
+        self._forget(download_id)
+    
+    def _store_error(self, download_id: str, error_message: str):
+        if self.scheduler.state(download_id) != PAUSED:
+            self.job_store.update(download_id, error=error_message)
+    
+    @staticmethod
+    def _job_key(video_id: str, quality: str, start_time: Optional[float], end_time: Optional[float]) -> Tuple:
+        """Identity of a download: what it fetches, not where it writes"""
+        return (
+            str(video_id),
+            quality,
+            None if start_time is None else float(start_time),
+            None if end_time is None else float(end_time)
+        )
+    
+    def _unused_output_path(self, output_path: str) -> str:
+        """`output_path`, numbered if an unfinished download already writes there"""
+        taken = {
+            worker.output_path for worker in self.active_downloads.values()
+            if not worker.is_completed
+        }
+        candidate = output_path
+        number = 2
+        while candidate in taken:
+            candidate = f"{output_path} ({number})"
+            number += 1
+        return candidate
+    
+    def _forget(self, download_id: str):
+        """Drop a completed or cancelled download from the job store"""
+        if self._job_params.pop(download_id, None) is not None:
+            self._stored_states.pop(download_id, None)
+            self.job_store.remove(download_id)
+    
+    def _start_job(self, download_id: str):
+        """Scheduler callback: start or restart a download"""
+        worker = self.active_downloads[download_id]
+        worker.should_stop = False
+        worker.start()
+    
+    def _stop_job(self, download_id: str):
+        """Scheduler callback: stop a running download, keeping its partial output"""
+        self.active_downloads[download_id].stop()
+    
     @staticmethod
     def _sanitize_filename(filename: str) -> str:
         """Sanitize filename to remove invalid characters"""
@@ -0,0 +1,121 @@
+"""
+Engine Selector
+Remembers whether yt-dlp or the manual segment path downloads faster
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# Download engines
+MANUAL = "manual"
+YTDLP = "ytdlp"
+
+
+class EngineSelector:
+    """Table of measured engine choices per host and content type
+
+    A job whose key has no decision yet measures both engines on its first
+    seconds (see `DownloadWorker`) and records the faster one here, with
+    the measured rates. Decisions expire after `ttl` seconds, since CDN
+    routes and yt-dlp releases change; the next job then measures again.
+    The table is a small JSON file, replaced atomically on every change.
+    """
+
+    # Seconds a decision is trusted
+    DEFAULT_TTL = 7 * 24 * 3600
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            path: JSON file of the table (None = kept in memory only)
+            ttl: Seconds a decision is trusted
+        """
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.path: Optional[str] = None
+        self._entries: Dict[str, Dict] = {}
+        self.configure(path)
+
+    def configure(self, path: Optional[str]):
+        """Load the table from `path`"""
+        with self._lock:
+            self.path = str(path) if path else None
+            self._entries = self._load()
+
+    @staticmethod
+    def key(url: str, content_type: str) -> str:
+        """Table key of a job: the media host and a content type such as "vod:ABR_HLS" """
+        return f"{urlsplit(url).hostname or ''}|{content_type}"
+
+    @staticmethod
+    def choose(rates: Dict[str, Optional[float]]) -> Optional[str]:
+        """The engine with the best measured rate (None: every probe failed)"""
+        measured = {engine: rate for engine, rate in rates.items() if rate}
+        if not measured:
+            return None
+        return max(measured, key=measured.get)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Engine decided for `key`, unless unknown or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry.get('decided_at', 0) > self.ttl:
+                return None
+            return entry.get('engine')
+
+    def record(self, key: str, engine: str, rates: Dict[str, Optional[float]]):
+        """Store the decision for `key` with the rates (bytes/s) it was based on"""
+        with self._lock:
+            self._entries[key] = {
+                'engine': engine,
+                'decided_at': time.time(),
+                'rates': rates
+            }
+            self._save()
+
+    def forget(self, key: str):
+        """Drop the decision for `key`, so the next job measures again"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading engine choices: {e}")
+            return {}
+        # Expired entries are dropped on load
+        now = time.time()
+        return {
+            key: entry for key, entry in entries.items()
+            if isinstance(entry, dict) and now - entry.get('decided_at', 0) <= self.ttl
+        }
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving engine choices: {e}")
+
+
+_engine_selector = EngineSelector()
+
+
+def get_engine_selector() -> EngineSelector:
+    """Return the process-wide engine selector"""
+    return _engine_selector
@@ -0,0 +1,89 @@
+"""
+File Operations
+Fast file concatenation using kernel-side copying where available
+"""
+import os
+from contextlib import nullcontext
+from typing import BinaryIO, Union
+
+# Buffer size for the userspace fallback copy loop
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Largest chunk requested from the kernel per call
+_KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Flipped off the first time the platform/filesystem rejects a method
+_use_copy_file_range = hasattr(os, 'copy_file_range')
+_use_sendfile = hasattr(os, 'sendfile')
+
+
+def append_file(dst: BinaryIO, src: Union[str, BinaryIO]) -> int:
+    """
+    Append the whole contents of `src` to the open binary file `dst`
+
+    Tries `os.copy_file_range` first, then `os.sendfile`, then a `readinto`
+    loop over one reusable buffer, so file data never has to pass through
+    Python objects when the kernel can copy it directly.
+
+    Args:
+        dst: Binary file opened for writing
+        src: Path of the file to append, or the file opened for binary
+            reading (left open; read from its start)
+
+    Returns:
+        Number of bytes appended
+    """
+    global _use_copy_file_range, _use_sendfile
+
+    # Kernel copies bypass the Python buffer, so flush it and work on offsets
+    dst.flush()
+    start = dst.tell()
+    out_fd = dst.fileno()
+
+    opened = open(src, 'rb') if isinstance(src, (str, os.PathLike)) else nullcontext(src)
+    with opened as src:
+        in_fd = src.fileno()
+        size = os.fstat(in_fd).st_size
+        copied = 0
+
+        if _use_copy_file_range:
+            try:
+                while copied < size:
+                    n = os.copy_file_range(
+                        in_fd, out_fd, min(size - copied, _KERNEL_CHUNK_SIZE),
+                        copied, start + copied
+                    )
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                # e.g. ENOSYS/EXDEV/EINVAL on older kernels or some filesystems
+                _use_copy_file_range = False
+
+        if copied < size and _use_sendfile:
+            try:
+                os.lseek(out_fd, start + copied, os.SEEK_SET)
+                while copied < size:
+                    n = os.sendfile(out_fd, in_fd, copied, min(size - copied, _KERNEL_CHUNK_SIZE))
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                # macOS only supports sockets as sendfile targets
+                _use_sendfile = False
+
+        # Reposition the Python file object after the kernel-side writes
+        dst.seek(start + copied)
+
+        if copied < size:
+            src.seek(copied)
+            buffer = bytearray(COPY_BUFFER_SIZE)
+            view = memoryview(buffer)
+            while True:
+                n = src.readinto(buffer)
+                if not n:
+                    break
+                dst.write(view[:n])
+                copied += n
+
+    return copied
@@ -0,0 +1,150 @@
+"""
+Background File Writer
+Keeps blocking file writes off the event loop
+"""
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, List, Optional
+
+# Size of each coalescing buffer
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Buffers (or large writes) in flight before `write` waits for the disk
+DEFAULT_MAX_BUFFERS = 8
+
+
+class BackgroundFileWriter:
+    """Runs the blocking I/O of one open file on a dedicated thread
+
+    Small writes are copied into preallocated buffers that are recycled once
+    written, so many network chunks become one large `write` call. Data of at
+    least a buffer's size is handed over as is, without a copy. Operations
+    run on a single worker thread in the order they were queued; `call`
+    queues any other file operation (seek, kernel copy, journal update)
+    behind the data written so far.
+
+    At most `max_buffers` operations are in flight. Only then does `write`
+    wait, so a disk latency spike throttles its producer instead of blocking
+    the event loop and every other request on it. A failed operation is
+    re-raised by the next `write`, `call`, `drain` or `close`.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        max_buffers: int = DEFAULT_MAX_BUFFERS
+    ):
+        """
+        Args:
+            file: Open binary file; only touched from the writer thread afterwards
+            buffer_size: Bytes per coalescing buffer
+            max_buffers: Operations in flight before writers wait
+        """
+        self.file = file
+        self.buffer_size = max(1, int(buffer_size))
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-writer")
+        self._slots = asyncio.Semaphore(max(1, int(max_buffers)))
+        self._loop = asyncio.get_running_loop()
+        self._free: List[bytearray] = []
+        self._buffer: Optional[bytearray] = None
+        self._filled = 0
+        self._last: Optional[Future] = None
+        self._error: Optional[BaseException] = None
+        self.closed = False
+
+    async def write(self, data: bytes):
+        """Queue `data` to be written at the file's current position"""
+        self._raise_error()
+        if len(data) >= self.buffer_size:
+            await self._flush_buffer()
+            await self._submit(self.file.write, data)
+            return
+
+        view = memoryview(data)
+        while view:
+            if self._buffer is None:
+                self._buffer = self._free.pop() if self._free else bytearray(self.buffer_size)
+                self._filled = 0
+            n = min(len(view), self.buffer_size - self._filled)
+            self._buffer[self._filled:self._filled + n] = view[:n]
+            self._filled += n
+            view = view[n:]
+            if self._filled == self.buffer_size:
+                await self._flush_buffer()
+
+    async def call(self, fn: Callable, *args) -> Future:
+        """
+        Queue `fn(*args)` behind everything written so far
+
+        Returns:
+            Future of the call's result (await it with `asyncio.wrap_future`)
+        """
+        self._raise_error()
+        await self._flush_buffer()
+        return await self._submit(fn, *args)
+
+    async def drain(self):
+        """Wait until every queued operation has run"""
+        await self._flush_buffer()
+        if self._last is not None:
+            await asyncio.wrap_future(self._last)
+        self._raise_error()
+
+    async def close(self):
+        """Write everything queued, then close the file and stop the thread"""
+        if self.closed:
+            return
+        try:
+            await self.drain()
+        finally:
+            self.closed = True
+            await asyncio.wrap_future(self._executor.submit(self.file.close))
+            self._executor.shutdown(wait=False)
+
+    def close_sync(self):
+        """Blocking `close` for synchronous cleanup paths; the queued data is still written"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._buffer is not None and self._filled:
+            self._executor.submit(self.file.write, memoryview(self._buffer)[:self._filled])
+            self._buffer = None
+        self._executor.submit(self.file.close)
+        self._executor.shutdown(wait=True)
+
+    async def _flush_buffer(self):
+        """Hand the partly filled buffer to the writer thread"""
+        if self._buffer is None or not self._filled:
+            return
+        buffer, filled = self._buffer, self._filled
+        self._buffer = None
+
+        def write():
+            self.file.write(memoryview(buffer)[:filled])
+            # Recycle the buffer once the loop gets to it
+            self._loop.call_soon_threadsafe(self._free.append, buffer)
+
+        await self._submit(write)
+
+    async def _submit(self, fn: Callable, *args) -> Future:
+        """Run `fn(*args)` on the writer thread once an in-flight slot is free"""
+        await self._slots.acquire()
+        future = self._executor.submit(self._run, fn, *args)
+        future.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._slots.release))
+        self._last = future
+        return future
+
+    def _run(self, fn: Callable, *args):
+        """Writer thread: skip everything after the first failure"""
+        if self._error is not None:
+            return None
+        try:
+            return fn(*args)
+        except BaseException as e:
+            self._error = e
+            raise
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
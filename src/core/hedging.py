@@ -0,0 +1,68 @@
+"""
+Hedging Policy
+Duplicate slow segment requests to cut tail latency
+"""
+import math
+from collections import deque
+from typing import Deque, Optional
+
+
+class HedgePolicy:
+    """Decides when a slow request gets a duplicate and how many it may get
+
+    The deadline is a percentile of recent request latencies: a request
+    still running after it is slower than almost all of its peers, so a
+    second copy is likely to finish first. Hedges are capped by an extra
+    byte budget, a fraction of the bytes fetched so far; each hedge is
+    charged the mean segment size, since a cancelled loser's transfer is
+    not measured.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_samples: int = 16,
+        min_delay: float = 0.25,
+        max_extra_fraction: float = 0.1,
+        window: int = 128
+    ):
+        """
+        Args:
+            percentile: Latency percentile used as the hedge deadline (0-1)
+            min_samples: Latencies to observe before hedging at all
+            min_delay: Lower bound for the deadline in seconds
+            max_extra_fraction: Hedge bytes allowed per byte fetched
+            window: Number of recent latencies kept
+        """
+        self.percentile = min(max(percentile, 0.0), 1.0)
+        self.min_samples = max(1, int(min_samples))
+        self.min_delay = min_delay
+        self.max_extra_fraction = max_extra_fraction
+        self._latencies: Deque[float] = deque(maxlen=max(window, self.min_samples))
+        self._fetched_bytes = 0
+        self._fetched_count = 0
+        self.hedge_bytes = 0
+
+    def record(self, latency: float, size: int):
+        """Report a completed request (the winner when hedged)"""
+        self._latencies.append(latency)
+        self._fetched_bytes += size
+        self._fetched_count += 1
+
+    def deadline(self) -> Optional[float]:
+        """Seconds after which a request should be hedged (None = not yet)"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return max(ordered[max(rank, 0)], self.min_delay)
+
+    def try_hedge(self) -> bool:
+        """Charge one hedge against the byte budget if it fits"""
+        if not self._fetched_count:
+            return False
+        cost = self._fetched_bytes / self._fetched_count
+        if self.hedge_bytes + cost > self._fetched_bytes * self.max_extra_fraction:
+            return False
+        self.hedge_bytes += int(cost)
+        return True
@@ -0,0 +1,223 @@
+"""
+HTTP Client
+One long-lived, tuned aiohttp session per event loop, shared by the API
+client, the segment and range downloaders and thumbnail loading
+"""
+import asyncio
+import threading
+import aiohttp
+from typing import Dict, Optional
+
+
+class ConnectionStats:
+    """Connection reuse counters of the shared client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def count(self, name: str):
+        """Increment counter `name`"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def reuse_rate(self) -> Optional[float]:
+        """Share of requests served on a kept-alive connection (None before any)"""
+        total = self.connections_created + self.connections_reused
+        if not total:
+            return None
+        return self.connections_reused / total
+
+    def as_dict(self) -> Dict:
+        """Return the counters as a plain dictionary"""
+        return {
+            'requests': self.requests,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'reuse_rate': self.reuse_rate(),
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+        }
+
+
+class HttpClient:
+    """Process-wide HTTP client
+
+    aiohttp sessions belong to one event loop, so the client keeps one
+    session per loop: the UI loop and the download engine's loop, which
+    runs every download and serves blocking callers (`fetch_bytes_sync`);
+    other short-lived loops get sessions of their own. Every session
+    uses a connector with a total and per-host connection cap, a DNS cache
+    and keep-alive, and a cookie jar that ignores Set-Cookie, since jobs
+    pass their own headers and cookies per request.
+
+    Owners of short-lived loops call `close` before closing the loop.
+    """
+
+    # Connection caps across all hosts and per host
+    LIMIT = 100
+    LIMIT_PER_HOST = 32
+
+    # Seconds resolved addresses are cached
+    DNS_CACHE_TTL = 300
+
+    # Seconds an idle connection is kept open for reuse
+    KEEPALIVE_TIMEOUT = 30
+
+    TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self.limit = self.LIMIT
+        self.limit_per_host = self.LIMIT_PER_HOST
+        self.stats = ConnectionStats()
+
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session of the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Sessions of loops that were closed without `close` are unusable
+            for stale in [l for l in self._sessions if l.is_closed()]:
+                del self._sessions[stale]
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = self._create_session()
+                self._sessions[loop] = session
+        return session
+
+    def bind(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        stats=None
+    ) -> 'BoundSession':
+        """
+        Request defaults of one job over the running loop's shared session
+
+        Args:
+            headers: Default headers of the job's requests
+            cookies: Cookies sent with the job's requests
+            timeout: Timeout of the job's requests (default: TIMEOUT)
+            stats: Job statistics with a `record_connection(reused)` method,
+                told whether each request got a new or a kept-alive connection
+        """
+        return BoundSession(self, headers, cookies, timeout or self.TIMEOUT, stats)
+
+    async def close(self):
+        """Close the running loop's session"""
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session:
+            await session.close()
+
+    def fetch_bytes_sync(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30) -> bytes:
+        """Fetch a small resource (e.g. a thumbnail) from a blocking thread"""
+        async def fetch():
+            async with self.session().get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        # Served by the download engine's loop, sharing its connection pool
+        from core.download_engine import get_download_engine
+        return get_download_engine().submit(fetch()).result()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.DNS_CACHE_TTL,
+            keepalive_timeout=self.KEEPALIVE_TIMEOUT
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.TIMEOUT,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trace_configs=[self._trace_config()]
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Hooks counting requests, new vs. reused connections and DNS cache use"""
+        stats = self.stats
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            stats.count('requests')
+
+        async def on_connection_create_end(session, context, params):
+            stats.count('connections_created')
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.record_connection(False)
+
+        async def on_connection_reuseconn(session, context, params):
+            stats.count('connections_reused')
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.record_connection(True)
+
+        async def on_dns_cache_hit(session, context, params):
+            stats.count('dns_cache_hits')
+
+        async def on_dns_cache_miss(session, context, params):
+            stats.count('dns_cache_misses')
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+
+class BoundSession:
+    """A shared session with one job's default headers, cookies and timeout
+
+    Offers the `get` of `aiohttp.ClientSession` (headers given per request
+    are merged over the defaults). Usable as an async context manager in
+    place of a session of the job's own; leaving it does not close the
+    shared session, which is only created by the first request.
+    """
+
+    def __init__(
+        self,
+        client: HttpClient,
+        headers: Optional[Dict[str, str]],
+        cookies: Optional[Dict[str, str]],
+        timeout: aiohttp.ClientTimeout,
+        stats=None
+    ):
+        self.client = client
+        self.headers = dict(headers or {})
+        self.cookies = cookies
+        self.timeout = timeout
+        self.stats = stats
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs):
+        if headers:
+            headers = {**self.headers, **headers}
+        else:
+            headers = self.headers
+        kwargs.setdefault('cookies', self.cookies)
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('trace_request_ctx', self.stats)
+        return self.client.session().get(url, headers=headers, **kwargs)
+
+    async def __aenter__(self) -> 'BoundSession':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+_http_client = HttpClient()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HTTP client"""
+    return _http_client
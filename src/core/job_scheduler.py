@@ -0,0 +1,218 @@
+"""
+Job Scheduler
+Runs a bounded number of downloads and queues the rest by priority
+"""
+from typing import Callable, Dict, List, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+FINISHED = "finished"  # completed, failed or stopped; may be queued again
+
+
+class _Job:
+    """Scheduling state of one job"""
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.state = FINISHED
+        # Holds a slot: started and not yet reported finished
+        self.active = False
+
+
+class JobScheduler:
+    """Starts queued jobs while fewer than `max_active` hold a slot
+
+    The queue is ordered by priority (higher first) and, within a priority,
+    by arrival. Moving a job past a neighbour gives it the neighbour's
+    priority, so jobs queued later still line up behind it.
+
+    A job holds its slot from `start_job` until the owner reports it
+    `finished`. Pausing a running job asks it to stop through `stop_job`; the
+    slot is only handed on once it has actually stopped, so a paused job
+    that is queued again right away is not run twice at once.
+    """
+
+    def __init__(
+        self,
+        start_job: Callable[[str], None],
+        stop_job: Callable[[str], None],
+        max_active: int = 3,
+        on_change: Optional[Callable[[], None]] = None
+    ):
+        """
+        Args:
+            start_job: Called with a job id to start (or restart) it
+            stop_job: Called with a job id to stop a running job
+            max_active: Jobs allowed to run at once
+            on_change: Called after job states or queue order changed
+        """
+        self.start_job = start_job
+        self.stop_job = stop_job
+        self.max_active = max(1, int(max_active))
+        self.on_change = on_change
+        self._jobs: Dict[str, _Job] = {}
+        self._queue: List[str] = []
+
+    @property
+    def active_count(self) -> int:
+        """Jobs currently holding a slot"""
+        return sum(1 for job in self._jobs.values() if job.active)
+
+    def state(self, job_id: str) -> Optional[str]:
+        """State of a job (None if unknown)"""
+        job = self._jobs.get(job_id)
+        return job.state if job else None
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0-based place of a queued job in the queue (None if not queued)"""
+        try:
+            return self._queue.index(job_id)
+        except ValueError:
+            return None
+
+    def priority(self, job_id: str) -> int:
+        """Current priority of a job (0 if unknown)"""
+        job = self._jobs.get(job_id)
+        return job.priority if job else 0
+
+    def queued(self) -> List[str]:
+        """Queued job ids in the order they will start"""
+        return list(self._queue)
+
+    def set_max_active(self, max_active: int):
+        """Change the number of concurrent jobs; running jobs are not stopped"""
+        self.max_active = max(1, int(max_active))
+        self._update()
+
+    def enqueue(self, job_id: str, priority: Optional[int] = None) -> bool:
+        """
+        Queue a new, paused or finished job
+
+        Args:
+            job_id: Job id
+            priority: Higher starts first (default: the job's last priority, or 0)
+
+        Returns:
+            False if the job is already queued or running
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _Job(priority or 0)
+        elif job.state in (QUEUED, RUNNING):
+            return False
+        elif priority is not None:
+            job.priority = priority
+
+        job.state = QUEUED
+        self._insert(job_id)
+        self._update()
+        return True
+
+    def register(self, job_id: str, priority: int = 0, paused: bool = False):
+        """Know a job without queueing it: paused, or finished (e.g. restored after a restart)"""
+        if job_id in self._jobs:
+            return
+        job = self._jobs[job_id] = _Job(priority)
+        job.state = PAUSED if paused else FINISHED
+        self._update()
+
+    def pause(self, job_id: str) -> bool:
+        """Take a job out of the queue, or stop it if running"""
+        job = self._jobs.get(job_id)
+        if job is None or job.state not in (QUEUED, RUNNING):
+            return False
+
+        if job.state == QUEUED:
+            self._queue.remove(job_id)
+        else:
+            self.stop_job(job_id)
+        job.state = PAUSED
+        self._update()
+        return True
+
+    def promote(self, job_id: str) -> bool:
+        """Move a queued or paused job to the front of the queue"""
+        job = self._jobs.get(job_id)
+        if job is None or job.state not in (QUEUED, PAUSED):
+            return False
+
+        if job.state == QUEUED:
+            self._queue.remove(job_id)
+        if self._queue:
+            job.priority = max(job.priority, self._jobs[self._queue[0]].priority)
+        job.state = QUEUED
+        self._queue.insert(0, job_id)
+        self._update()
+        return True
+
+    def move(self, job_id: str, offset: int) -> bool:
+        """
+        Move a queued job `offset` places towards the back (negative: front)
+
+        Returns:
+            True if the job moved
+        """
+        if job_id not in self._queue:
+            return False
+        index = self._queue.index(job_id)
+        new_index = min(max(index + offset, 0), len(self._queue) - 1)
+        if new_index == index:
+            return False
+
+        self._queue.pop(index)
+        self._queue.insert(new_index, job_id)
+        # Take the priority of the last job passed to keep the queue ordered
+        passed = self._queue[new_index + 1] if new_index < index else self._queue[new_index - 1]
+        self._jobs[job_id].priority = self._jobs[passed].priority
+        self._update()
+        return True
+
+    def finished(self, job_id: str):
+        """Report that a started job has stopped running, for whatever reason"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return
+
+        job.active = False
+        if job.state == RUNNING:
+            job.state = FINISHED
+        self._update()
+
+    def remove(self, job_id: str):
+        """Forget a job; the caller has already stopped it"""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return
+        if job_id in self._queue:
+            self._queue.remove(job_id)
+        self._update()
+
+    def _insert(self, job_id: str):
+        """Queue a job behind every job of the same or higher priority"""
+        priority = self._jobs[job_id].priority
+        index = len(self._queue)
+        while index > 0 and self._jobs[self._queue[index - 1]].priority < priority:
+            index -= 1
+        self._queue.insert(index, job_id)
+
+    def _update(self):
+        """Start queued jobs into free slots, then notify"""
+        free = self.max_active - self.active_count
+        index = 0
+        while free > 0 and index < len(self._queue):
+            job_id = self._queue[index]
+            job = self._jobs[job_id]
+            if job.active:
+                # Paused and queued again before it stopped; wait for it
+                index += 1
+                continue
+            self._queue.pop(index)
+            job.state = RUNNING
+            job.active = True
+            free -= 1
+            self.start_job(job_id)
+
+        if self.on_change:
+            self.on_change()
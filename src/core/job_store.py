@@ -0,0 +1,157 @@
+"""
+Job Store
+SQLite table of queued downloads, so the queue survives restarts
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Stored job states (in addition to the scheduler's queued/running/paused)
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    group_id TEXT,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    position INTEGER,
+    progress INTEGER NOT NULL DEFAULT 0,
+    bytes_done INTEGER NOT NULL DEFAULT 0,
+    journal_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Columns `update` may change
+_COLUMNS = ('params', 'state', 'priority', 'position', 'progress', 'bytes_done', 'journal_path', 'error')
+
+
+class JobStore:
+    """Persistent table of unfinished download jobs
+
+    A job row holds the parameters to recreate its worker (as JSON), its
+    scheduling state, priority and queue position, progress and bytes
+    done, and the path of its segment journal, which is what a restarted
+    manual download resumes from. Parts of a multi-range download share a
+    `group_id`.
+
+    The database runs in WAL mode with relaxed syncing. Job additions and
+    state changes are written right away; progress updates are merged in
+    memory and written together, in one transaction, by `flush`.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway store)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None
+
+    def add(
+        self,
+        job_id: str,
+        params: Dict,
+        state: str,
+        group_id: Optional[str] = None,
+        journal_path: Optional[str] = None
+    ):
+        """Store a new job (a job already stored is kept as is)"""
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (id, group_id, params, state, journal_path, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, group_id, json.dumps(params), state, journal_path, now, now)
+                )
+
+    def update(self, job_id: str, **fields):
+        """Change columns of a job right away (merged with its pending progress)"""
+        with self._lock:
+            fields = {**self._pending.pop(job_id, {}), **fields}
+            self._write({job_id: fields})
+
+    def update_progress(self, job_id: str, progress: int, bytes_done: int):
+        """Record progress; written by the next `flush`"""
+        with self._lock:
+            self._pending.setdefault(job_id, {}).update(progress=progress, bytes_done=bytes_done)
+
+    def set_positions(self, positions: Dict[str, Optional[int]]):
+        """Record queue positions (None: not queued); written by the next `flush`"""
+        with self._lock:
+            for job_id, position in positions.items():
+                self._pending.setdefault(job_id, {})['position'] = position
+
+    def flush(self):
+        """Write every pending update in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._write(pending)
+
+    def remove(self, job_id: str):
+        """Forget a job (cancelled or completed)"""
+        with self._lock:
+            self._pending.pop(job_id, None)
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def load(self) -> List[Dict]:
+        """Every stored job, oldest first, with `params` decoded"""
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at, rowid").fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['params'] = json.loads(job['params'])
+            jobs.append(job)
+        return jobs
+
+    def close(self):
+        """Write pending updates and close the database"""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _write(self, updates: Dict[str, Dict]):
+        """Apply column updates per job in one transaction (lock held)"""
+        if self._conn is None or not updates:
+            return
+        now = time.time()
+        with self._conn:
+            for job_id, fields in updates.items():
+                fields = {key: value for key, value in fields.items() if key in _COLUMNS}
+                if not fields:
+                    continue
+                if 'params' in fields:
+                    fields['params'] = json.dumps(fields['params'])
+                assignments = ", ".join(f"{key} = ?" for key in fields)
+                self._conn.execute(
+                    f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                    (*fields.values(), now, job_id)
+                )
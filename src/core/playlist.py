@@ -0,0 +1,407 @@
+"""
+HLS Playlists
+Single-pass M3U8 parsers: media playlists with a compact, bisectable segment
+timeline (incrementally, for playlists that are still growing), and master
+playlists with structured variants
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# KEY=VALUE pairs of an attribute list; quoted values may contain commas
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_attributes(value: str) -> Dict[str, str]:
+    """Parse an HLS attribute list (`A=1,B="x,y"`) into a dict with unquoted values"""
+    return {
+        key: raw[1:-1] if raw.startswith('"') else raw
+        for key, raw in _ATTRIBUTE_RE.findall(value)
+    }
+
+
+def parse_byterange(value: str) -> Tuple[int, Optional[int]]:
+    """Parse `<length>[@<offset>]` into (length, offset or None)"""
+    length, _, offset = value.partition('@')
+    return int(length), (int(offset) if offset else None)
+
+
+class MediaPlaylist:
+    """Parsed media playlist
+
+    Segments are stored column-wise instead of as one dict per segment:
+
+    - `urls`: segment URIs as written in the playlist
+    - `starts`: `array('d')` of cumulative start times, with one extra entry
+      holding the total duration, so segment `i` spans
+      `starts[i]..starts[i + 1]` and time lookups are a bisect
+    - `byterange_offsets`/`byterange_lengths`: `array('q')` columns, only
+      allocated when the playlist uses EXT-X-BYTERANGE (-1 = whole file)
+
+    Sparse tags are kept as sorted index arrays: discontinuities, program
+    date-times and EXT-X-MAP changes.
+    """
+
+    __slots__ = (
+        'urls', 'starts', 'byterange_offsets', 'byterange_lengths',
+        'discontinuities', 'pdt_indices', 'pdt_values',
+        'maps', 'map_starts', 'media_sequence', 'target_duration', 'ended',
+    )
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self.starts = array('d', [0.0])
+        self.byterange_offsets: Optional[array] = None
+        self.byterange_lengths: Optional[array] = None
+        self.discontinuities = array('l')  # segment indices preceded by a discontinuity
+        self.pdt_indices = array('l')  # segment indices carrying a program date-time
+        self.pdt_values = array('d')  # ... as Unix timestamps
+        self.maps: List[Tuple[str, Optional[Tuple[int, int]]]] = []  # (uri, (offset, length))
+        self.map_starts = array('l')  # first segment index using each map
+        self.media_sequence = 0
+        self.target_duration = 0.0
+        self.ended = False
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def total_duration(self) -> float:
+        """Total duration in seconds"""
+        return self.starts[-1]
+
+    @property
+    def init_segment(self) -> Optional[str]:
+        """URI of the first EXT-X-MAP (init segment), if any"""
+        return self.maps[0][0] if self.maps else None
+
+    def duration(self, index: int) -> float:
+        """Duration of segment `index` in seconds"""
+        return self.starts[index + 1] - self.starts[index]
+
+    def byterange(self, index: int) -> Optional[Tuple[int, int]]:
+        """(offset, length) of segment `index` within its resource, if it is a sub-range"""
+        if self.byterange_lengths is None or self.byterange_lengths[index] < 0:
+            return None
+        return self.byterange_offsets[index], self.byterange_lengths[index]
+
+    def segment_at(self, seconds: float) -> int:
+        """Index of the segment playing at `seconds` (clamped to the playlist)"""
+        index = bisect_right(self.starts, seconds, 0, len(self.urls)) - 1
+        return min(max(index, 0), max(len(self.urls) - 1, 0))
+
+    def range_indices(self, start: Optional[float] = None, end: Optional[float] = None) -> range:
+        """
+        Indices of the segments overlapping `start`..`end` (seconds)
+
+        A segment is included if any part of it lies inside the range;
+        None means the playlist start/end.
+        """
+        count = len(self.urls)
+        first = 0 if start is None else max(bisect_right(self.starts, start, 0, count + 1) - 1, 0)
+        # Skip zero-length or already-finished segments at the boundary
+        while start is not None and first < count and self.starts[first + 1] <= start:
+            first += 1
+        last = count if end is None else bisect_left(self.starts, end, 0, count)
+        return range(first, max(first, last))
+
+    def map_index(self, index: int) -> int:
+        """Index into `maps` of the init segment that segment `index` uses (-1 if none)"""
+        return bisect_right(self.map_starts, index) - 1
+
+    def program_date_time(self, index: int) -> Optional[float]:
+        """Wall-clock start of segment `index` (Unix time) from EXT-X-PROGRAM-DATE-TIME"""
+        k = bisect_right(self.pdt_indices, index) - 1
+        if k < 0:
+            return None
+        anchor = self.pdt_indices[k]
+        return self.pdt_values[k] + (self.starts[index] - self.starts[anchor])
+
+
+def parse_media_playlist(content: str) -> MediaPlaylist:
+    """
+    Parse a media playlist in a single pass
+
+    Supports EXTINF, EXT-X-MAP, EXT-X-BYTERANGE, EXT-X-DISCONTINUITY,
+    EXT-X-PROGRAM-DATE-TIME, EXT-X-MEDIA-SEQUENCE, EXT-X-TARGETDURATION and
+    EXT-X-ENDLIST. Unknown tags are ignored.
+    """
+    parser = MediaPlaylistParser()
+    parser.feed(content)
+    return parser.playlist
+
+
+class MediaPlaylistParser:
+    """Incremental media playlist parser
+
+    Keeps the parse state between calls, so a playlist that is still growing
+    (live rewind, EVENT playlists) can be parsed once and then extended with
+    only the lines appended since. `playlist` is updated in place.
+    """
+
+    def __init__(self):
+        self.playlist = MediaPlaylist()
+        self._text = ''  # playlist text parsed so far (see `update`)
+        self._elapsed = 0.0
+        self._duration = 0.0
+        self._pending_byterange: Optional[Tuple[int, Optional[int]]] = None  # for the next segment
+        self._previous_range_end: Dict[str, int] = {}
+
+    def update(self, content: str) -> Optional[int]:
+        """
+        Parse a re-fetched copy of the playlist, reading only appended lines
+
+        Returns:
+            Number of new segments, or None if the playlist changed other
+            than by appending (e.g. re-signed URLs); it then needs a new parser
+        """
+        if not content.startswith(self._text):
+            return None
+        added = self.feed(content[len(self._text):])
+        self._text = content
+        return added
+
+    def feed(self, content: str) -> int:
+        """
+        Parse more lines of the playlist
+
+        Returns:
+            Number of segments added
+        """
+        playlist = self.playlist
+        urls = playlist.urls
+        count = len(urls)
+        append_url = urls.append
+        append_start = playlist.starts.append
+
+        elapsed = self._elapsed
+        duration = self._duration
+        pending_byterange = self._pending_byterange
+        previous_range_end = self._previous_range_end
+
+        for line in content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            if line[0] != '#':
+                if pending_byterange is not None:
+                    if playlist.byterange_lengths is None:
+                        # First sub-range: earlier segments are whole files
+                        playlist.byterange_offsets = array('q', [-1] * len(urls))
+                        playlist.byterange_lengths = array('q', [-1] * len(urls))
+                    length, offset = pending_byterange
+                    if offset is None:
+                        # Continues right after the previous sub-range of the same resource
+                        offset = previous_range_end.get(line, 0)
+                    previous_range_end[line] = offset + length
+                    playlist.byterange_offsets.append(offset)
+                    playlist.byterange_lengths.append(length)
+                    pending_byterange = None
+                elif playlist.byterange_lengths is not None:
+                    playlist.byterange_offsets.append(-1)
+                    playlist.byterange_lengths.append(-1)
+
+                append_url(line)
+                elapsed += duration
+                append_start(elapsed)
+                duration = 0.0
+
+            elif line.startswith('#EXTINF:'):
+                # Format: #EXTINF:4.000000,<title>
+                try:
+                    duration = float(line[8:].partition(',')[0])
+                except ValueError:
+                    duration = 0.0
+
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                try:
+                    pending_byterange = parse_byterange(line[17:])
+                except ValueError:
+                    pending_byterange = None
+
+            elif line.startswith('#EXT-X-MAP:'):
+                attributes = parse_attributes(line[11:])
+                uri = attributes.get('URI')
+                if uri:
+                    map_range = None
+                    if 'BYTERANGE' in attributes:
+                        length, offset = parse_byterange(attributes['BYTERANGE'])
+                        map_range = (offset or 0, length)
+                    playlist.maps.append((uri, map_range))
+                    playlist.map_starts.append(len(urls))
+
+            elif line == '#EXT-X-DISCONTINUITY':
+                playlist.discontinuities.append(len(urls))
+
+            elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+                try:
+                    timestamp = datetime.fromisoformat(line[25:].replace('Z', '+00:00')).timestamp()
+                except ValueError:
+                    continue
+                playlist.pdt_indices.append(len(urls))
+                playlist.pdt_values.append(timestamp)
+
+            elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+                try:
+                    playlist.media_sequence = int(line[22:])
+                except ValueError:
+                    pass
+
+            elif line.startswith('#EXT-X-TARGETDURATION:'):
+                try:
+                    playlist.target_duration = float(line[22:])
+                except ValueError:
+                    pass
+
+            elif line == '#EXT-X-ENDLIST':
+                playlist.ended = True
+
+        self._elapsed = elapsed
+        self._duration = duration
+        self._pending_byterange = pending_byterange
+        return len(urls) - count
+
+
+class Variant:
+    """One EXT-X-STREAM-INF entry of a master playlist"""
+
+    __slots__ = (
+        'uri', 'bandwidth', 'average_bandwidth', 'width', 'height',
+        'frame_rate', 'codecs', 'audio', 'name',
+    )
+
+    def __init__(self, uri: str, attributes: Dict[str, str]):
+        """
+        Args:
+            uri: Media playlist URI as written in the master playlist
+            attributes: Parsed EXT-X-STREAM-INF attributes
+        """
+        self.uri = uri
+        self.bandwidth = _int_attribute(attributes, 'BANDWIDTH')
+        self.average_bandwidth = _int_attribute(attributes, 'AVERAGE-BANDWIDTH')
+        width, _, height = attributes.get('RESOLUTION', '').partition('x')
+        self.width = int(width) if width.isdigit() else 0
+        self.height = int(height) if height.isdigit() else 0
+        try:
+            self.frame_rate = float(attributes.get('FRAME-RATE', 0))
+        except ValueError:
+            self.frame_rate = 0.0
+        self.codecs = [c.strip() for c in attributes.get('CODECS', '').split(',') if c.strip()]
+        self.audio = attributes.get('AUDIO')  # GROUP-ID of the audio renditions
+        self.name = attributes.get('NAME')
+
+    @property
+    def effective_bandwidth(self) -> int:
+        """Average bandwidth when advertised, otherwise the peak"""
+        return self.average_bandwidth or self.bandwidth
+
+    @property
+    def label(self) -> str:
+        """Quality label such as "1080p" (empty without RESOLUTION)"""
+        return f"{self.height}p" if self.height else ''
+
+    def __repr__(self):
+        return f"Variant({self.label or self.uri}, {self.bandwidth} bps)"
+
+
+class MasterPlaylist:
+    """Parsed master playlist: variants plus EXT-X-MEDIA renditions by group"""
+
+    def __init__(self):
+        self.variants: List[Variant] = []
+        self.media: Dict[str, List[Dict[str, str]]] = {}  # GROUP-ID -> rendition attributes
+
+    def by_height(self, height: int, max_bandwidth: Optional[int] = None) -> Optional[Variant]:
+        """Variant with exactly `height` lines (the best one if several fit)"""
+        candidates = [v for v in self.variants if v.height == height]
+        return self._best(candidates, max_bandwidth)
+
+    def best_under(self, max_bandwidth: int) -> Optional[Variant]:
+        """Highest-bandwidth variant within `max_bandwidth` bits/s"""
+        return self._best(self.variants, max_bandwidth, fallback=False)
+
+    def highest(self) -> Optional[Variant]:
+        """Highest-bandwidth variant"""
+        return self._best(self.variants)
+
+    def lowest(self) -> Optional[Variant]:
+        """Lowest-bandwidth variant, e.g. for previews"""
+        return min(self.variants, key=_variant_rank, default=None)
+
+    def select(self, quality: Optional[str] = None, max_bandwidth: Optional[int] = None) -> Optional[Variant]:
+        """
+        Pick a variant by policy
+
+        Args:
+            quality: "1080p" (exact height), "best", "lowest", or None for the
+                best variant within `max_bandwidth`
+            max_bandwidth: Bitrate budget in bits/s (None = unlimited)
+
+        Returns:
+            Matching variant, or None if the policy cannot be met
+        """
+        if quality == 'lowest':
+            return self.lowest()
+        if quality in (None, '', 'best'):
+            if max_bandwidth:
+                return self.best_under(max_bandwidth) or self.lowest()
+            return self.highest()
+
+        height = quality[:-1] if quality.endswith('p') else quality
+        if height.isdigit() and any(v.height for v in self.variants):
+            return self.by_height(int(height), max_bandwidth)
+
+        # Variants without RESOLUTION: the label in the URI path ("720p/...")
+        candidates = [v for v in self.variants if f"/{quality}/" in v.uri or v.uri.startswith(f"{quality}/")]
+        return self._best(candidates, max_bandwidth)
+
+    @staticmethod
+    def _best(candidates: List[Variant], max_bandwidth: Optional[int] = None, fallback: bool = True) -> Optional[Variant]:
+        """Best candidate within the budget; the cheapest one if none fits and `fallback`"""
+        within = [v for v in candidates if not max_bandwidth or v.effective_bandwidth <= max_bandwidth]
+        if within:
+            return max(within, key=_variant_rank)
+        if fallback:
+            return min(candidates, key=_variant_rank, default=None)
+        return None
+
+
+def _int_attribute(attributes: Dict[str, str], key: str) -> int:
+    """Integer attribute, 0 if missing or malformed"""
+    value = attributes.get(key, '')
+    return int(value) if value.isdigit() else 0
+
+
+def _variant_rank(variant: Variant) -> Tuple[int, int, float]:
+    """Order variants by bandwidth, then resolution and frame rate"""
+    return variant.effective_bandwidth, variant.height, variant.frame_rate
+
+
+def is_master_playlist(content: str) -> bool:
+    """True if `content` is a master (multivariant) playlist"""
+    return '#EXT-X-STREAM-INF' in content
+
+
+def parse_master_playlist(content: str) -> MasterPlaylist:
+    """Parse EXT-X-STREAM-INF variants and EXT-X-MEDIA renditions"""
+    playlist = MasterPlaylist()
+    stream_attributes = None
+
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            stream_attributes = parse_attributes(line[18:])
+        elif line.startswith('#EXT-X-MEDIA:'):
+            attributes = parse_attributes(line[13:])
+            playlist.media.setdefault(attributes.get('GROUP-ID', ''), []).append(attributes)
+        elif line[0] != '#' and stream_attributes is not None:
+            playlist.variants.append(Variant(line, stream_attributes))
+            stream_attributes = None
+
+    return playlist
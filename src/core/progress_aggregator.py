@@ -0,0 +1,100 @@
+"""
+Progress Aggregator
+Coalesces download progress into a few batched UI updates per second
+"""
+import threading
+from typing import Callable, Dict, Tuple, Union
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Status text, or a function building it when it is delivered
+Status = Union[str, Callable[[], str]]
+
+
+class ProgressAggregator(QObject):
+    """Samples the latest progress of every job at a fixed UI rate
+
+    Download jobs report from the engine loop and yt-dlp relay threads, up
+    to once per segment or hook call. Emitting a Qt signal per report would
+    queue a cross-thread event, and a repaint, for each of them. Instead,
+    `report_progress` and `report_status` only keep the newest values per
+    job under a lock. A timer on the UI thread takes them `rate` times per
+    second, drops the ones equal to what was last delivered, and emits the
+    rest through the jobs' own `progress_updated` and `status_changed`
+    signals. The signals are emitted on the UI thread, so connected slots
+    run right away instead of through the event queue. `batch_delivered`
+    follows each batch with the number of updates it carried.
+
+    A status may be given as a function, so formatting happens at the UI
+    rate instead of per segment. Jobs call `discard` before reporting
+    completion or an error, so a stale update cannot follow it.
+    """
+
+    batch_delivered = pyqtSignal(int)  # updates emitted in the batch
+
+    # Deliveries per second
+    DEFAULT_RATE = 8.0
+
+    def __init__(self, rate: float = DEFAULT_RATE, parent=None):
+        """
+        Args:
+            rate: Batches delivered per second
+            parent: Qt parent
+        """
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending: Dict[QObject, Dict] = {}
+        self._delivered: Dict[QObject, Dict] = {}
+        self.reports = 0  # reports received
+        self.deliveries = 0  # signals emitted
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(max(1, int(1000 / rate)))
+
+    def report_progress(self, job: QObject, progress: int, speed: float, eta: int):
+        """Record a job's progress (percent, bytes/s, seconds left); thread-safe"""
+        with self._lock:
+            self.reports += 1
+            self._pending.setdefault(job, {})['progress'] = (progress, speed, eta)
+
+    def report_status(self, job: QObject, status: Status):
+        """Record a job's status text; thread-safe"""
+        with self._lock:
+            self.reports += 1
+            self._pending.setdefault(job, {})['status'] = status
+
+    def discard(self, job: QObject):
+        """Drop a job's undelivered updates (it completed or failed); thread-safe"""
+        with self._lock:
+            self._pending.pop(job, None)
+            self._delivered.pop(job, None)
+
+    def flush(self):
+        """Deliver the pending updates now (UI thread)"""
+        emissions = []
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for job, values in pending.items():
+                delivered = self._delivered.setdefault(job, {})
+                status = values.get('status')
+                if callable(status):
+                    status = status()
+                if status is not None and delivered.get('status') != status:
+                    delivered['status'] = status
+                    emissions.append((job.status_changed, (status,)))
+                progress = values.get('progress')
+                if progress is not None and delivered.get('progress') != progress:
+                    delivered['progress'] = progress
+                    emissions.append((job.progress_updated, progress))
+            self.deliveries += len(emissions)
+
+        # Outside the lock: slots may report or discard
+        for signal, args in emissions:
+            signal.emit(*args)
+        if emissions:
+            self.batch_delivered.emit(len(emissions))
+
+    def counts(self) -> Tuple[int, int]:
+        """(reports received, signals emitted) so far"""
+        with self._lock:
+            return self.reports, self.deliveries
@@ -0,0 +1,246 @@
+"""
+Range Downloader
+Fetches a single-file video (clips) over several HTTP Range connections
+"""
+import asyncio
+import os
+import re
+import aiohttp
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.bandwidth import BandwidthLimiter, get_bandwidth_limiter
+from core.download_stats import DownloadStats
+from core.file_writer import BackgroundFileWriter
+from core.http_client import BoundSession, get_http_client
+from core.retry import HttpStatusError, RetryPolicy
+
+# Content-Range of a partial response: "bytes <first>-<last>/<total or *>"
+_CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class RangeDownloader:
+    """Downloads one file as byte ranges fetched concurrently
+
+    A probe request for the first byte tells whether the server honours
+    Range requests and how large the file is. The output is preallocated and
+    split into up to `connections` ranges; each range streams into its own
+    handle at its offset, so no reassembly pass is needed. File writes run
+    on background writer threads, off the event loop. A broken transfer
+    resumes from the last byte received. Servers without Range support (or
+    without a known length) get a plain single-stream download instead.
+    """
+
+    # Default number of concurrent range requests
+    DEFAULT_CONNECTIONS = 8
+
+    # Files are not split into ranges smaller than this
+    MIN_RANGE_SIZE = 4 * 1024 * 1024
+
+    # Bytes read from a response per chunk
+    CHUNK_SIZE = 256 * 1024
+
+    TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30)
+
+    def __init__(
+        self,
+        connections: int = DEFAULT_CONNECTIONS,
+        retry_policy: Optional[RetryPolicy] = None,
+        bandwidth: Optional[BandwidthLimiter] = None,
+        rate_limit: Optional[float] = None,
+        min_range_size: int = MIN_RANGE_SIZE
+    ):
+        """
+        Args:
+            connections: Maximum number of range requests in flight
+            retry_policy: Retry policy for every request
+            bandwidth: Bandwidth limiter to draw from (default: process-wide)
+            rate_limit: Cap for this job in bytes/s (None: limiter's per-job
+                default, 0: unlimited)
+            min_range_size: Smallest range worth its own connection
+        """
+        self.connections = max(1, int(connections))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.bandwidth = bandwidth or get_bandwidth_limiter()
+        self.job_bucket = self.bandwidth.create_job_bucket(rate_limit)
+        self.min_range_size = max(1, int(min_range_size))
+        self.stats = DownloadStats()
+        self.ranged = False  # whether the last download used Range requests
+        self.session: Optional[BoundSession] = None
+        self._progress_callback: Optional[Callable[[int, int], None]] = None
+        self._total = 0
+
+    async def download(
+        self,
+        url: str,
+        output_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Download `url` into a file
+
+        Args:
+            url: File URL
+            output_path: Output file path (without extension)
+            progress_callback: Called with (bytes done, total bytes) as data
+                arrives; total is 0 while unknown. An exception raised by it
+                (e.g. user cancellation) stops the download.
+            headers: HTTP headers to use
+            cookies: HTTP cookies to use
+
+        Returns:
+            Path to downloaded file
+        """
+        final_output = output_path if output_path.endswith('.mp4') else f"{output_path}.mp4"
+        self._progress_callback = progress_callback
+
+        async with get_http_client().bind(headers, cookies, self.TIMEOUT, self.stats) as self.session:
+            total, validator = await self._probe(url)
+            self.ranged = total is not None
+            if not self.ranged:
+                await self._download_single(url, final_output)
+                return final_output
+
+            self._total = total
+            self._preallocate(final_output, total)
+            ranges = self._split(total)
+            tasks = [
+                asyncio.create_task(self._download_range(url, final_output, start, end, validator))
+                for start, end in ranges
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        return final_output
+
+    async def _probe(self, url: str) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Ask for the first byte to learn whether ranges work
+
+        Returns:
+            (file size, ETag or Last-Modified to pin the ranges to), or
+            (None, None) if the server ignores Range or hides the size
+        """
+        async def attempt():
+            async with self.session.get(url, headers={'Range': 'bytes=0-0'}) as response:
+                if response.status not in (200, 206):
+                    raise self._status_error(url, response)
+                if response.status != 206:
+                    return None, None
+                match = _CONTENT_RANGE_RE.fullmatch(response.headers.get('Content-Range', ''))
+                if not match or match.group(3) == '*':
+                    return None, None
+                validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                return int(match.group(3)), validator
+
+        return await self.retry_policy.run(attempt, self.stats.record_retry)
+
+    def _split(self, total: int) -> List[Tuple[int, int]]:
+        """(first, last) byte of each range, at least `min_range_size` long"""
+        count = max(1, min(self.connections, total // self.min_range_size))
+        size = -(-total // count)
+        return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+    @staticmethod
+    def _preallocate(path: str, size: int):
+        """Create the output at its final size so ranges can be written in place"""
+        with open(path, 'wb') as f:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    return
+                except OSError:
+                    # e.g. filesystems without fallocate support
+                    pass
+            f.truncate(size)
+
+    async def _download_range(
+        self,
+        url: str,
+        path: str,
+        start: int,
+        end: int,
+        validator: Optional[str]
+    ):
+        """Stream bytes `start`..`end` into the output at their offset, resuming after failures"""
+        received = 0
+        writer = BackgroundFileWriter(open(path, 'r+b'))
+
+        async def attempt():
+            nonlocal received
+            offset = start + received
+            headers = {'Range': f'bytes={offset}-{end}'}
+            if validator:
+                # A changed file answers 200 instead of mixing two versions
+                headers['If-Range'] = validator
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 200 and validator:
+                    raise Exception(f"{url} changed on the server during the download")
+                if response.status != 206:
+                    raise self._status_error(url, response)
+                match = _CONTENT_RANGE_RE.fullmatch(response.headers.get('Content-Range', ''))
+                if not match or int(match.group(1)) != offset:
+                    raise Exception(f"Unexpected Content-Range for {url}: {response.headers.get('Content-Range')}")
+
+                await writer.call(writer.file.seek, offset)
+                while True:
+                    chunk = await response.content.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    chunk = chunk[:end + 1 - start - received]
+                    await writer.write(chunk)
+                    received += len(chunk)
+                    self._record(len(chunk))
+                    await self.bandwidth.throttle(len(chunk), self.job_bucket)
+
+                if start + received <= end:
+                    # Connection closed early; the retry asks for the rest
+                    raise aiohttp.ClientPayloadError(f"Range {start}-{end} ended at {start + received}")
+
+        try:
+            await self.retry_policy.run(attempt, self.stats.record_retry)
+        finally:
+            await writer.close()
+
+    async def _download_single(self, url: str, path: str):
+        """Plain download over one connection, for servers without Range support"""
+        async def attempt():
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    raise self._status_error(url, response)
+                self._total = response.content_length or 0
+                self.stats.bytes_received = 0
+                writer = BackgroundFileWriter(open(path, 'wb'))
+                try:
+                    while True:
+                        chunk = await response.content.read(self.CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        await writer.write(chunk)
+                        self._record(len(chunk))
+                        await self.bandwidth.throttle(len(chunk), self.job_bucket)
+                finally:
+                    await writer.close()
+
+        await self.retry_policy.run(attempt, self.stats.record_retry)
+
+    def _record(self, size: int):
+        """Count received bytes and report progress"""
+        self.stats.record_bytes(size)
+        if self._progress_callback:
+            self._progress_callback(self.stats.bytes_received, self._total)
+
+    @staticmethod
+    def _status_error(url: str, response: aiohttp.ClientResponse) -> HttpStatusError:
+        """Build the error for an unexpected response status"""
+        return HttpStatusError(
+            url,
+            response.status,
+            RetryPolicy.parse_retry_after(response.headers.get('Retry-After'))
+        )
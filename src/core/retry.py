@@ -0,0 +1,112 @@
+"""
+Retry Policy
+Exponential backoff with jitter for transient HTTP failures
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+
+class HttpStatusError(Exception):
+    """Raised when a request returns an unexpected HTTP status"""
+
+    def __init__(self, url: str, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"Failed to download {url}: HTTP {status}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Decides whether a failed request is retried and how long to wait
+
+    Retriable failures are 5xx responses, 408/429, connection errors
+    (resets, refused, dropped payloads) and timeouts. Anything else, e.g.
+    404 or 403, fails immediately.
+    """
+
+    RETRIABLE_STATUSES = {408, 429}
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: float = 0.5
+    ):
+        """
+        Args:
+            attempts: Total attempts per request (1 = no retries)
+            base_delay: Delay before the first retry in seconds
+            max_delay: Upper bound for a single delay in seconds
+            jitter: Fraction of each delay that is randomized (0-1)
+        """
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = min(max(jitter, 0.0), 1.0)
+
+    def is_retriable(self, error: BaseException) -> bool:
+        """Return True if `error` is worth another attempt"""
+        if isinstance(error, HttpStatusError):
+            return error.status >= 500 or error.status in self.RETRIABLE_STATUSES
+        return isinstance(error, (
+            aiohttp.ClientConnectionError,
+            aiohttp.ClientPayloadError,
+            asyncio.TimeoutError,
+            ConnectionError,
+        ))
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Delay before retry number `attempt` (0-based)
+
+        Honors a server-provided Retry-After, capped at `max_delay`.
+        """
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    async def run(
+        self,
+        operation: Callable[[], Awaitable],
+        on_retry: Optional[Callable[[BaseException, float], None]] = None
+    ):
+        """
+        Await `operation()` until it succeeds or the policy gives up
+
+        Args:
+            operation: Coroutine factory, called once per attempt
+            on_retry: Called with (error, delay) before each retry
+
+        Returns:
+            Result of the successful attempt
+        """
+        attempt = 0
+        while True:
+            try:
+                return await operation()
+            except Exception as e:
+                if attempt + 1 >= self.attempts or not self.is_retriable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                if on_retry:
+                    on_retry(e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds"""
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form is rare on CDNs; fall back to regular backoff
+            return None
@@ -0,0 +1,210 @@
+"""
+Segment Cache
+Content-addressed on-disk cache of downloaded segments, shared by all jobs
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class SegmentCache:
+    """Disk cache of segment bodies with a size cap and LRU eviction
+
+    Entries are keyed by video id, variant playlist path and segment path
+    (plus byte range). Signed query strings and CDN hosts are left out, so a
+    re-signed playlist, another part of the same VOD or a retried job hits
+    the entries of earlier downloads.
+
+    Inserts go to a temporary file that is renamed into place, so readers
+    never see a partial entry and several jobs, or processes, can share one
+    directory. Hits refresh an entry's modification time; once the cache
+    grows past `max_size`, the least recently used entries are deleted.
+    Downloads insert with `put_later`, which runs the write and any eviction
+    scan on a background thread instead of the event loop.
+    """
+
+    # Entries used this recently are never evicted; a hit may still be
+    # waiting in a writer's reorder buffer
+    MIN_EVICT_AGE = 60
+
+    # Evict down to this fraction of the cap, so not every insert rescans
+    EVICT_TARGET = 0.9
+
+    # Inserts waiting for the background thread before new ones are dropped
+    MAX_QUEUED_INSERTS = 32
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = 0):
+        """
+        Args:
+            directory: Cache directory (None = disabled)
+            max_size: Size cap in bytes (0 = disabled)
+        """
+        self._lock = threading.Lock()
+        self.directory: Optional[str] = None
+        self.max_size = 0
+        self._size = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queued = 0
+        self.configure(directory, max_size)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory and self.max_size > 0)
+
+    def configure(self, directory: Optional[str], max_size: int):
+        """Point the cache at `directory` with a new cap, evicting if needed"""
+        with self._lock:
+            self.directory = str(directory) if directory else None
+            self.max_size = max(int(max_size or 0), 0)
+            self._size = sum(size for _, _, size in self._scan()) if self.enabled else 0
+        if self.enabled and self._size > self.max_size:
+            self.evict()
+
+    @staticmethod
+    def key(
+        video_id: Optional[str],
+        variant_url: str,
+        segment_url: str,
+        byterange: Optional[Tuple[int, int]] = None
+    ) -> str:
+        """Cache key of a segment, independent of URL signatures and CDN hosts"""
+        identity = f"{video_id or ''}\n{urlsplit(variant_url).path}\n{urlsplit(segment_url).path}"
+        if byterange:
+            identity += f"@{byterange[0]}-{byterange[1]}"
+        return hashlib.sha1(identity.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a segment
+
+        Returns:
+            Path of the cached segment, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> Optional[str]:
+        """
+        Store a segment atomically
+
+        The cache is best effort: write errors (e.g. a full disk) are
+        swallowed and the segment simply stays uncached.
+
+        Returns:
+            Path of the cached segment, or None if it was not stored
+        """
+        if not self.enabled or len(data) > self.max_size:
+            return None
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError:
+            return None
+
+        with self._lock:
+            self._size += len(data)
+            over = self._size > self.max_size
+        if over:
+            self.evict()
+        return path
+
+    def put_later(self, key: str, data: bytes) -> bool:
+        """
+        Queue `put` on the cache's background thread
+
+        Returns:
+            False if the segment was dropped: cache disabled, segment too
+            large, or the thread already has MAX_QUEUED_INSERTS waiting
+        """
+        if not self.enabled or len(data) > self.max_size:
+            return False
+        with self._lock:
+            if self._queued >= self.MAX_QUEUED_INSERTS:
+                return False
+            self._queued += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-cache")
+            executor = self._executor
+        executor.submit(self._put_queued, key, data)
+        return True
+
+    def flush(self):
+        """Block until the inserts queued by `put_later` are done"""
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.submit(lambda: None).result()
+
+    def _put_queued(self, key: str, data: bytes):
+        try:
+            self.put(key, data)
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under its cap"""
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry[1])
+            size = sum(entry_size for _, _, entry_size in entries)
+            target = self.max_size * self.EVICT_TARGET
+            cutoff = time.time() - self.MIN_EVICT_AGE
+            for path, mtime, entry_size in entries:
+                if size <= target or mtime > cutoff:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+            self._size = size
+
+    def _path(self, key: str) -> str:
+        """Entry path, fanned out over 256 subdirectories"""
+        return os.path.join(self.directory, key[:2], key)
+
+    def _scan(self) -> List[Tuple[str, float, int]]:
+        """(path, mtime, size) of every entry on disk"""
+        entries = []
+        if not self.directory or not os.path.isdir(self.directory):
+            return entries
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.startswith('.tmp-') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+
+_segment_cache = SegmentCache()
+
+
+def get_segment_cache() -> SegmentCache:
+    """Return the process-wide segment cache (disabled until configured)"""
+    return _segment_cache
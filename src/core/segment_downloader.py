@@ -3,19 +3,114 @@ Manual Segment Downloader for Chzzk HLS streams
 Handles downloading of fMP4 segments when yt-dlp fails
 """
 import asyncio
+import os
+import time
+from functools import partial
 import aiohttp
-import re
-from pathlib import Path
-from typing import List, Dict, Callable, Optional
-from urllib.parse import urljoin
-import urllib.parse
+from typing import Awaitable, List, Dict, Callable, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urljoin, urlsplit
+
+from core.bandwidth import BandwidthLimiter, get_bandwidth_limiter
+from core.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimiter
+from core.download_stats import DownloadStats
+from core.hedging import HedgePolicy
+from core.http_client import BoundSession, get_http_client
+from core.playlist import (
+    MediaPlaylist, MediaPlaylistParser, is_master_playlist, parse_master_playlist, parse_media_playlist
+)
+from core.retry import HttpStatusError, RetryPolicy
+from core.segment_cache import SegmentCache, get_segment_cache
+from core.shared_fetches import SharedFetches, get_shared_fetches
+from core.segment_journal import SegmentJournal
+from core.segment_writer import OrderedSegmentWriter
 
 
 class SegmentDownloader:
     """Downloads HLS streams by manually fetching segments"""
     
-    def __init__(self):
-        self.session: Optional[aiohttp.ClientSession] = None
+    # Number of segment requests kept in flight by default (also the
+    # default of the segment_concurrency setting)
+    DEFAULT_CONCURRENCY = 16
+    
+    # Stalled connections fail (and are retried) instead of hanging the job
+    TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30)
+    
+    # Starting point of the adaptive limit
+    ADAPTIVE_INITIAL_CONCURRENCY = 2
+    
+    # Responses meaning the playlist signature expired or was revoked
+    AUTH_FAILURE_STATUSES = {401, 403, 410}
+    
+    # Refresh signed URLs this many seconds before their encoded expiry
+    REFRESH_MARGIN = 60
+    
+    # Query parameters that carry a signature's expiry (Unix time)
+    EXPIRY_PARAMS = {'exp', 'expire', 'expires', 'Expires', 'e'}
+    TOKEN_PARAMS = {'hdnts', 'hdnea', '__token__'}
+    
+    # Playlist position used for the (first) init segment; init segment k of a
+    # playlist that switches EXT-X-MAP is at position -(k + 1)
+    INIT_POSITION = -1
+    
+    # Follow mode: stop once a growing playlist gains no segments for this long
+    FOLLOW_IDLE_TIMEOUT = 600
+    
+    # Follow mode: bounds of the reload interval (the target duration)
+    FOLLOW_MIN_POLL_INTERVAL = 1.0
+    FOLLOW_MAX_POLL_INTERVAL = 10.0
+    
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retry_policy: Optional[RetryPolicy] = None,
+        adaptive: bool = False,
+        bandwidth: Optional[BandwidthLimiter] = None,
+        rate_limit: Optional[float] = None,
+        cache: Optional[SegmentCache] = None,
+        max_bandwidth: Optional[int] = None,
+        hedging: Optional[HedgePolicy] = None,
+        shared_fetches: Optional[SharedFetches] = None
+    ):
+        """
+        Args:
+            concurrency: Maximum number of segment requests in flight at once
+            retry_policy: Retry policy for playlist and segment requests
+            adaptive: Tune the in-flight limit between 1 and `concurrency`
+                from observed throughput, latency and throttling
+            bandwidth: Bandwidth limiter to draw from (default: process-wide)
+            rate_limit: Cap for this job in bytes/s (None: limiter's per-job
+                default, 0: unlimited)
+            cache: Segment cache to read from and fill (default:
+                process-wide, which is disabled until configured)
+            max_bandwidth: Bitrate budget in bits/s for picking a variant
+                from a master playlist (None = unlimited)
+            hedging: Issue a duplicate request for segments slower than the
+                policy's deadline, using a free concurrency slot (None = off)
+            shared_fetches: Segment requests in flight to join instead of
+                fetching the same segment again (default: process-wide)
+        """
+        self.session: Optional[BoundSession] = None
+        self.concurrency = max(1, int(concurrency))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.adaptive = adaptive
+        self.bandwidth = bandwidth or get_bandwidth_limiter()
+        self.job_bucket = self.bandwidth.create_job_bucket(rate_limit)
+        self.cache = cache or get_segment_cache()
+        self.max_bandwidth = max_bandwidth
+        self.hedging = hedging
+        self.shared_fetches = shared_fetches or get_shared_fetches()
+        self.url_refresher: Optional[Callable[[], Awaitable[str]]] = None
+        self.stats = DownloadStats()
+        self.limiter: Optional[ConcurrencyLimiter] = None
+        self._target_quality: Optional[str] = None
+        self._media_url: Optional[str] = None
+        self._part_urls: List[str] = []
+        self._part_positions: List[int] = []
+        self._part_durations: List[float] = []
+        self._part_byteranges: List[Optional[Tuple[int, int]]] = []
+        self._part_cache_keys: List[str] = []
+        self._url_expiry: Optional[float] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
     
     async def download_video(
         self,
@@ -27,7 +122,10 @@ class SegmentDownloader:
         max_segments: Optional[int] = None,
         target_quality: Optional[str] = None,
         start_time: Optional[float] = None,
-        end_time: Optional[float] = None
+        end_time: Optional[float] = None,
+        resume: bool = True,
+        url_refresher: Optional[Callable[[], Awaitable[str]]] = None,
+        video_id: Optional[str] = None
     ) -> str:
         """
         Download video by fetching segments manually
@@ -39,13 +137,92 @@ class SegmentDownloader:
             headers: HTTP headers to use
             cookies: HTTP cookies to use
             max_segments: Maximum number of segments to download (for testing)
-            target_quality: Target quality (e.g. "1080p") if m3u8_url is a master playlist
+            target_quality: Variant to pick if m3u8_url is a master playlist:
+                "1080p" (exact height), "best" or "lowest"; None picks the
+                best variant within `max_bandwidth`
             start_time: Start time in seconds
             end_time: End time in seconds
+            resume: Continue from the segment journal of an earlier attempt
+                at the same job, if one exists
+            url_refresher: Coroutine function returning a freshly signed
+                master (or media) playlist URL. Called when segment requests
+                start failing with 401/403/410, or shortly before the
+                signature's expiry when the URL encodes one.
+            video_id: Video ID, part of the segment cache key
         
         Returns:
             Path to downloaded file
         """
+        def range_progress(_, current, total):
+            if progress_callback:
+                progress_callback(current, total)
+        
+        results = await self.download_ranges(
+            m3u8_url,
+            [(start_time, end_time)],
+            [output_path],
+            range_progress,
+            headers=headers,
+            cookies=cookies,
+            max_segments=max_segments,
+            target_quality=target_quality,
+            resume=resume,
+            url_refresher=url_refresher,
+            video_id=video_id
+        )
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        return results[0]
+    
+    async def download_ranges(
+        self,
+        m3u8_url: str,
+        ranges: List[Tuple[Optional[float], Optional[float]]],
+        output_paths: List[str],
+        progress_callback: Optional[Callable[[int, int, int], None]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        max_segments: Optional[int] = None,
+        target_quality: Optional[str] = None,
+        resume: bool = True,
+        url_refresher: Optional[Callable[[], Awaitable[str]]] = None,
+        range_cancelled: Optional[Callable[[int], bool]] = None,
+        video_id: Optional[str] = None,
+        range_done: Optional[Callable[[int, Union[str, BaseException]], None]] = None
+    ) -> List[Union[str, BaseException]]:
+        """
+        Download several time ranges of one video, each into its own file
+        
+        The playlist is fetched once and a single session and segment
+        pipeline serve every range. Segments shared by overlapping or
+        adjacent ranges (including the init segment) are fetched once and
+        written to every output that needs them. Each range keeps its own
+        journal, so ranges resume independently.
+        
+        Args:
+            m3u8_url: Master or variant playlist URL
+            ranges: (start, end) in seconds per output; None = open end
+            output_paths: Output file path per range (without extension)
+            progress_callback: Called with (range index, current, total)
+                after each segment of a range is written. An exception raised
+                by it stops that range only.
+            headers: HTTP headers to use
+            cookies: HTTP cookies to use
+            max_segments: Maximum number of segments per range (for testing)
+            target_quality: Variant to pick from a master playlist (see `download_video`)
+            resume: Continue each range from its segment journal, if one exists
+            url_refresher: See `download_video`
+            range_cancelled: Polled with a range index as segments complete;
+                returning True stops that range
+            video_id: Video ID, part of the segment cache key
+            range_done: Called with (range index, path of the finished file
+                or the exception that stopped it) as soon as the range's
+                output is closed, while other ranges may still be running
+        
+        Returns:
+            Per range, the path of the finished file or the exception that
+            stopped it. A failed segment request fails the whole call.
+        """
         # Default headers if not provided
         if not headers:
             headers = {
@@ -54,214 +231,879 @@ class SegmentDownloader:
                 'Origin': 'https://chzzk.naver.com'
             }
             
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies) as self.session:
-            # Parse m3u8
-            manifest_content = await self._fetch_text(m3u8_url)
-            base_url = self._get_base_url(m3u8_url)
+        self.limiter = self._create_limiter()
+        self.url_refresher = url_refresher
+        
+        async with get_http_client().bind(headers, cookies, self.TIMEOUT, self.stats) as self.session:
+            master_url = m3u8_url
+            self._target_quality = target_quality
+            m3u8_url, playlist = await self._load_media_playlist(master_url)
+            self._media_url = m3u8_url
             
-            # Check if it's a master playlist
-            if "#EXT-X-STREAM-INF" in manifest_content:
-                if not target_quality:
-                    raise Exception("Target quality required for master playlist")
-                
-                # Extract media playlist URL
-                media_url = self._extract_media_url(manifest_content, base_url, target_quality)
-                if not media_url:
-                    raise Exception(f"Quality {target_quality} not found in master playlist")
+            if not len(playlist):
+                raise Exception("No media segments found in m3u8")
+            
+            # Output parts of each range in file order (playlist positions),
+            # each init segment ahead of its media
+            selections = []
+            for start_time, end_time in ranges:
+                segments = playlist.range_indices(start_time, end_time)
                 
-                # Fetch media playlist
-                m3u8_url = media_url
-                manifest = await self._fetch_m3u8(m3u8_url)
-                base_url = self._get_base_url(m3u8_url)
-            else:
-                # It's already a media playlist
-                manifest = self._parse_m3u8(manifest_content)
+                # Apply max_segments limit for testing
+                if max_segments and max_segments < len(segments):
+                    segments = segments[:max_segments]
+                selections.append(self._part_positions_for(playlist, segments))
             
-            # Extract segments
-            init_segment = manifest.get('init_segment')
-            all_segments = manifest.get('media_segments', [])
+            # Every distinct part is fetched once, in playlist order
+            order = {}
+            for positions in selections:
+                for i, position in enumerate(positions):
+                    key = (positions[i + 1], 0) if position < 0 else (position, 1)
+                    order[position] = min(order.get(position, key), key)
+            positions = sorted(order, key=order.get)
+            part_index = {position: index for index, position in enumerate(positions)}
             
-            if not all_segments:
-                raise Exception("No media segments found in m3u8")
+            self._reset_parts()
+            self._add_parts(playlist, m3u8_url, positions, video_id)
             
-            # Filter segments by time range if specified
-            media_segments = []
-            if start_time is not None or end_time is not None:
-                current_time = 0.0
-                for seg in all_segments:
-                    duration = seg.get('duration', 0)
-                    segment_end_time = current_time + duration
-                    
-                    # Check if segment overlaps with requested range
-                    in_range = True
-                    if start_time is not None and segment_end_time <= start_time:
-                        in_range = False
-                    if end_time is not None and current_time >= end_time:
-                        in_range = False
-                        
-                    if in_range:
-                        media_segments.append(seg['url'])
+            targets = []
+            try:
+                for index, ((start_time, end_time), path) in enumerate(zip(ranges, output_paths)):
+                    final_output = path if path.endswith('.mp4') else f"{path}.mp4"
+                    targets.append(_RangeTarget(
+                        index, final_output, [part_index[p] for p in selections[index]]
+                    ))
                     
-                    current_time += duration
-            else:
-                media_segments = [s['url'] for s in all_segments]
+                    # Journal the range so an interrupted download can pick up where it stopped
+                    journal_header = self._journal_header(master_url, m3u8_url, start_time, end_time)
+                    self._open_range(targets[-1], journal_header, resume)
+                
+                await self._download_segments(targets, progress_callback, range_cancelled, range_done=range_done)
+            except BaseException:
+                # Keep partial outputs and journals for a later resume
+                for target in targets:
+                    await target.aclose()
+                raise
             
-            # Apply max_segments limit for testing
-            if max_segments and max_segments < len(media_segments):
-                media_segments = media_segments[:max_segments]
+            return [target.error or target.output_path for target in targets]
+    
+    async def follow_video(
+        self,
+        m3u8_url: str,
+        output_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        target_quality: Optional[str] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        resume: bool = True,
+        url_refresher: Optional[Callable[[], Awaitable[str]]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        video_id: Optional[str] = None,
+        idle_timeout: Optional[float] = None
+    ) -> str:
+        """
+        Download a video whose media playlist is still growing (live rewind)
+        
+        Downloads the segments listed so far, then keeps reloading the media
+        playlist with conditional requests (If-None-Match/If-Modified-Since)
+        every target duration. Only the lines appended since the previous
+        reload are parsed, and only the new segments are fetched. Stops at
+        EXT-X-ENDLIST, once the playlist reaches `end_time`, or after
+        `idle_timeout` seconds without new segments; the file then holds
+        everything captured so far.
+        
+        Args:
+            m3u8_url: Master or variant playlist URL
+            output_path: Output file path (without extension)
+            progress_callback: Callback for progress updates (current, total);
+                the total grows as segments are appended
+            headers: HTTP headers to use
+            cookies: HTTP cookies to use
+            target_quality: Variant to pick from a master playlist (see `download_video`)
+            start_time: Start time in seconds
+            end_time: End time in seconds (None = until the playlist ends)
+            resume: Continue from the segment journal of an earlier attempt
+            url_refresher: See `download_video`
+            cancelled: Polled as segments complete and between reloads;
+                returning True stops the download
+            video_id: Video ID, part of the segment cache key
+            idle_timeout: Seconds without new segments before giving up
+                (default: FOLLOW_IDLE_TIMEOUT)
+        
+        Returns:
+            Path to downloaded file
+        """
+        if not headers:
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Referer': 'https://chzzk.naver.com/',
+                'Origin': 'https://chzzk.naver.com'
+            }
+        if idle_timeout is None:
+            idle_timeout = self.FOLLOW_IDLE_TIMEOUT
+        
+        self.limiter = self._create_limiter()
+        self.url_refresher = url_refresher
+        
+        def range_progress(_, current, total):
+            if progress_callback:
+                progress_callback(current, total)
+        
+        def range_cancelled(_):
+            return bool(cancelled and cancelled())
+        
+        async with get_http_client().bind(headers, cookies, self.TIMEOUT, self.stats) as self.session:
+            self._target_quality = target_quality
+            self._media_url, content = await self._resolve_media_playlist(m3u8_url)
+            parser = MediaPlaylistParser()
+            parser.update(content)
+            playlist = parser.playlist
             
-            total_segments = len(media_segments) + (1 if init_segment else 0)
-            current = 0
+            final_output = output_path if output_path.endswith('.mp4') else f"{output_path}.mp4"
+            target = _RangeTarget(0, final_output, [])
+            self._reset_parts()
             
-            # Create temp directory
-            temp_dir = Path(output_path).parent / f"temp_{Path(output_path).stem}"
-            temp_dir.mkdir(exist_ok=True)
+            # Segments of the playlist examined so far, and the init segment in use
+            followed = 0
+            current_map = -1
+            validators: Dict[str, str] = {}
+            first_batch = True
             
             try:
-                # Download init segment
-                init_path = None
-                if init_segment:
-                    init_url = urljoin(base_url, init_segment)
-                    init_path = temp_dir / "init.m4s"
-                    await self._download_file(init_url, str(init_path))
-                    current += 1
-                    if progress_callback:
-                        progress_callback(current, total_segments)
-                
-                # Download media segments
-                segment_paths = []
-                for idx, segment_url in enumerate(media_segments):
-                    full_url = urljoin(base_url, segment_url)
-                    seg_path = temp_dir / f"seg_{idx:04d}.m4v"
-                    await self._download_file(full_url, str(seg_path))
-                    segment_paths.append(seg_path)
+                while True:
+                    # Queue the segments appended since the last reload
+                    first = playlist.range_indices(start_time, end_time).start
+                    segments = playlist.range_indices(start_time, end_time)[max(followed - first, 0):]
+                    positions = self._part_positions_for(playlist, segments, current_map)
+                    if len(segments):
+                        current_map = playlist.map_index(segments[-1])
+                    followed = len(playlist)
+                    first_part = len(self._part_urls)
+                    self._add_parts(playlist, self._media_url, positions, video_id)
+                    target.parts.extend(range(first_part, len(self._part_urls)))
+                    target.growing = not playlist.ended and (
+                        end_time is None or playlist.total_duration < end_time
+                    )
                     
-                    current += 1
-                    if progress_callback:
-                        progress_callback(current, total_segments)
-                
-                # Combine segments
-                final_output = output_path if output_path.endswith('.mp4') else f"{output_path}.mp4"
-                self._combine_segments(init_path, segment_paths, final_output)
-                
-                return final_output
+                    if first_batch:
+                        journal_header = self._journal_header(m3u8_url, self._media_url, start_time, end_time)
+                        self._open_range(target, journal_header, resume)
+                        if target.error:
+                            raise target.error
+                    else:
+                        target.journal.extend([
+                            SegmentJournal.segment_key(self._part_urls[part], self._part_byteranges[part])
+                            for part in range(first_part, len(self._part_urls))
+                        ])
+                        self.stats.add_media(sum(self._part_durations[first_part:]))
+                    
+                    await self._download_segments([target], range_progress, range_cancelled, first_batch)
+                    first_batch = False
+                    if target.error:
+                        raise target.error
+                    if not target.growing:
+                        break
+                    
+                    # Wait for the playlist to grow; the idle time only counts
+                    # from here, however long the batch took to fetch
+                    last_growth = time.monotonic()
+                    while True:
+                        if range_cancelled(0):
+                            raise Exception("Download cancelled by user")
+                        if time.monotonic() - last_growth > idle_timeout:
+                            break
+                        await asyncio.sleep(self._follow_poll_interval(playlist))
+                        content = await self._reload_playlist(validators)
+                        if content is None:
+                            continue
+                        added = parser.update(content)
+                        if added is None:
+                            # Rewritten rather than appended to (e.g. re-signed)
+                            parser = self._reparse_followed(content, playlist)
+                            playlist = parser.playlist
+                            added = len(playlist) - followed
+                        if added or playlist.ended:
+                            break
+                    
+                    if len(playlist) <= followed and not playlist.ended:
+                        # Idle: keep what was captured
+                        break
                 
-            finally:
-                # Cleanup temp files
-                import shutil
-                if temp_dir.exists():
-                    shutil.rmtree(temp_dir)
+                if target.open:
+                    target.growing = False
+                    await target.finish()
+            except BaseException:
+                await target.aclose()
+                raise
+            
+            return target.output_path
+    
+    async def _reload_playlist(self, validators: Dict[str, str]) -> Optional[str]:
+        """
+        Conditionally re-fetch the followed media playlist
+        
+        Re-signs the playlist URL once if the reload is rejected with an auth
+        failure and a refresher is set.
+        
+        Args:
+            validators: ETag/Last-Modified of the previous response; updated
+        
+        Returns:
+            Playlist text, or None if unchanged (304)
+        """
+        try:
+            return await self._fetch_text_if_modified(self._media_url, validators)
+        except HttpStatusError as e:
+            if e.status not in self.AUTH_FAILURE_STATUSES or not self.url_refresher:
+                raise
+        await self._refresh_urls(None)
+        validators.clear()
+        return await self._fetch_text_if_modified(self._media_url, validators)
+    
+    def _reparse_followed(self, content: str, playlist: MediaPlaylist) -> MediaPlaylistParser:
+        """
+        Parse a followed playlist from scratch after it was rewritten
+        
+        Segment positions must stay valid, so the playlist may only have been
+        re-signed or appended to, not have slid its window.
+        """
+        parser = MediaPlaylistParser()
+        parser.update(content)
+        fresh = parser.playlist
+        if fresh.media_sequence != playlist.media_sequence or len(fresh) < len(playlist):
+            raise Exception(
+                f"Playlist window moved while following "
+                f"(media sequence {playlist.media_sequence} -> {fresh.media_sequence})"
+            )
+        return parser
+    
+    def _follow_poll_interval(self, playlist: MediaPlaylist) -> float:
+        """Seconds between reloads of a followed playlist"""
+        interval = playlist.target_duration or self.FOLLOW_MIN_POLL_INTERVAL
+        return min(max(interval, self.FOLLOW_MIN_POLL_INTERVAL), self.FOLLOW_MAX_POLL_INTERVAL)
+    
+    @staticmethod
+    def _journal_header(
+        master_url: str,
+        media_url: str,
+        start_time: Optional[float],
+        end_time: Optional[float]
+    ) -> Dict:
+        """Journal header identifying a range download"""
+        return {
+            'playlist': SegmentJournal.url_identity(master_url),
+            'variant': SegmentJournal.url_identity(media_url),
+            'start_time': start_time,
+            'end_time': end_time
+        }
+    
+    def _reset_parts(self):
+        """Forget the parts of a previous run"""
+        self._part_positions = []
+        self._part_urls = []
+        self._part_byteranges = []
+        self._part_durations = []
+        self._part_cache_keys = []
+        self._url_expiry = None
+        self._refresh_lock = asyncio.Lock()
+    
+    def _add_parts(
+        self,
+        playlist: MediaPlaylist,
+        media_url: str,
+        positions: List[int],
+        video_id: Optional[str]
+    ):
+        """Append the parts at playlist `positions` to the part lists"""
+        urls = self._resolve_part_urls(playlist, media_url, positions)
+        byteranges = [self._part_byterange(playlist, p) for p in positions]
+        self._part_positions.extend(positions)
+        self._part_urls.extend(urls)
+        self._part_byteranges.extend(byteranges)
+        self._part_durations.extend(
+            playlist.duration(position) if position >= 0 else 0.0
+            for position in positions
+        )
+        self._part_cache_keys.extend(
+            SegmentCache.key(video_id, media_url, url, byterange)
+            for url, byterange in zip(urls, byteranges)
+        )
+        if self._url_expiry is None and self._part_urls:
+            self._url_expiry = self._signature_expiry(self._part_urls[0])
+    
+    def _open_range(self, target: '_RangeTarget', journal_header: Dict, resume: bool):
+        """Load the range's journal and open its output after the reusable prefix"""
+        if not target.parts and not target.growing:
+            target.error = Exception("No media segments found in range")
+            return
+        
+        target.journal = SegmentJournal(f"{target.output_path}.journal")
+        segment_keys = [
+            SegmentJournal.segment_key(self._part_urls[part], self._part_byteranges[part])
+            for part in target.parts
+        ]
+        
+        done_sizes = []
+        if resume and os.path.exists(target.output_path):
+            done_sizes = target.journal.load(
+                journal_header, segment_keys, os.path.getsize(target.output_path)
+            )
+        target.journal.begin(journal_header, segment_keys, done_sizes)
+        target.done_sizes = done_sizes
+        target.current = len(done_sizes)
+        
+        # Stream segments straight into the final file in playlist order
+        target.writer = OrderedSegmentWriter(
+            target.output_path,
+            window=self.concurrency * 2,
+            start_index=len(done_sizes),
+            start_offset=sum(done_sizes),
+            on_segment_written=target.journal.record
+        )
+        target.writer.open()
     
     async def _fetch_text(self, url: str) -> str:
-        """Fetch text content from URL"""
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch content: HTTP {response.status}")
-            return await response.text()
-
-    async def _fetch_m3u8(self, url: str) -> Dict:
-        """Fetch and parse m3u8 playlist"""
-        content = await self._fetch_text(url)
-        return self._parse_m3u8(content)
+        """Fetch text content from URL, retrying transient failures"""
+        async def attempt():
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    raise self._status_error(url, response)
+                return await response.text()
+        
+        return await self.retry_policy.run(attempt, self._on_retry)
 
-    def _extract_media_url(self, content: str, base_url: str, quality: str) -> Optional[str]:
-        """Extract media playlist URL for specific quality from master playlist"""
-        lines = content.splitlines()
-        for i, line in enumerate(lines):
-            if line.startswith("#EXT-X-STREAM-INF"):
-                # Check next line for URL
-                if i + 1 < len(lines):
-                    url_line = lines[i+1].strip()
-                    # Check if quality matches (e.g. "720p")
-                    # Chzzk quality string matching
-                    if quality in url_line or f"/{quality}/" in url_line:
-                        return urllib.parse.urljoin(base_url, url_line)
-                    
-                    # Fallback: check resolution if quality label fails
-                    # 1080p -> 1920x1080
-                    if quality == "1080p" and "1920x1080" in line:
-                        return urllib.parse.urljoin(base_url, url_line)
-                    if quality == "720p" and "1280x720" in line:
-                        return urllib.parse.urljoin(base_url, url_line)
-                    if quality == "480p" and "852x480" in line:
-                        return urllib.parse.urljoin(base_url, url_line)
-                    if quality == "360p" and "640x360" in line:
-                        return urllib.parse.urljoin(base_url, url_line)
-                    if quality == "144p" and "256x144" in line:
-                        return urllib.parse.urljoin(base_url, url_line)
-        return None
+    async def _fetch_text_if_modified(self, url: str, validators: Dict[str, str]) -> Optional[str]:
+        """
+        Fetch text content unless it is unchanged since the previous fetch
+        
+        Args:
+            url: URL to fetch
+            validators: ETag/Last-Modified of the previous response; updated
+        
+        Returns:
+            Text content, or None on 304 Not Modified
+        """
+        async def attempt():
+            headers = {}
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return None
+                if response.status != 200:
+                    raise self._status_error(url, response)
+                validators['etag'] = response.headers.get('ETag', '')
+                validators['last_modified'] = response.headers.get('Last-Modified', '')
+                return await response.text()
+        
+        return await self.retry_policy.run(attempt, self._on_retry)
+    
+    def _extract_media_url(self, content: str, base_url: str, quality: Optional[str]) -> Optional[str]:
+        """Select a media playlist URL from master playlist content by quality and bitrate budget"""
+        variant = parse_master_playlist(content).select(quality, self.max_bandwidth)
+        return urljoin(base_url, variant.uri) if variant else None
     
-    def _parse_m3u8(self, content: str) -> Dict:
-        """Parse m3u8 content including durations"""
-        lines = content.strip().split('\n')
+    def _get_base_url(self, m3u8_url: str) -> str:
+        """Get base URL from m3u8 URL"""
+        return m3u8_url.rsplit('/', 1)[0] + '/'
+    
+    async def _download_segments(
+        self,
+        targets: List['_RangeTarget'],
+        progress_callback: Optional[Callable[[int, int, int], None]] = None,
+        range_cancelled: Optional[Callable[[int], bool]] = None,
+        first_batch: bool = True,
+        range_done: Optional[Callable[[int, Union[str, BaseException]], None]] = None
+    ):
+        """
+        Download the parts of `targets` with up to `self.limiter.limit` requests in flight
         
-        init_segment = None
-        media_segments = []
-        current_duration = 0.0
+        Parts still missing from at least one open range are started in
+        playlist order. Each is handed to the writer of every range using it,
+        which puts it back in order; parts already in an output (resumed
+        ranges) are not written again, and parts in the segment cache are
+        copied from it instead of fetched. A part another job is already
+        fetching (an overlapping download) is taken from that request. A range whose callback raises (e.g.
+        user cancellation) or that `range_cancelled` reports is closed and
+        stops drawing parts; the first failed request cancels the remaining
+        requests and is re-raised. `range_done` hears of each range closed
+        along the way (see `download_ranges`).
         
-        for i, line in enumerate(lines):
-            line = line.strip()
+        Follow mode calls this again as parts are appended, with
+        `first_batch` False so the job's statistics carry on.
+        """
+        users: List[List[Tuple[_RangeTarget, int]]] = [[] for _ in self._part_urls]
+        for target in targets:
+            for output_index, part in enumerate(target.parts):
+                users[part].append((target, output_index))
+        
+        def needed(part):
+            return any(
+                target.open and output_index >= target.writer.next_index
+                for target, output_index in users[part]
+            )
+        
+        if first_batch:
+            # Media already on disk counts as done for progress and ETA
+            done_parts = [part for part in range(len(self._part_urls)) if not needed(part)]
+            self.stats.start_media(
+                sum(self._part_durations),
+                sum(
+                    target.done_sizes[output_index]
+                    for part in done_parts
+                    for target, output_index in users[part][:1]
+                    if output_index < len(target.done_sizes)
+                ),
+                sum(self._part_durations[part] for part in done_parts)
+            )
+        
+        def report_done(target):
+            if range_done:
+                range_done(target.index, target.error or target.output_path)
+        
+        async def stop_range(target, error):
+            target.error = error
+            await target.writer.abort()
+            await target.aclose()
+            report_done(target)
+        
+        async def deliver(part, data):
+            receivers = [
+                (target, output_index) for target, output_index in users[part]
+                if target.open and output_index >= target.writer.next_index
+            ]
+            cache_hit = isinstance(data, str)
+            # Cache hit: open the entry for every output right away. The
+            # writers copy it kernel-side once it is in order, and an open
+            # file stays readable if the entry is evicted in the meantime
+            files = [open(data, 'rb') for _ in receivers] if cache_hit else []
+            try:
+                for i, (target, output_index) in enumerate(receivers):
+                    if not target.open or output_index < target.writer.next_index:
+                        continue
+                    if cache_hit:
+                        # The writer closes the file
+                        item, files[i] = files[i], None
+                        await target.writer.write_file(output_index, item)
+                    else:
+                        await target.writer.write(output_index, data)
+                    if not target.open:
+                        continue
+                    target.current += 1
+                    finished = target.complete
+                    if finished:
+                        await target.finish()
+                    if progress_callback:
+                        try:
+                            progress_callback(target.index, target.current, len(target.parts))
+                        except Exception as e:
+                            # A complete range keeps its file
+                            if target.open:
+                                await stop_range(target, e)
+                    if finished:
+                        report_done(target)
+            finally:
+                for file in files:
+                    if file is not None:
+                        file.close()
             
-            # Find init segment
-            if line.startswith('#EXT-X-MAP:'):
-                uri_match = re.search(r'URI="([^"]+)"', line)
-                if uri_match:
-                    init_segment = uri_match.group(1)
+            if range_cancelled:
+                for target in targets:
+                    if target.open and range_cancelled(target.index):
+                        await stop_range(target, Exception("Download cancelled by user"))
+            
+            if not any(target.open for target in targets):
+                # Nothing left to write; abandon requests still in flight
+                raise _RangesClosed()
+        
+        for target in targets:
+            if target.open and target.complete:
+                # Everything was already written by an earlier attempt
+                await target.finish()
+                report_done(target)
+        
+        pending = iter(range(len(self._part_urls)))
+        
+        async def worker():
+            while True:
+                # Workers share one iterator, so each part is taken exactly
+                # once, and only after a slot is free so fetches start in order
+                async with self.limiter.slot():
+                    index = next(pending, None)
+                    while index is not None and not needed(index):
+                        index = next(pending, None)
+                    if index is None:
+                        return
+                    data = self._cached_part(index)
+                    if data is None:
+                        started = time.monotonic()
+                        data, shared = await self.shared_fetches.fetch(
+                            self._part_cache_keys[index], partial(self._fetch_part_hedged, index)
+                        )
+                        if shared:
+                            # Fetched and cached by the other job
+                            self.stats.record_shared_fetch(len(data))
+                        else:
+                            self.limiter.record_success(len(data), time.monotonic() - started)
+                            # Written on the cache's own thread, not this loop
+                            self.cache.put_later(self._part_cache_keys[index], data)
+                        size = len(data)
+                    else:
+                        size = os.path.getsize(data)
+                        self.stats.record_cache_hit(size)
+                    self.stats.record_segment(size, self._part_durations[index])
+                
+                await deliver(index, data)
+        
+        remaining = sum(1 for part in range(len(self._part_urls)) if needed(part))
+        tasks = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, remaining))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not isinstance(e, _RangesClosed):
+                raise
+    
+    def _cached_part(self, index: int) -> Optional[str]:
+        """Path of part `index` in the segment cache, if enabled and present"""
+        if not self.cache.enabled:
+            return None
+        path = self.cache.get(self._part_cache_keys[index])
+        if path is None:
+            self.stats.record_cache_miss()
+        return path
+    
+    async def _fetch_part_hedged(self, index: int) -> bytes:
+        """Fetch part `index`, racing a duplicate request if it runs past the hedge deadline"""
+        deadline = self.hedging.deadline() if self.hedging else None
+        started = time.monotonic()
+        if deadline is None:
+            data = await self._fetch_part(index)
+        else:
+            data = await self._race_hedge(index, deadline)
+        if self.hedging:
+            self.hedging.record(time.monotonic() - started, len(data))
+        return data
+    
+    async def _race_hedge(self, index: int, deadline: float) -> bytes:
+        """
+        Fetch part `index`; after `deadline` seconds also fetch it again and keep the first success
+        
+        The duplicate only starts once the limiter has a free slot (typically
+        near the end of a job, when slots go unused) and if the policy's byte
+        budget allows it. If both requests fail, the original's error is raised.
+        """
+        primary = asyncio.create_task(self._fetch_part(index))
+        hedge = None
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(set(tasks), timeout=deadline)
+            while not done:
+                if not self.limiter.try_acquire():
+                    # Check again for a free slot while the original keeps running
+                    done, _ = await asyncio.wait(set(tasks), timeout=self.hedging.min_delay)
+                    continue
+                if self.hedging.try_hedge():
+                    self.stats.record_hedge()
+                    hedge = asyncio.create_task(self._fetch_part(index))
+                    hedge.add_done_callback(lambda _: self.limiter.release())
+                    tasks.add(hedge)
+                else:
+                    self.limiter.release()
+                break
             
-            # Find duration
-            elif line.startswith('#EXTINF:'):
-                # Format: #EXTINF:4.000000,
+            while tasks:
+                done, _ = await asyncio.wait(set(tasks), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats.record_hedge_win()
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _fetch_part(self, index: int) -> bytes:
+        """
+        Fetch output part `index`, re-signing playlist URLs when they expire
+        
+        Refreshes ahead of the expiry encoded in the URL (if any), and once
+        after an auth failure. Parts other workers already re-signed are
+        simply retried with their new URL.
+        """
+        refreshed = False
+        while True:
+            if (self.url_refresher and self._url_expiry
+                    and time.time() > self._url_expiry - self.REFRESH_MARGIN):
                 try:
-                    duration_str = line.split(':')[1].split(',')[0]
-                    current_duration = float(duration_str)
-                except:
-                    current_duration = 0.0
+                    await self._refresh_urls(self._part_urls[index])
+                except Exception:
+                    # Keep using the current URLs; an auth failure will retry the refresh
+                    self._url_expiry = None
             
-            # Find media segments
-            elif line and not line.startswith('#'):
-                media_segments.append({
-                    'url': line,
-                    'duration': current_duration
-                })
-                current_duration = 0.0
+            url = self._part_urls[index]
+            try:
+                return await self._fetch_segment(url, self._part_byteranges[index])
+            except HttpStatusError as e:
+                if e.status not in self.AUTH_FAILURE_STATUSES or not self.url_refresher:
+                    raise
+                if self._part_urls[index] == url:
+                    if refreshed:
+                        raise
+                    await self._refresh_urls(url)
+                    refreshed = True
+    
+    async def _refresh_urls(self, stale_url: Optional[str]):
+        """
+        Re-sign the media playlist URL and the part URLs from a freshly fetched playlist
         
-        return {
-            'init_segment': init_segment,
-            'media_segments': media_segments
-        }
+        Only one refresh runs at a time; callers whose URL was already replaced
+        while they waited return immediately. A `stale_url` of None always
+        refreshes (the playlist URL itself was rejected).
+        """
+        async with self._refresh_lock:
+            if stale_url is not None and stale_url not in self._part_urls:
+                return
+            
+            master_url = await self.url_refresher()
+            media_url, playlist = await self._load_media_playlist(master_url)
+            self._media_url = media_url
+            
+            # Positions refer to the same segments in the re-signed playlist
+            self._part_urls[:] = self._resolve_part_urls(playlist, media_url, self._part_positions)
+            self._url_expiry = self._signature_expiry(self._part_urls[0]) if self._part_urls else None
+            if self._url_expiry and time.time() > self._url_expiry - self.REFRESH_MARGIN:
+                # Short-lived tokens or a clock running ahead: refreshing early
+                # again would not help; wait for an auth failure instead
+                self._url_expiry = None
+            self.stats.url_refreshes += 1
     
-    def _get_base_url(self, m3u8_url: str) -> str:
-        """Get base URL from m3u8 URL"""
-        return m3u8_url.rsplit('/', 1)[0] + '/'
+    async def _load_media_playlist(self, url: str):
+        """
+        Fetch a playlist, following a master playlist to the target quality
+        
+        Returns:
+            (media playlist URL, parsed media playlist)
+        """
+        media_url, content = await self._resolve_media_playlist(url)
+        return media_url, parse_media_playlist(content)
     
-    async def _download_file(self, url: str, output_path: str):
-        """Download a single file"""
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to download {url}: HTTP {response.status}")
-            
-            with open(output_path, 'wb') as f:
+    async def _resolve_media_playlist(self, url: str) -> Tuple[str, str]:
+        """
+        Fetch a playlist, following a master playlist to the target quality
+        
+        Returns:
+            (media playlist URL, media playlist text)
+        """
+        manifest_content = await self._fetch_text(url)
+        
+        # Check if it's a master playlist
+        if not is_master_playlist(manifest_content):
+            return url, manifest_content
+        
+        # Extract media playlist URL
+        media_url = self._extract_media_url(manifest_content, self._get_base_url(url), self._target_quality)
+        if not media_url:
+            available = ", ".join(
+                v.label or v.uri for v in parse_master_playlist(manifest_content).variants
+            )
+            raise Exception(f"Quality {self._target_quality} not found in master playlist (available: {available})")
+        
+        return media_url, await self._fetch_text(media_url)
+    
+    def _part_positions_for(
+        self,
+        playlist: MediaPlaylist,
+        segments: range,
+        current_map: int = -1
+    ) -> List[int]:
+        """
+        Playlist positions of the output parts, with init segments where the map changes
+        
+        Args:
+            playlist: Parsed media playlist
+            segments: Media segment positions to output
+            current_map: Map already in the output before these segments
+                (follow mode; -1 = none)
+        """
+        positions = []
+        for position in segments:
+            map_index = playlist.map_index(position)
+            if map_index != current_map:
+                current_map = map_index
+                if map_index >= 0:
+                    positions.append(-(map_index + 1))
+            positions.append(position)
+        return positions
+    
+    def _resolve_part_urls(self, playlist: MediaPlaylist, media_url: str, positions: List[int]) -> List[str]:
+        """Absolute URLs of the parts at `positions` of a media playlist"""
+        base_url = self._get_base_url(media_url)
+        urls = playlist.urls
+        maps = playlist.maps
+        return [
+            urljoin(base_url, urls[position] if position >= 0 else maps[-position - 1][0])
+            for position in positions
+        ]
+    
+    @staticmethod
+    def _part_byterange(playlist: MediaPlaylist, position: int) -> Optional[Tuple[int, int]]:
+        """(offset, length) of the part at `position` if it is a sub-range of its URL"""
+        if position >= 0:
+            return playlist.byterange(position)
+        return playlist.maps[-position - 1][1]
+    
+    @classmethod
+    def _signature_expiry(cls, url: str) -> Optional[float]:
+        """Expiry (Unix time) encoded in a signed URL's query string, if any"""
+        for key, value in parse_qsl(urlsplit(url).query):
+            if key in cls.TOKEN_PARAMS:
+                # Akamai-style tokens: exp=1700000000~acl=...~hmac=...
+                fields = dict(f.split('=', 1) for f in value.split('~') if '=' in f)
+                value = fields.get('exp', '')
+            elif key not in cls.EXPIRY_PARAMS:
+                continue
+            try:
+                expiry = float(value)
+            except ValueError:
+                continue
+            # Millisecond timestamps
+            return expiry / 1000 if expiry > 1e11 else expiry
+        return None
+    
+    async def _fetch_segment(self, url: str, byterange: Optional[Tuple[int, int]] = None) -> bytes:
+        """
+        Download a single segment into memory, retrying transient failures
+        
+        If a transfer breaks partway, the retry asks for the missing tail
+        with an HTTP Range request instead of starting over.
+        
+        Args:
+            url: Segment URL
+            byterange: (offset, length) for EXT-X-BYTERANGE segments
+        """
+        data = bytearray()
+        start = byterange[0] if byterange else 0
+        end = str(byterange[0] + byterange[1] - 1) if byterange else ''
+        
+        async def attempt():
+            offset = start + len(data)
+            ranged = bool(data) or byterange is not None
+            headers = {'Range': f'bytes={offset}-{end}'} if ranged else None
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 200 and byterange is None:
+                    # Full body (first attempt, or the server ignored Range)
+                    data.clear()
+                elif response.status != 206 or not ranged:
+                    raise self._status_error(url, response)
+                elif not response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+                    # Unexpected partial body; start the segment over
+                    data.clear()
+                    raise HttpStatusError(url, 500)
+                
                 while True:
-                    chunk = await response.content.read(8192)
+                    chunk = await response.content.read(65536)
                     if not chunk:
                         break
-                    f.write(chunk)
+                    data.extend(chunk)
+                    self.stats.record_bytes(len(chunk))
+                    await self.bandwidth.throttle(len(chunk), self.job_bucket)
+            return data
+        
+        return await self.retry_policy.run(attempt, self._on_retry)
     
-    def _combine_segments(
-        self,
-        init_path: Optional[Path],
-        segment_paths: List[Path],
-        output_path: str
-    ):
-        """Combine init segment and media segments into final video"""
-        with open(output_path, 'wb') as outfile:
-            # Write init segment first
-            if init_path and init_path.exists():
-                with open(init_path, 'rb') as infile:
-                    outfile.write(infile.read())
-            
-            # Write media segments
-            for seg_path in segment_paths:
-                if seg_path.exists():
-                    with open(seg_path, 'rb') as infile:
-                        outfile.write(infile.read())
+    def _on_retry(self, error: BaseException, delay: float):
+        """Account for a failed attempt before it is retried"""
+        self.stats.record_retry(error, delay)
+        self.limiter.record_error(error)
+    
+    def _create_limiter(self) -> ConcurrencyLimiter:
+        """Create the in-flight limiter for one download run"""
+        if self.adaptive:
+            return AdaptiveConcurrencyLimiter(
+                initial=min(self.ADAPTIVE_INITIAL_CONCURRENCY, self.concurrency),
+                max_limit=self.concurrency,
+                on_limit_change=self.stats.record_concurrency
+            )
+        return ConcurrencyLimiter(self.concurrency, self.stats.record_concurrency)
+    
+    @staticmethod
+    def _status_error(url: str, response: aiohttp.ClientResponse) -> HttpStatusError:
+        """Build the error for an unexpected response status"""
+        return HttpStatusError(
+            url,
+            response.status,
+            RetryPolicy.parse_retry_after(response.headers.get('Retry-After'))
+        )
+
+
+class _RangesClosed(Exception):
+    """Every range of a download is complete or stopped"""
+
+
+class _RangeTarget:
+    """Output file of one time range in a `download_ranges` call"""
+    
+    def __init__(self, index: int, output_path: str, parts: List[int]):
+        """
+        Args:
+            index: Position of the range in the request
+            output_path: Final output file path
+            parts: Part index (into the downloader's part lists) per output position
+        """
+        self.index = index
+        self.output_path = output_path
+        self.parts = parts
+        self.writer: Optional[OrderedSegmentWriter] = None
+        self.journal: Optional[SegmentJournal] = None
+        self.done_sizes: List[int] = []
+        self.current = 0
+        self.error: Optional[BaseException] = None
+        self.closed = False
+        self.growing = False  # more parts may still be appended (follow mode)
+    
+    @property
+    def open(self) -> bool:
+        """True while the range still accepts segments"""
+        return self.writer is not None and not self.closed
+    
+    @property
+    def complete(self) -> bool:
+        """True once every part is written and no more will be added"""
+        return not self.growing and self.writer.next_index == len(self.parts)
+    
+    async def finish(self):
+        """Close the completed output once it is on disk and drop its journal"""
+        self.closed = True
+        await self.writer.aclose()
+        self.journal.remove()
+    
+    async def aclose(self):
+        """
+        Close the output, keeping the partial file and journal for a resume
+        
+        Waits for the queued writes without blocking the event loop. A failed
+        write is not raised here: the journal only records segments written
+        before it, so a resume redoes the rest.
+        """
+        self.closed = True
+        try:
+            if self.writer:
+                await self.writer.aclose()
+        except Exception:
+            pass
+        finally:
+            if self.journal:
+                self.journal.close()
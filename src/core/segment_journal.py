@@ -0,0 +1,134 @@
+"""
+Segment Journal
+On-disk record of the segments already written to a manual download
+"""
+import json
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class SegmentJournal:
+    """Tracks which segments of a job have been written to the output file
+
+    The journal lives next to the output as `<output>.journal`. The first line
+    is a JSON header describing the job (playlist, variant, time range). Every
+    following line records one segment written to the output, in order:
+
+        <index> <size> <key>
+
+    `key` is a checksum of the segment URL path (signed query strings change
+    on every metadata fetch, the path does not), so a resumed job only trusts
+    entries whose segment is still at the same position in the playlist.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Journal file path
+        """
+        self.path = path
+        self._file = None
+        self._keys: List[str] = []
+
+    @staticmethod
+    def url_identity(url: str) -> str:
+        """Return the part of a URL that survives re-signing (host + path)"""
+        parts = urlsplit(url)
+        return f"{parts.netloc}{parts.path}"
+
+    @classmethod
+    def segment_key(cls, url: str, byterange: Optional[Tuple[int, int]] = None) -> str:
+        """Short checksum identifying a segment independent of its signature
+
+        Sub-range segments (EXT-X-BYTERANGE) share a URL, so their offset is
+        part of the key.
+        """
+        identity = cls.url_identity(url)
+        if byterange:
+            identity = f"{identity}@{byterange[0]}"
+        return f"{zlib.crc32(identity.encode()):08x}"
+
+    def load(self, header: Dict, keys: List[str], output_size: int) -> List[int]:
+        """
+        Read completed segments that can be reused for this job
+
+        Args:
+            header: Header of the job about to run
+            keys: Segment keys of the job, by output index
+            output_size: Current size of the output file
+
+        Returns:
+            Sizes of the completed segments 0..n-1 (empty if nothing reusable)
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        sizes = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                if json.loads(f.readline()) != self._full_header(header):
+                    return []
+
+                written = 0
+                for line in f:
+                    fields = line.split()
+                    # A torn last line from a crash ends the usable prefix
+                    if len(fields) != 3:
+                        break
+                    index, size = int(fields[0]), int(fields[1])
+                    if index != len(sizes) or index >= len(keys) or fields[2] != keys[index]:
+                        break
+                    # Entries can be ahead of data that never reached the disk
+                    if written + size > output_size:
+                        break
+                    sizes.append(size)
+                    written += size
+        except (OSError, ValueError):
+            return []
+
+        return sizes
+
+    def begin(self, header: Dict, keys: List[str], sizes: Optional[List[int]] = None):
+        """
+        Start (or restart) the journal, keeping the reusable entries
+
+        Args:
+            header: Header of the job
+            keys: Segment keys of the job, by output index
+            sizes: Sizes of the completed prefix returned by `load`
+        """
+        self._keys = keys
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(self._full_header(header)) + "\n")
+        for index, size in enumerate(sizes or []):
+            self._file.write(f"{index} {size} {keys[index]}\n")
+        self._file.flush()
+
+    def extend(self, keys: List[str]):
+        """Add keys for segments appended to the job (followed playlists)"""
+        self._keys.extend(keys)
+
+    def record(self, index: int, size: int):
+        """Record that segment `index` (of `size` bytes) was written"""
+        self._file.write(f"{index} {size} {self._keys[index]}\n")
+        self._file.flush()
+
+    def close(self):
+        """Close the journal file, keeping it on disk"""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Close and delete the journal (the job finished)"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _full_header(self, header: Dict) -> Dict:
+        """Header with the format version, as stored on disk"""
+        return {'version': self.VERSION, **header}
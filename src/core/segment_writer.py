@@ -0,0 +1,172 @@
+"""
+Ordered Segment Writer
+Streams downloaded segments straight into the final output file
+"""
+import asyncio
+import os
+from typing import BinaryIO, Callable, Dict, Optional, Union
+
+from core.file_ops import append_file
+from core.file_writer import BackgroundFileWriter
+
+
+class OrderedSegmentWriter:
+    """Appends segments to one file in playlist order as they arrive
+
+    Segments may complete out of order when fetched concurrently. They are
+    held in a reorder buffer until every earlier segment has been written.
+    The buffer is bounded by `window`: a segment more than `window` positions
+    ahead of the next one to write waits before it is buffered, which caps
+    memory use at roughly `window` segments.
+
+    Segments already on disk (segment cache hits) are queued as open files
+    with `write_file` and appended with kernel-side copying instead of being
+    read into memory. The open file keeps the data readable even if the
+    entry is evicted while it waits in the buffer; the writer closes it.
+
+    The file itself is written by a `BackgroundFileWriter` thread, so a slow
+    disk never blocks the event loop; `on_segment_written` runs on that
+    thread, after the segment's data. Open and close the writer from within
+    the event loop; `aclose` waits for the queued writes without blocking it.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        window: int = 16,
+        start_index: int = 0,
+        start_offset: int = 0,
+        on_segment_written: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        Args:
+            output_path: Final output file path
+            window: Maximum number of segments held in the reorder buffer
+            start_index: First segment index to expect (resumed jobs)
+            start_offset: Bytes of the existing output to keep (resumed jobs)
+            on_segment_written: Called with (index, size) once a segment is
+                written to the output
+        """
+        self.output_path = output_path
+        self.window = max(1, int(window))
+        self.next_index = start_index
+        self.start_offset = start_offset
+        self.bytes_written = 0
+        self.on_segment_written = on_segment_written
+        self.aborted = False
+        self._pending: Dict[int, Union[bytes, BinaryIO]] = {}
+        self._condition: Optional[asyncio.Condition] = None
+        self._file = None
+        self._io: Optional[BackgroundFileWriter] = None
+
+    def open(self):
+        """Create the output file, or cut an existing one to `start_offset`"""
+        if self.start_offset and os.path.exists(self.output_path):
+            self._file = open(self.output_path, 'r+b')
+            self._file.truncate(self.start_offset)
+            self._file.seek(self.start_offset)
+        else:
+            self._file = open(self.output_path, 'wb')
+        self._io = BackgroundFileWriter(self._file)
+        self._condition = asyncio.Condition()
+
+    def close(self):
+        """Close the output file, blocking until the queued writes are done"""
+        self._drop_pending()
+        if self._file:
+            self._io.close_sync()
+            self._file = None
+
+    async def aclose(self):
+        """Close the output file once the queued writes are done"""
+        self._drop_pending()
+        if self._file:
+            self._file = None
+            await self._io.close()
+
+    async def abort(self):
+        """Drop buffered segments and make pending and future writes return at once"""
+        self.aborted = True
+        if self._condition:
+            async with self._condition:
+                self._drop_pending()
+                self._condition.notify_all()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def write(self, index: int, data: bytes):
+        """
+        Queue segment `index` and flush every segment that is now in order
+
+        Args:
+            index: Position of the segment in the output (0-based)
+            data: Segment bytes
+        """
+        await self._put(index, data)
+
+    async def write_file(self, index: int, file: Union[BinaryIO, str]):
+        """
+        Queue a segment stored on disk and flush every segment now in order
+
+        Args:
+            index: Position of the segment in the output (0-based)
+            file: Segment file opened for binary reading, which the writer
+                closes; or a path, opened right away
+        """
+        if isinstance(file, (str, os.PathLike)):
+            file = open(file, 'rb')
+        await self._put(index, file)
+
+    async def _put(self, index: int, item: Union[bytes, BinaryIO]):
+        """Add an item to the reorder buffer and write out the ready prefix"""
+        async with self._condition:
+            try:
+                await self._condition.wait_for(
+                    lambda: self.aborted or index < self.next_index + self.window
+                )
+            except BaseException:
+                self._close_item(item)
+                raise
+            if self.aborted:
+                self._close_item(item)
+                return
+            self._pending[index] = item
+
+            while self.next_index in self._pending:
+                item = self._pending.pop(self.next_index)
+                if not isinstance(item, (bytes, bytearray, memoryview)):
+                    size = os.fstat(item.fileno()).st_size
+                    await self._io.call(self._append_file, self._file, item)
+                else:
+                    size = len(item)
+                    await self._io.write(item)
+                self.bytes_written += size
+                if self.on_segment_written:
+                    await self._io.call(self.on_segment_written, self.next_index, size)
+                self.next_index += 1
+
+            self._condition.notify_all()
+
+    @staticmethod
+    def _append_file(output: BinaryIO, file: BinaryIO):
+        """Writer thread: append a segment file to the output and close it"""
+        try:
+            append_file(output, file)
+        finally:
+            file.close()
+
+    def _drop_pending(self):
+        """Forget buffered segments, closing the files among them"""
+        for item in self._pending.values():
+            self._close_item(item)
+        self._pending.clear()
+
+    @staticmethod
+    def _close_item(item: Union[bytes, BinaryIO]):
+        if not isinstance(item, (bytes, bytearray, memoryview)):
+            item.close()
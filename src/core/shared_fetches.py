@@ -0,0 +1,90 @@
+"""
+Shared Fetches
+Segment requests in flight, joined by every job that needs the same segment
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+
+class _Fetch:
+    """One request in flight and the number of jobs waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.users = 1
+
+
+class SharedFetches:
+    """Lets overlapping downloads share segment requests that are in flight
+
+    Segments are identified by their `SegmentCache` key, which ignores URL
+    signatures, so two jobs over overlapping ranges of one video ask for the
+    same keys. The first job to ask fetches the segment; jobs asking while
+    that request runs wait for its result instead of fetching again. The
+    segment cache covers segments that have already arrived.
+
+    The request runs as a task of its own: it keeps running for the other
+    jobs if the job that started it is stopped, and is cancelled once no job
+    waits for it. A job that joined a request that fails fetches the segment
+    itself, with its own URLs and retries.
+    """
+
+    def __init__(self):
+        self._fetches: Dict[str, _Fetch] = {}
+
+    def __len__(self) -> int:
+        return len(self._fetches)
+
+    async def fetch(self, key: str, fetch: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, bool]:
+        """
+        Fetch a segment, or join the request already fetching it
+
+        Args:
+            key: Segment cache key
+            fetch: Starts this job's own request for the segment
+
+        Returns:
+            (segment body, True if another job's request delivered it)
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._fetches.get(key)
+        if entry is not None and entry.task.get_loop() is loop:
+            entry.users += 1
+            try:
+                return await self._wait(entry), True
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Their request failed; try ours
+                return await fetch(), False
+
+        entry = _Fetch(loop.create_task(fetch()))
+        self._fetches[key] = entry
+        entry.task.add_done_callback(lambda _: self._forget(key, entry))
+        return await self._wait(entry), False
+
+    @staticmethod
+    async def _wait(entry: _Fetch) -> bytes:
+        """Wait for a request; the last job to give up on it cancels it"""
+        try:
+            return await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            entry.users -= 1
+            if entry.users == 0:
+                entry.task.cancel()
+            raise
+
+    def _forget(self, key: str, entry: _Fetch):
+        if self._fetches.get(key) is entry:
+            del self._fetches[key]
+        # The error, if any, was re-raised to the waiting jobs
+        if not entry.task.cancelled():
+            entry.task.exception()
+
+
+_shared_fetches = SharedFetches()
+
+
+def get_shared_fetches() -> SharedFetches:
+    """Return the process-wide table of shared segment requests"""
+    return _shared_fetches
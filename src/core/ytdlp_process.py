@@ -0,0 +1,267 @@
+"""
+yt-dlp Process Pool
+Runs yt-dlp downloads in worker processes, away from the GUI process's GIL
+"""
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Progress hook fields sent to the parent (the rest is large or unpicklable)
+PROGRESS_FIELDS = (
+    'status', 'filename', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate',
+    'speed', 'eta', 'fragment_index', 'fragment_count'
+)
+
+CANCELLED_MESSAGE = "Download cancelled by user"
+
+
+class YtdlpProcessPool:
+    """Runs yt-dlp jobs in a pool of reusable worker processes
+
+    yt-dlp's fragment handling, hooks and merging are CPU-heavy Python; in
+    a process of its own each job has its own interpreter lock and cannot
+    stall the Qt UI. A job is a plain dict of options (see `run`); the
+    worker builds the yt-dlp options from it, so callbacks never cross the
+    process boundary.
+
+    Worker and parent talk over a pipe. Each progress hook call sends the
+    hook's numeric fields and waits for the reply: seconds to sleep (the
+    parent's bandwidth limiter) or a request to cancel, which makes the hook
+    raise and yt-dlp stop. A worker that does not stop within
+    `CANCEL_GRACE` seconds (e.g. while merging) is terminated; its SIGTERM
+    handler still runs the job's cleanup. Workers are spawned on demand, up
+    to `max_workers`, and kept for later jobs.
+    """
+
+    # Default number of worker processes
+    DEFAULT_WORKERS = 4
+
+    # Seconds a cancelled job may take to stop before its worker is terminated
+    CANCEL_GRACE = 5.0
+
+    # Seconds between checks for cancellation while the worker is silent or
+    # the job waits for a free worker
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        """
+        Args:
+            max_workers: Worker processes (and so jobs) at most
+        """
+        self.max_workers = max(1, int(max_workers))
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._idle: List['_Worker'] = []
+
+    def run(
+        self,
+        job: Dict,
+        on_progress: Optional[Callable[[Dict], float]] = None,
+        cancelled: Optional[Callable[[], bool]] = None
+    ) -> str:
+        """
+        Run one job in a worker process and wait for it
+
+        Args:
+            job: url, output_path and optionally cookies (cookie file
+                contents), start_time and end_time
+            on_progress: Called with the progress hook's fields; returns
+                seconds the worker should pause (bandwidth limiting)
+            cancelled: Polled, also while waiting for a free worker; once
+                True the job is stopped
+
+        Returns:
+            Path of the downloaded file
+        """
+        cancelled = cancelled or (lambda: False)
+        # Queued behind busy workers: still cancellable
+        while not self._slots.acquire(timeout=self.POLL_INTERVAL):
+            if cancelled():
+                raise Exception(CANCELLED_MESSAGE)
+        worker = None
+        try:
+            worker = self._take_worker()
+            worker.conn.send(job)
+            return self._follow(worker, on_progress, cancelled)
+        except BaseException:
+            if worker is not None and not worker.usable:
+                worker.kill()
+                worker = None
+            raise
+        finally:
+            if worker is not None:
+                with self._lock:
+                    self._idle.append(worker)
+            self._slots.release()
+
+    def shutdown(self):
+        """Stop the idle workers (busy ones stop with the parent process)"""
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.close()
+
+    def _take_worker(self) -> '_Worker':
+        """An idle worker, or a new one"""
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.kill()
+        return _Worker(self._context)
+
+    def _follow(self, worker: '_Worker', on_progress, cancelled) -> str:
+        """Relay a running job's events until it ends"""
+        deadline = None
+        while True:
+            if cancelled() and deadline is None:
+                deadline = time.monotonic() + self.CANCEL_GRACE
+
+            try:
+                ready = worker.conn.poll(self.POLL_INTERVAL)
+                message = worker.conn.recv() if ready else None
+            except (EOFError, OSError):
+                worker.usable = False
+                raise Exception("yt-dlp worker process exited unexpectedly")
+
+            if message is None:
+                if deadline is not None and time.monotonic() > deadline:
+                    worker.usable = False
+                    raise Exception(CANCELLED_MESSAGE)
+                continue
+
+            kind, payload = message
+            if kind == 'progress':
+                # The worker waits for the reply; a failing hook leaves it stuck
+                worker.usable = False
+                if deadline is not None:
+                    reply = None
+                else:
+                    reply = on_progress(payload) if on_progress else 0
+                worker.conn.send(reply)
+                worker.usable = True
+            elif kind == 'done':
+                return payload
+            else:
+                raise Exception(payload)
+
+
+class _Worker:
+    """Handle of one worker process"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), name="yt-dlp-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # False once the job protocol broke off (cancelled mid-job, crashed)
+        self.usable = True
+
+    def close(self):
+        """Ask the worker to exit"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        """Terminate the worker; its SIGTERM handler cleans up the running job"""
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+        self.conn.close()
+
+
+def _worker_main(conn):
+    """Worker process: run jobs until told to exit"""
+    # Unwind on terminate so the job's cleanup (cookie file) still runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            conn.send(('done', _run_job(job, conn)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+def _run_job(job: Dict, conn) -> str:
+    """Download one job with yt-dlp; the cookie file lives only as long as the job"""
+    import yt_dlp
+
+    def progress_hook(d):
+        conn.send(('progress', {key: d[key] for key in PROGRESS_FIELDS if d.get(key) is not None}))
+        pause = conn.recv()
+        if pause is None:
+            raise Exception(CANCELLED_MESSAGE)
+        if pause > 0:
+            time.sleep(pause)
+
+    ydl_opts = {
+        'format': 'bestvideo+bestaudio/best',
+        'outtmpl': job['output_path'] + '.%(ext)s',  # Let yt-dlp add extension
+        'merge_output_format': 'mp4',
+        'progress_hooks': [progress_hook],
+        'quiet': True,
+        'no_warnings': True,
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+        }
+    }
+
+    # Add range download support
+    start_time = job.get('start_time')
+    end_time = job.get('end_time')
+    if start_time is not None or end_time is not None:
+        def download_ranges_callback(info_dict, ydl):
+            return [{
+                'start_time': start_time if start_time is not None else 0,
+                'end_time': end_time if end_time is not None else float('inf')
+            }]
+        ydl_opts['download_ranges'] = download_ranges_callback
+
+    cookie_path = None
+    try:
+        if job.get('cookies'):
+            fd, cookie_path = tempfile.mkstemp(suffix='.txt')
+            with os.fdopen(fd, 'w') as f:
+                f.write(job['cookies'])
+            ydl_opts['cookiefile'] = cookie_path
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(job['url'], download=True)
+            # Use actual path if available, otherwise fallback to expected path
+            if info:
+                return ydl.prepare_filename(info)
+        return job['output_path'] + '.mp4'
+    finally:
+        if cookie_path and os.path.exists(cookie_path):
+            try:
+                os.remove(cookie_path)
+            except OSError:
+                pass
+
+
+_ytdlp_pool = YtdlpProcessPool()
+
+
+def get_ytdlp_pool() -> YtdlpProcessPool:
+    """Return the process-wide yt-dlp pool"""
+    return _ytdlp_pool
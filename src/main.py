@@ -3,6 +3,7 @@ Chzzk Downloader - Main Entry Point
 """
 import sys
 import asyncio
+import multiprocessing
 from pathlib import Path
 
 # Add src directory to path
@@ -14,6 +15,8 @@ from qasync import QEventLoop
 from ui.main_window import MainWindow
 from ui.styles import get_stylesheet
 from core.config import Config
+from core.download_engine import get_download_engine
+from core.ytdlp_process import get_ytdlp_pool
 
 
 def main():
@@ -43,7 +46,15 @@ def main():
     # Run application
     with loop:
         loop.run_forever()
+    
+    # Stop running downloads; their journals let them resume next time
+    get_download_engine().shutdown()
+    get_ytdlp_pool().shutdown()
+    # Keep the queue and its progress for the next start
+    window.download_manager.close()
 
 
 if __name__ == "__main__":
+    # Frozen builds: spawned yt-dlp workers run this executable again
+    multiprocessing.freeze_support()
     main()
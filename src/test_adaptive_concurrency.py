@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.concurrency import AdaptiveConcurrencyLimiter
+from core.retry import HttpStatusError, RetryPolicy
+from core.segment_downloader import SegmentDownloader
+
+
+class SimulatedCDN:
+    """Local stand-in for the CDN with latency, a bandwidth cap and throttling"""
+    
+    def __init__(self, segments: int, segment_size: int, latency: float = 0.0,
+                 bandwidth: float = 0.0, throttle_above: int = 0):
+        self.segments = segments
+        self.body = b'x' * segment_size
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes/s shared by all responses, 0 = unlimited
+        self.throttle_above = throttle_above  # 429 when more requests are in flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled = 0
+        self._link_free_at = 0.0
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/playlist.m3u8', self.playlist)
+        app.router.add_get('/{name}', self.segment)
+        return app
+    
+    async def playlist(self, request):
+        return web.Response(text="#EXTM3U\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v\n" for i in range(self.segments)
+        ))
+    
+    async def segment(self, request):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.throttle_above and self.in_flight > self.throttle_above:
+                self.throttled += 1
+                return web.Response(status=429)
+            
+            await asyncio.sleep(self.latency)
+            if self.bandwidth:
+                # Serialize bodies over one shared link of fixed bandwidth
+                now = time.monotonic()
+                start = max(now, self._link_free_at)
+                self._link_free_at = start + len(self.body) / self.bandwidth
+                await asyncio.sleep(self._link_free_at - now)
+            return web.Response(body=self.body)
+        finally:
+            self.in_flight -= 1
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_throttling_halves_limit_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, max_limit=16)
+        limiter.record_error(HttpStatusError("u", 429))
+        limiter.record_error(HttpStatusError("u", 429))
+        self.assertEqual(limiter.limit, 4)
+    
+    def test_limit_stays_within_bounds(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=3, min_limit=2)
+        limiter.set_limit(10)
+        self.assertEqual(limiter.limit, 3)
+        limiter.set_limit(0)
+        self.assertEqual(limiter.limit, 2)
+
+
+class TestAdaptiveDownload(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def download(self, cdn: SimulatedCDN, max_concurrency: int = 16) -> SegmentDownloader:
+        downloader = SegmentDownloader(
+            concurrency=max_concurrency,
+            retry_policy=RetryPolicy(attempts=10, base_delay=0.01, max_delay=0.05),
+            adaptive=True
+        )
+        
+        async def run():
+            async with TestServer(cdn.app()) as server:
+                return await downloader.download_video(str(server.make_url('/playlist.m3u8')), self.output)
+        
+        path = asyncio.run(run())
+        self.assertEqual(os.path.getsize(path), cdn.segments * len(cdn.body))
+        return downloader
+    
+    def test_ramps_up_on_latency_bound_link(self):
+        cdn = SimulatedCDN(segments=150, segment_size=1024, latency=0.02)
+        downloader = self.download(cdn)
+        
+        limits = [limit for _, limit in downloader.stats.concurrency_history]
+        self.assertEqual(limits[0], SegmentDownloader.ADAPTIVE_INITIAL_CONCURRENCY)
+        self.assertGreaterEqual(max(limits), 8)
+        self.assertGreaterEqual(cdn.peak_in_flight, 8)
+    
+    def test_backs_off_when_throttled(self):
+        cdn = SimulatedCDN(segments=150, segment_size=1024, latency=0.02, throttle_above=4)
+        downloader = self.download(cdn)
+        
+        self.assertGreater(cdn.throttled, 0)
+        self.assertGreater(downloader.stats.retries, 0)
+        # Every 429 burst is followed by a decrease, so the limit hovers near the threshold
+        self.assertLessEqual(downloader.stats.concurrency, 6)
+        limits = [limit for _, limit in downloader.stats.concurrency_history]
+        self.assertTrue(any(b < a for a, b in zip(limits, limits[1:])))
+    
+    def test_does_not_run_away_on_bandwidth_cap(self):
+        # 2 MB/s shared link: extra requests only add queueing latency
+        cdn = SimulatedCDN(segments=120, segment_size=32 * 1024, latency=0.002, bandwidth=2_000_000)
+        downloader = self.download(cdn)
+        
+        self.assertLessEqual(max(l for _, l in downloader.stats.concurrency_history), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
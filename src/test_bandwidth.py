@@ -0,0 +1,126 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.bandwidth import BandwidthLimiter, TokenBucket
+from core.segment_downloader import SegmentDownloader
+
+MB = 1024 * 1024
+SEGMENT = b'x' * (256 * 1024)
+
+
+class FastCDN:
+    """Local stand-in for the CDN that serves segments as fast as it can"""
+    
+    def __init__(self, segments: int):
+        self.segments = segments
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/{job}/playlist.m3u8', self.playlist)
+        app.router.add_get('/{job}/{name}', self.segment)
+        return app
+    
+    async def playlist(self, request):
+        return web.Response(text="#EXTM3U\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v\n" for i in range(self.segments)
+        ))
+    
+    async def segment(self, request):
+        return web.Response(body=SEGMENT)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_unlimited_never_waits(self):
+        bucket = TokenBucket(0)
+        self.assertEqual(bucket.reserve(100 * MB), 0)
+    
+    def test_debt_queues_consumers(self):
+        bucket = TokenBucket(MB)
+        first = bucket.reserve(MB)
+        second = bucket.reserve(MB)
+        self.assertAlmostEqual(first, 1.0, delta=0.01)
+        self.assertAlmostEqual(second, 2.0, delta=0.01)
+
+
+class TestBandwidthLimiter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    async def download_jobs(self, limiter: BandwidthLimiter, jobs: int, segments: int, rate_limits=None):
+        """Run `jobs` concurrent downloads; returns (bytes, seconds, per-job seconds)"""
+        rate_limits = rate_limits or [None] * jobs
+        async with TestServer(FastCDN(segments).app()) as server:
+            async def job(i):
+                downloader = SegmentDownloader(concurrency=4, bandwidth=limiter, rate_limit=rate_limits[i])
+                start = time.monotonic()
+                await downloader.download_video(
+                    str(server.make_url(f'/job{i}/playlist.m3u8')),
+                    os.path.join(self.temp_dir.name, f"job{i}")
+                )
+                return time.monotonic() - start
+            
+            start = time.monotonic()
+            durations = await asyncio.gather(*(job(i) for i in range(jobs)))
+            return jobs * segments * len(SEGMENT), time.monotonic() - start, durations
+    
+    def test_total_cap_is_shared_by_concurrent_jobs(self):
+        limiter = BandwidthLimiter(total_rate=4 * MB)
+        total, elapsed, _ = asyncio.run(self.download_jobs(limiter, jobs=3, segments=16))
+        
+        # 12 MB across three jobs at 4 MB/s
+        self.assertAlmostEqual(total / elapsed, 4 * MB, delta=0.05 * 4 * MB)
+    
+    def test_cap_covers_async_and_threaded_consumers(self):
+        # Blocking threads throttle through throttle_sync
+        limiter = BandwidthLimiter(total_rate=4 * MB)
+        threaded_bytes = 4 * MB
+        
+        def ytdlp_like():
+            for _ in range(threaded_bytes // len(SEGMENT)):
+                limiter.throttle_sync(len(SEGMENT))
+        
+        thread = threading.Thread(target=ytdlp_like)
+        start = time.monotonic()
+        thread.start()
+        total, _, _ = asyncio.run(self.download_jobs(limiter, jobs=2, segments=16))
+        thread.join()
+        elapsed = time.monotonic() - start
+        
+        self.assertAlmostEqual((total + threaded_bytes) / elapsed, 4 * MB, delta=0.05 * 4 * MB)
+    
+    def test_per_job_cap(self):
+        limiter = BandwidthLimiter(per_job_rate=2 * MB)
+        _, _, durations = asyncio.run(
+            self.download_jobs(limiter, jobs=2, segments=12, rate_limits=[None, 6 * MB])
+        )
+        
+        job_bytes = 12 * len(SEGMENT)
+        self.assertAlmostEqual(job_bytes / durations[0], 2 * MB, delta=0.05 * 2 * MB)
+        self.assertAlmostEqual(job_bytes / durations[1], 6 * MB, delta=0.1 * 6 * MB)
+    
+    def test_runtime_adjustment_applies_to_running_jobs(self):
+        limiter = BandwidthLimiter(per_job_rate=1 * MB)
+        
+        async def run():
+            task = asyncio.create_task(self.download_jobs(limiter, jobs=1, segments=16))
+            await asyncio.sleep(1.0)
+            # 1 MB done at 1 MB/s, the remaining 3 MB go at 3 MB/s
+            limiter.configure(0, 3 * MB)
+            return await task
+        
+        _, elapsed, _ = asyncio.run(run())
+        self.assertAlmostEqual(elapsed, 2.0, delta=0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
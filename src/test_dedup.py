@@ -0,0 +1,166 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PyQt6.QtCore import QCoreApplication
+
+from core.downloader import DownloadManager
+from core.segment_downloader import SegmentDownloader
+from core.shared_fetches import SharedFetches
+
+PLAYLIST = """#EXTM3U
+#EXTINF:10.0,
+seg1.ts
+#EXTINF:10.0,
+seg2.ts
+#EXTINF:10.0,
+seg3.ts
+#EXTINF:10.0,
+seg4.ts
+"""
+
+
+class SharedFetchesTest(unittest.TestCase):
+    def test_joined_request_is_fetched_once(self):
+        shared = SharedFetches()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b"data"
+
+        async def run():
+            return await asyncio.gather(shared.fetch("k", fetch), shared.fetch("k", fetch))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [(b"data", False), (b"data", True)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(shared), 0)
+
+    def test_request_outlives_the_job_that_started_it(self):
+        shared = SharedFetches()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return b"data"
+
+        async def run():
+            owner = asyncio.create_task(shared.fetch("k", fetch))
+            await asyncio.sleep(0)
+            joiner = asyncio.create_task(shared.fetch("k", fetch))
+            await asyncio.sleep(0)
+            owner.cancel()
+            return await joiner
+
+        self.assertEqual(asyncio.run(run()), (b"data", True))
+
+    def test_joiner_fetches_itself_after_failure(self):
+        shared = SharedFetches()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise Exception("expired signature")
+
+        async def fetch():
+            return b"own"
+
+        async def run():
+            return await asyncio.gather(
+                shared.fetch("k", failing), shared.fetch("k", fetch), return_exceptions=True
+            )
+
+        owner, joiner = asyncio.run(run())
+        self.assertIsInstance(owner, Exception)
+        self.assertEqual(joiner, (b"own", False))
+
+    def test_overlapping_downloads_share_segments(self):
+        fetched = []
+
+        async def fake_fetch_segment(downloader, url, byterange=None):
+            fetched.append(url.rsplit('/', 1)[-1])
+            await asyncio.sleep(0.02)
+            return url.encode()
+
+        async def fake_fetch_text(downloader, url):
+            return PLAYLIST
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.object(SegmentDownloader, '_fetch_segment', fake_fetch_segment), \
+                patch.object(SegmentDownloader, '_fetch_text', fake_fetch_text):
+            shared = SharedFetches()
+
+            async def run():
+                downloads = [
+                    SegmentDownloader(shared_fetches=shared).download_video(
+                        "http://test.com/playlist.m3u8",
+                        os.path.join(temp_dir, name),
+                        start_time=start,
+                        end_time=end,
+                        video_id="1"
+                    )
+                    for name, (start, end) in (("a", (0, 30)), ("b", (10, 40)))
+                ]
+                return await asyncio.gather(*downloads)
+
+            outputs = asyncio.run(run())
+            self.assertEqual(sorted(fetched), ["seg1.ts", "seg2.ts", "seg3.ts", "seg4.ts"])
+            with open(outputs[1], 'rb') as f:
+                self.assertEqual(f.read(), b"http://test.com/seg2.tshttp://test.com/seg3.tshttp://test.com/seg4.ts")
+
+
+class DownloadManagerDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = DownloadManager()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _start(self, title="video", start_time=None, end_time=None):
+        return self.manager.start_download(
+            video_id="1",
+            url="https://example.com/master.m3u8",
+            title=title,
+            quality="1080p",
+            output_dir=self.temp_dir.name,
+            use_manual_download=True,
+            start_time=start_time,
+            end_time=end_time
+        )
+
+    def test_duplicate_attaches_to_unfinished_download(self):
+        first = self._start()
+        self.assertEqual(self._start(), first)
+        self.assertEqual(len(self.manager.active_downloads), 1)
+
+        # A completed download may be fetched again
+        self.manager.get_worker(first).is_completed = True
+        self.assertNotEqual(self._start(), first)
+
+    def test_other_range_gets_its_own_file(self):
+        whole = self._start()
+        part = self._start(start_time=0, end_time=60)
+        self.assertNotEqual(part, whole)
+        self.assertNotEqual(self.manager.get_worker(part).output_path, self.manager.get_worker(whole).output_path)
+
+    def test_range_parts_reuse_existing_downloads(self):
+        existing = self._start(title="part 1", start_time=0, end_time=60)
+        download_ids = self.manager.start_range_downloads(
+            video_id="1",
+            url="https://example.com/master.m3u8",
+            titles=["part 1", "part 2"],
+            quality="1080p",
+            output_dir=self.temp_dir.name,
+            ranges=[(0, 60), (60, 120)]
+        )
+        self.assertEqual(download_ids[0], existing)
+        self.assertEqual(len(self.manager.active_downloads), 2)
+        self.assertEqual(self.manager.get_worker(download_ids[1]).start_time, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from PyQt6.QtCore import QCoreApplication, Qt
+
+from core.download_engine import get_download_engine
+from core.downloader import DownloadManager, DownloadWorker
+from core.http_client import get_http_client
+from core.segment_downloader import SegmentDownloader
+
+
+class TestDownloadEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = get_download_engine()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_jobs_share_one_thread(self):
+        async def job(index):
+            await asyncio.sleep(0.05)
+            return index, threading.current_thread().name
+
+        self.engine.loop  # start the engine thread
+        threads_before = threading.active_count()
+        futures = [self.engine.submit(job(i)) for i in range(300)]
+        threads_during = threading.active_count()
+        results = [future.result(timeout=10) for future in futures]
+
+        self.assertEqual([index for index, _ in results], list(range(300)))
+        self.assertEqual({name for _, name in results}, {"download-engine"})
+        self.assertEqual(threads_during, threads_before)
+
+    def test_direct_downloads_are_engine_tasks(self):
+        data = os.urandom(256 * 1024)
+
+        async def clip(request):
+            return web.Response(body=data)
+
+        app = web.Application()
+        app.router.add_get('/clip.mp4', clip)
+        server = TestServer(app)
+        self.engine.submit(server.start_server()).result(timeout=10)
+        try:
+            reused_before = get_http_client().stats.connections_reused
+            completed = []
+            workers = []
+            for i in range(12):
+                worker = DownloadWorker(
+                    str(server.make_url('/clip.mp4')),
+                    os.path.join(self.temp_dir.name, f"clip{i}"),
+                    direct_download=True
+                )
+                worker.download_completed.connect(
+                    lambda path: completed.append((path, threading.current_thread().name)),
+                    Qt.ConnectionType.DirectConnection
+                )
+                workers.append(worker)
+
+            # In two waves, so the second finds kept-alive connections
+            for wave in (workers[:6], workers[6:]):
+                for worker in wave:
+                    worker.start()
+                for worker in wave:
+                    self.assertTrue(worker.wait(10))
+        finally:
+            self.engine.submit(server.close()).result(timeout=10)
+
+        self.assertEqual(len(completed), 12)
+        self.assertEqual({name for _, name in completed}, {"download-engine"})
+        for path, _ in completed:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+        # Jobs share the engine's connection pool
+        self.assertGreater(get_http_client().stats.connections_reused, reused_before)
+
+    def test_cancel_does_not_wait_for_the_job(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        fetching = threading.Event()
+
+        async def fetch_master_url(worker, api):
+            return "http://test.com/master.m3u8"
+
+        async def fetch_text(downloader, url):
+            return "#EXTM3U\n#EXTINF:10.0,\nseg0.ts\n#EXTINF:10.0,\nseg1.ts\n"
+
+        async def stalled_fetch(downloader, url, byterange=None):
+            # A stalled request, or a long retry backoff
+            fetching.set()
+            await asyncio.sleep(60)
+
+        manager = DownloadManager()
+        with patch.object(DownloadWorker, '_fetch_master_url', fetch_master_url), \
+                patch.object(SegmentDownloader, '_fetch_text', fetch_text), \
+                patch.object(SegmentDownloader, '_fetch_segment', stalled_fetch):
+            download_id = manager.start_download(
+                video_id="stalled",
+                url="https://example.com/master.m3u8",
+                title="stalled",
+                quality="1080p",
+                output_dir=self.temp_dir.name,
+                use_manual_download=True
+            )
+            worker = manager.get_worker(download_id)
+            errors = []
+            worker.download_error.connect(errors.append)
+            manager.enqueue_download(download_id)
+            self.assertTrue(fetching.wait(5))
+
+            started = time.monotonic()
+            manager.cancel_download(download_id)
+            self.assertLess(time.monotonic() - started, 0.5)
+            # The cancelled task lets go of its slot through `finished`
+            while manager.scheduler.state(download_id) is not None and time.monotonic() - started < 5:
+                app.processEvents()
+                time.sleep(0.01)
+            self.assertLess(time.monotonic() - started, 2)
+
+        self.assertFalse(worker.isRunning())
+        self.assertEqual(errors, ["Download cancelled by user"])
+        # The partial output and journal are gone
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import asyncio
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from core.downloader import DownloadWorker
+from core.engine_selector import MANUAL, YTDLP, EngineSelector
+from core.ytdlp_process import get_ytdlp_pool
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class TestEngineSelector(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "engine_choices.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_decisions_persist_and_expire(self):
+        key = EngineSelector.key("https://cdn.example.com/a/master.m3u8?sig=1", "vod:ABR_HLS")
+        self.assertEqual(key, "cdn.example.com|vod:ABR_HLS")
+
+        selector = EngineSelector(self.path)
+        self.assertIsNone(selector.lookup(key))
+        selector.record(key, MANUAL, {MANUAL: 8e6, YTDLP: 3e6})
+
+        # A new process reads the table back
+        self.assertEqual(EngineSelector(self.path).lookup(key), MANUAL)
+
+        with mock.patch('core.engine_selector.time.time', return_value=time.time() + EngineSelector.DEFAULT_TTL + 1):
+            self.assertIsNone(selector.lookup(key))
+            self.assertIsNone(EngineSelector(self.path).lookup(key))
+
+        selector.forget(key)
+        self.assertIsNone(EngineSelector(self.path).lookup(key))
+
+    def test_choose_ignores_failed_probes(self):
+        self.assertEqual(EngineSelector.choose({MANUAL: 5e6, YTDLP: 7e6}), YTDLP)
+        self.assertEqual(EngineSelector.choose({MANUAL: 5e6, YTDLP: None}), MANUAL)
+        self.assertIsNone(EngineSelector.choose({MANUAL: None, YTDLP: None}))
+
+
+class TestEngineProbe(unittest.TestCase):
+    def setUp(self):
+        self.selector = EngineSelector()
+        patcher = mock.patch('core.downloader.get_engine_selector', return_value=self.selector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_worker(self, manual_rate, ytdlp_rate, use_manual_download=False):
+        worker = DownloadWorker("https://cdn.example.com/v.m3u8", "/tmp/out", engine_key="key",
+                                use_manual_download=use_manual_download)
+        worker._probe_manual = mock.AsyncMock(return_value=(manual_rate, 1000))
+        worker._probe_ytdlp = mock.Mock(return_value=ytdlp_rate)
+        worker._run_manual_download = mock.AsyncMock()
+        worker._run_ytdlp_download = mock.Mock()
+        asyncio.run(worker._run_selected())
+        return worker
+
+    def test_faster_engine_is_used_and_remembered(self):
+        worker = self.run_worker(9e6, 2e6)
+        worker._run_manual_download.assert_awaited_once_with([worker])
+        worker._run_ytdlp_download.assert_not_called()
+        worker._probe_ytdlp.assert_called_once()
+        self.assertEqual(worker._probe_ytdlp.call_args.args[1], 1000)
+        self.assertEqual(self.selector.lookup("key"), MANUAL)
+        self.assertIsNone(worker.engine_key)
+
+        # The next job of the key skips the probes
+        worker = self.run_worker(1e6, 9e6)
+        worker._probe_manual.assert_not_awaited()
+        worker._run_manual_download.assert_awaited_once()
+
+    def test_failed_probes_fall_back_without_recording(self):
+        worker = self.run_worker(None, None, use_manual_download=False)
+        worker._run_ytdlp_download.assert_called_once()
+        self.assertIsNone(self.selector.lookup("key"))
+
+    def test_ytdlp_probe_stops_after_target_bytes(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'v.mp4'), 'wb') as f:
+                f.write(os.urandom(16 * 1024 * 1024))
+            handler = functools.partial(QuietHandler, directory=root)
+            server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                worker = DownloadWorker(f"http://127.0.0.1:{server.server_port}/v.mp4", os.path.join(root, "out"))
+                rate = worker._probe_ytdlp(os.path.join(root, "probe"), 1024 * 1024)
+            finally:
+                server.shutdown()
+                server.server_close()
+                get_ytdlp_pool().shutdown()
+
+        self.assertGreater(rate, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
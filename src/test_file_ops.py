@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core import file_ops
+from core.file_ops import append_file
+
+
+class TestAppendFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.temp_dir.name, "src")
+        self.dst = os.path.join(self.temp_dir.name, "dst")
+        self.data = os.urandom(10000)
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def append(self):
+        with open(self.dst, 'wb') as dst:
+            # Buffered bytes ahead of the append must land first
+            dst.write(b"head")
+            copied = append_file(dst, self.src)
+            offset = dst.tell()
+            dst.write(b"tail")
+        with open(self.dst, 'rb') as f:
+            content = f.read()
+        self.assertEqual(copied, len(self.data))
+        self.assertEqual(offset, 4 + len(self.data))
+        self.assertEqual(content, b"head" + self.data + b"tail")
+
+    @unittest.skipUnless(hasattr(os, 'sendfile'), "no os.sendfile")
+    def test_sendfile_fallback(self):
+        with patch.object(file_ops, '_use_copy_file_range', False), \
+                patch.object(file_ops, '_use_sendfile', True):
+            self.append()
+
+    def test_readinto_fallback(self):
+        # A small buffer so the copy loop runs several times
+        with patch.object(file_ops, '_use_copy_file_range', False), \
+                patch.object(file_ops, '_use_sendfile', False), \
+                patch.object(file_ops, 'COPY_BUFFER_SIZE', 4096):
+            self.append()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+from core.file_writer import BackgroundFileWriter
+
+
+class SlowFile(io.BytesIO):
+    """In-memory file whose writes take `delay` seconds"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        time.sleep(self.delay)
+        return super().write(data)
+
+    def close(self):
+        self.final = self.getvalue()
+        super().close()
+
+
+class TestBackgroundFileWriter(unittest.TestCase):
+    def test_coalesces_and_keeps_order(self):
+        f = SlowFile(0.0)
+
+        async def run():
+            writer = BackgroundFileWriter(f, buffer_size=64, max_buffers=2)
+            for i in range(100):
+                await writer.write(b"%03d" % i)
+            await writer.call(f.write, b"|")
+            await writer.write(b"x" * 200)
+            await writer.close()
+
+        asyncio.run(run())
+        self.assertEqual(f.final, b"".join(b"%03d" % i for i in range(100)) + b"|" + b"x" * 200)
+        # 300 bytes in 64-byte buffers, the call, and the large write handed over as is
+        self.assertEqual(f.writes, 7)
+
+    def test_slow_disk_does_not_block_the_loop(self):
+        f = SlowFile(0.05)
+
+        async def run():
+            writer = BackgroundFileWriter(f, buffer_size=16, max_buffers=4)
+            gaps = []
+
+            async def ticker():
+                last = time.monotonic()
+                while True:
+                    await asyncio.sleep(0.005)
+                    now = time.monotonic()
+                    gaps.append(now - last)
+                    last = now
+
+            task = asyncio.create_task(ticker())
+            for _ in range(20):
+                await writer.write(b"a" * 16)
+            await writer.close()
+            task.cancel()
+            return max(gaps)
+
+        self.assertLess(asyncio.run(run()), 0.04)
+        self.assertEqual(f.final, b"a" * 320)
+
+    def test_write_error_is_raised(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            f = open(os.path.join(temp_dir, "out"), 'wb')
+
+            async def run():
+                writer = BackgroundFileWriter(f, buffer_size=4)
+                await writer.call(f.close)
+                await writer.write(b"data")
+                await writer.drain()
+
+            with self.assertRaises(ValueError):
+                asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import asyncio
+import os
+import tempfile
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.playlist import MediaPlaylistParser
+from core.segment_downloader import SegmentDownloader
+
+
+class GrowingPlaylist:
+    """Local server whose media playlist gains segments over time"""
+
+    def __init__(self, total: int, per_reload: int = 2, ended: bool = True, delay: float = 0):
+        self.total = total
+        self.per_reload = per_reload
+        self.ended = ended
+        self.delay = delay
+        self.available = per_reload
+        self.reloads = 0
+        self.not_modified = 0
+        self.fetched = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/playlist.m3u8', self.playlist)
+        app.router.add_get('/{name}', self.segment)
+        return app
+
+    def text(self) -> str:
+        content = '#EXTM3U\n#EXT-X-TARGETDURATION:0\n#EXT-X-MAP:URI="init.m4s"\n' + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v\n" for i in range(self.available)
+        )
+        if self.ended and self.available == self.total:
+            content += "#EXT-X-ENDLIST\n"
+        return content
+
+    async def playlist(self, request):
+        self.reloads += 1
+        etag = f'"{self.available}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            # The next reload sees more segments
+            self.available = min(self.available + self.per_reload, self.total)
+            return web.Response(status=304)
+        return web.Response(text=self.text(), headers={'ETag': etag})
+
+    async def segment(self, request):
+        name = request.match_info['name']
+        self.fetched.append(name)
+        await asyncio.sleep(self.delay)
+        return web.Response(body=name.encode())
+
+
+class TestIncrementalParser(unittest.TestCase):
+    def test_update_parses_appended_lines_only(self):
+        parser = MediaPlaylistParser()
+        head = "#EXTM3U\n#EXTINF:2,\n#EXT-X-BYTERANGE:100@0\na.mp4\n"
+        self.assertEqual(parser.update(head), 1)
+        self.assertEqual(parser.update(head), 0)
+        # Byte ranges continue across updates
+        self.assertEqual(parser.update(head + "#EXTINF:3,\n#EXT-X-BYTERANGE:50\na.mp4\n#EXT-X-ENDLIST\n"), 1)
+        playlist = parser.playlist
+        self.assertEqual(playlist.byterange(1), (100, 50))
+        self.assertEqual(playlist.total_duration, 5.0)
+        self.assertTrue(playlist.ended)
+        # Anything but an append needs a fresh parse
+        self.assertIsNone(parser.update(head.replace("a.mp4", "a.mp4?sig=2")))
+
+
+class TestFollowMode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def follow(self, server_state, **kwargs):
+        downloader = SegmentDownloader(concurrency=4)
+        downloader.FOLLOW_MIN_POLL_INTERVAL = 0.01
+        progress = []
+
+        async def run():
+            async with TestServer(server_state.app()) as server:
+                return await downloader.follow_video(
+                    str(server.make_url('/playlist.m3u8')),
+                    self.output,
+                    lambda current, total: progress.append((current, total)),
+                    **kwargs
+                )
+
+        return asyncio.run(run()), progress
+
+    def test_follows_until_endlist(self):
+        state = GrowingPlaylist(total=7)
+        path, progress = self.follow(state)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(7)))
+        # Every segment is fetched once; unchanged reloads are answered with 304
+        self.assertEqual(sorted(state.fetched), sorted(["init.m4s"] + [f"seg{i}.m4v" for i in range(7)]))
+        self.assertGreater(state.not_modified, 0)
+        self.assertEqual(progress[-1], (8, 8))
+        self.assertFalse(os.path.exists(f"{path}.journal"))
+
+    def test_stops_at_end_time_and_idle_timeout(self):
+        state = GrowingPlaylist(total=20)
+        path, _ = self.follow(state, end_time=7.0)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(4)))
+
+        # A playlist that stops growing without an ENDLIST keeps what was captured
+        state = GrowingPlaylist(total=3, ended=False)
+        path, _ = self.follow(state, idle_timeout=0.2)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(3)))
+
+    def test_slow_batch_does_not_count_as_idle(self):
+        # The first batch alone takes longer than the idle timeout
+        state = GrowingPlaylist(total=8, per_reload=4, delay=0.2)
+        path, _ = self.follow(state, idle_timeout=0.3)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(8)))
+        self.assertGreater(state.reloads, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
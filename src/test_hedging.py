@@ -0,0 +1,97 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.hedging import HedgePolicy
+from core.retry import RetryPolicy
+from core.segment_downloader import SegmentDownloader
+
+
+class StallingCDN:
+    """Local CDN whose first response for some segments stalls"""
+
+    def __init__(self, segments: int, stall: set, latency: float = 0.01, stall_time: float = 5.0):
+        self.segments = segments
+        self.stall = stall
+        self.latency = latency
+        self.stall_time = stall_time
+        self.requests = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/playlist.m3u8', self.playlist)
+        app.router.add_get('/{name}', self.segment)
+        return app
+
+    async def playlist(self, request):
+        return web.Response(text="#EXTM3U\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v\n" for i in range(self.segments)
+        ))
+
+    async def segment(self, request):
+        name = request.match_info['name']
+        self.requests[name] = self.requests.get(name, 0) + 1
+        index = int(name[3:].split('.')[0])
+        if index in self.stall and self.requests[name] == 1:
+            await asyncio.sleep(self.stall_time)
+        await asyncio.sleep(self.latency)
+        return web.Response(body=name.encode())
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_deadline_from_latency_percentile(self):
+        policy = HedgePolicy(percentile=0.9, min_samples=10, min_delay=0.0)
+        for i in range(9):
+            policy.record(0.1 * (i + 1), 1000)
+        self.assertIsNone(policy.deadline())
+        policy.record(1.0, 1000)
+        self.assertAlmostEqual(policy.deadline(), 0.9)
+
+    def test_extra_bytes_are_capped(self):
+        policy = HedgePolicy(max_extra_fraction=0.1)
+        self.assertFalse(policy.try_hedge())
+        for _ in range(20):
+            policy.record(0.1, 1000)
+        # 10% of 20 segments' bytes pays for two hedges of the mean size
+        self.assertEqual([policy.try_hedge() for _ in range(3)], [True, True, False])
+
+
+class TestHedgedDownload(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_slow_tail_segments_are_hedged(self):
+        cdn = StallingCDN(segments=60, stall={45, 58})
+        downloader = SegmentDownloader(
+            concurrency=4,
+            retry_policy=RetryPolicy(attempts=1),
+            hedging=HedgePolicy(min_samples=8, min_delay=0.05)
+        )
+
+        async def run():
+            async with TestServer(cdn.app()) as server:
+                return await downloader.download_video(str(server.make_url('/playlist.m3u8')), self.output)
+
+        started = time.monotonic()
+        path = asyncio.run(run())
+
+        # The stalled originals are abandoned instead of waited for
+        self.assertLess(time.monotonic() - started, cdn.stall_time)
+        self.assertEqual(downloader.stats.hedges, 2)
+        self.assertEqual(downloader.stats.hedge_wins, 2)
+        self.assertEqual(cdn.requests["seg45.m4v"], 2)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"".join(f"seg{i}.m4v".encode() for i in range(60)))
+
+
+if __name__ == '__main__':
+    unittest.main()
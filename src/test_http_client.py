@@ -0,0 +1,61 @@
+import unittest
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.download_stats import DownloadStats
+from core.http_client import HttpClient
+
+
+async def echo(request):
+    response = web.Response(text=request.headers.get('X-Job', '') + '|' + request.headers.get('Cookie', ''))
+    response.set_cookie('tracking', '1')
+    return response
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.client = HttpClient()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', echo)
+        return app
+
+    def test_jobs_share_kept_alive_connections(self):
+        stats = DownloadStats()
+
+        async def run():
+            async with TestServer(self.app()) as server:
+                url = str(server.make_url('/'))
+                bodies = []
+                for job in ("a", "b"):
+                    async with self.client.bind({'X-Job': job}, {'sid': job}, stats=stats) as session:
+                        for _ in range(3):
+                            async with session.get(url) as response:
+                                bodies.append(await response.text())
+                await self.client.close()
+                return bodies
+
+        bodies = asyncio.run(run())
+
+        # Each job sends its own headers and cookies; Set-Cookie is not kept
+        self.assertEqual(bodies, ["a|sid=a"] * 3 + ["b|sid=b"] * 3)
+        self.assertEqual(self.client.stats.requests, 6)
+        self.assertEqual(self.client.stats.connections_created, 1)
+        self.assertEqual(self.client.stats.connections_reused, 5)
+        self.assertEqual((stats.connections_created, stats.connections_reused), (1, 5))
+
+    def test_blocking_fetch(self):
+        async def run():
+            async with TestServer(self.app()) as server:
+                url = str(server.make_url('/'))
+                # Served by the client's own loop while this one waits in a thread
+                return await asyncio.to_thread(self.client.fetch_bytes_sync, url, {'X-Job': 'thumb'})
+
+        self.assertEqual(asyncio.run(run()), b"thumb|")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+from core.job_scheduler import JobScheduler, QUEUED, RUNNING, PAUSED, FINISHED
+
+
+class JobSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.started = []
+        self.stopped = []
+        self.scheduler = JobScheduler(self.started.append, self.stopped.append, max_active=2)
+
+    def test_bounded_fifo(self):
+        for job_id in "abcd":
+            self.scheduler.enqueue(job_id)
+        self.assertEqual(self.started, ["a", "b"])
+        self.assertEqual(self.scheduler.queued(), ["c", "d"])
+        self.assertEqual(self.scheduler.position("d"), 1)
+
+        self.scheduler.finished("a")
+        self.assertEqual(self.started, ["a", "b", "c"])
+        self.assertEqual(self.scheduler.state("a"), FINISHED)
+        self.assertEqual(self.scheduler.state("c"), RUNNING)
+
+    def test_priority_then_arrival(self):
+        for job_id in "ab":
+            self.scheduler.enqueue(job_id)
+        self.scheduler.enqueue("low")
+        self.scheduler.enqueue("high", priority=5)
+        self.scheduler.enqueue("high2", priority=5)
+        self.assertEqual(self.scheduler.queued(), ["high", "high2", "low"])
+
+    def test_promote_and_move(self):
+        for job_id in "abcde":
+            self.scheduler.enqueue(job_id)
+        self.scheduler.promote("e")
+        self.assertEqual(self.scheduler.queued(), ["e", "c", "d"])
+
+        self.assertTrue(self.scheduler.move("d", -1))
+        self.assertEqual(self.scheduler.queued(), ["e", "d", "c"])
+        self.assertFalse(self.scheduler.move("e", -1))
+
+        # A later job of the moved job's priority still lines up behind it
+        self.scheduler.enqueue("f")
+        self.assertEqual(self.scheduler.queued(), ["e", "d", "c", "f"])
+
+    def test_pause_running_waits_for_stop(self):
+        for job_id in "abc":
+            self.scheduler.enqueue(job_id)
+        self.assertTrue(self.scheduler.pause("a"))
+        self.assertEqual(self.stopped, ["a"])
+        self.assertEqual(self.scheduler.state("a"), PAUSED)
+        # Slot is still held until the job has stopped
+        self.assertEqual(self.started, ["a", "b"])
+
+        # Continued before it stopped: queued, but not started twice
+        self.scheduler.enqueue("a")
+        self.assertEqual(self.scheduler.state("a"), QUEUED)
+        self.scheduler.finished("b")
+        self.assertEqual(self.started, ["a", "b", "c"])
+
+        self.scheduler.finished("a")
+        self.assertEqual(self.started, ["a", "b", "c", "a"])
+
+    def test_pause_queued_and_remove(self):
+        for job_id in "abc":
+            self.scheduler.enqueue(job_id)
+        self.scheduler.pause("c")
+        self.assertEqual(self.scheduler.queued(), [])
+        self.assertEqual(self.stopped, [])
+
+        self.scheduler.remove("a")
+        self.assertEqual(self.started, ["a", "b"])
+        self.scheduler.enqueue("c")
+        self.assertEqual(self.started, ["a", "b", "c"])
+
+    def test_set_max_active(self):
+        for job_id in "abcd":
+            self.scheduler.enqueue(job_id)
+        self.scheduler.set_max_active(4)
+        self.assertEqual(self.started, ["a", "b", "c", "d"])
+        self.assertFalse(self.scheduler.enqueue("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from PyQt6.QtCore import QCoreApplication
+
+from core.downloader import DownloadManager
+from core.job_scheduler import PAUSED, QUEUED
+from core.job_store import FAILED, JobStore
+
+
+class JobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "jobs.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_progress_is_batched_until_flush(self):
+        store = JobStore(self.path)
+        store.add("a", {'title': "A"}, QUEUED, journal_path="/tmp/a.mp4.journal")
+        store.update_progress("a", 10, 1000)
+        store.update_progress("a", 20, 2000)
+
+        reader = JobStore(self.path)
+        self.assertEqual(reader.load()[0]['progress'], 0)
+        store.flush()
+        job = reader.load()[0]
+        self.assertEqual((job['progress'], job['bytes_done']), (20, 2000))
+        self.assertEqual(job['params'], {'title': "A"})
+        self.assertEqual(job['journal_path'], "/tmp/a.mp4.journal")
+        reader.close()
+        store.close()
+
+    def test_survives_reopen(self):
+        store = JobStore(self.path)
+        store.add("a", {'title': "A"}, QUEUED)
+        store.add("b", {'title': "B"}, QUEUED)
+        store.update("a", state=PAUSED, priority=3)
+        store.update_progress("b", 50, 5000)
+        store.remove("b")
+        # Adding a stored job again keeps its row
+        store.add("a", {'title': "changed"}, QUEUED)
+        store.close()
+
+        store = JobStore(self.path)
+        jobs = store.load()
+        self.assertEqual([job['id'] for job in jobs], ["a"])
+        self.assertEqual((jobs[0]['state'], jobs[0]['priority']), (PAUSED, 3))
+        self.assertEqual(jobs[0]['params'], {'title': "A"})
+        store.close()
+
+
+class DownloadManagerRestoreTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "jobs.db")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _start(self, manager, title):
+        return manager.start_download(
+            video_id=title,
+            url="https://example.com/master.m3u8",
+            title=title,
+            quality="1080p",
+            output_dir=self.temp_dir.name,
+            use_manual_download=True
+        )
+
+    def test_queue_is_restored(self):
+        manager = DownloadManager(max_active=1, job_store=JobStore(self.path))
+        # Keep the jobs from running
+        manager.scheduler.start_job = lambda download_id: None
+        first = self._start(manager, "first")
+        second = self._start(manager, "second")
+        third = self._start(manager, "third")
+        for download_id in (first, second, third):
+            manager.enqueue_download(download_id)
+        manager.pause_download(third)
+        manager.close()
+
+        manager = DownloadManager(max_active=1, job_store=JobStore(self.path))
+        started = []
+        manager.scheduler.start_job = started.append
+        jobs = manager.restore_jobs()
+        self.assertEqual([job['id'] for job in jobs], [first, second, third])
+        self.assertEqual(manager.get_worker(second).output_path, os.path.join(self.temp_dir.name, "second_1080p"))
+        self.assertTrue(jobs[0]['journal_path'].endswith("first_1080p.mp4.journal"))
+
+        manager.resume_restored(jobs)
+        self.assertEqual(started, [first])
+        self.assertEqual(manager.get_state(second), QUEUED)
+        self.assertEqual(manager.get_state(third), PAUSED)
+
+        manager.scheduler.finished(first)
+        manager.close()
+        states = {job['id']: job['state'] for job in JobStore(self.path).load()}
+        self.assertEqual(states[first], FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
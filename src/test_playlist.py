@@ -0,0 +1,134 @@
+import unittest
+import random
+from core.playlist import parse_attributes, parse_master_playlist, parse_media_playlist
+from core.segment_downloader import SegmentDownloader
+
+
+class TestMediaPlaylist(unittest.TestCase):
+    def test_tags(self):
+        playlist = parse_media_playlist("""#EXTM3U
+#EXT-X-TARGETDURATION:4
+#EXT-X-MEDIA-SEQUENCE:120
+#EXT-X-MAP:URI="init.mp4",BYTERANGE="700@0"
+#EXT-X-PROGRAM-DATE-TIME:2024-01-01T00:00:00Z
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:1000@700
+media.mp4
+#EXTINF:4.0,
+#EXT-X-BYTERANGE:1200
+media.mp4
+#EXT-X-DISCONTINUITY
+#EXT-X-MAP:URI="init2.mp4"
+#EXTINF:2.5,title
+other.m4s
+#EXT-X-ENDLIST
+""")
+        self.assertEqual(len(playlist), 3)
+        self.assertEqual(playlist.media_sequence, 120)
+        self.assertEqual(playlist.target_duration, 4.0)
+        self.assertTrue(playlist.ended)
+        self.assertEqual(playlist.total_duration, 10.5)
+
+        # Byte ranges without an offset continue the previous sub-range
+        self.assertEqual(playlist.byterange(0), (700, 1000))
+        self.assertEqual(playlist.byterange(1), (1700, 1200))
+        self.assertIsNone(playlist.byterange(2))
+
+        self.assertEqual(list(playlist.discontinuities), [2])
+        self.assertEqual(playlist.maps, [("init.mp4", (0, 700)), ("init2.mp4", None)])
+        self.assertEqual([playlist.map_index(i) for i in range(3)], [0, 0, 1])
+        self.assertEqual(playlist.init_segment, "init.mp4")
+        self.assertEqual(playlist.program_date_time(2), 1704067200.0 + 8.0)
+
+    def test_range_lookup_matches_linear_scan(self):
+        rng = random.Random(7)
+        playlist = parse_media_playlist("#EXTM3U\n" + "".join(
+            f"#EXTINF:{rng.choice([0.0, 1.5, 2.0, 4.0])},\nseg{i}.ts\n" for i in range(300)
+        ))
+
+        def linear(start, end):
+            result, current = [], 0.0
+            for i in range(len(playlist)):
+                duration = playlist.duration(i)
+                if (start is None or current + duration > start) and (end is None or current < end):
+                    result.append(i)
+                current += duration
+            return result
+
+        points = [None, 0.0, playlist.total_duration, playlist.total_duration + 5]
+        points += [rng.uniform(0, playlist.total_duration) for _ in range(40)]
+        points += [playlist.starts[rng.randrange(len(playlist))] for _ in range(40)]
+        for start in points:
+            for end in rng.sample(points, 10):
+                self.assertEqual(list(playlist.range_indices(start, end)), linear(start, end), (start, end))
+
+    def test_attributes(self):
+        self.assertEqual(
+            parse_attributes('BANDWIDTH=5000000,CODECS="avc1.64002a,mp4a.40.2",RESOLUTION=1920x1080'),
+            {'BANDWIDTH': '5000000', 'CODECS': 'avc1.64002a,mp4a.40.2', 'RESOLUTION': '1920x1080'}
+        )
+
+    def test_parts_insert_init_segment_on_map_change(self):
+        playlist = parse_media_playlist(
+            '#EXTM3U\n#EXT-X-MAP:URI="a.mp4"\n#EXTINF:2,\n1.m4s\n#EXTINF:2,\n2.m4s\n'
+            '#EXT-X-MAP:URI="b.mp4"\n#EXTINF:2,\n3.m4s\n'
+        )
+        downloader = SegmentDownloader()
+        positions = downloader._part_positions_for(playlist, playlist.range_indices(2.0))
+        self.assertEqual(positions, [-1, 1, -2, 2])
+        self.assertEqual(
+            downloader._resolve_part_urls(playlist, "http://cdn/v/index.m3u8", positions),
+            ["http://cdn/v/a.mp4", "http://cdn/v/2.m4s", "http://cdn/v/b.mp4", "http://cdn/v/3.m4s"]
+        )
+
+
+MASTER = """#EXTM3U
+#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aac",NAME="Korean",DEFAULT=YES,URI="audio/index.m3u8"
+#EXT-X-STREAM-INF:BANDWIDTH=8000000,AVERAGE-BANDWIDTH=6000000,RESOLUTION=1920x1080,FRAME-RATE=60.000,CODECS="avc1.64002a,mp4a.40.2",AUDIO="aac"
+1080p60/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080,FRAME-RATE=30.000,CODECS="avc1.640028,mp4a.40.2",AUDIO="aac"
+1080p30/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,RESOLUTION=1280x720,FRAME-RATE=60.000
+720p/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=854x480
+480p/index.m3u8
+"""
+
+
+class TestMasterPlaylist(unittest.TestCase):
+    def test_structured_variants(self):
+        master = parse_master_playlist(MASTER)
+        self.assertEqual([v.label for v in master.variants], ["1080p", "1080p", "720p", "480p"])
+        best = master.variants[0]
+        self.assertEqual((best.width, best.height, best.frame_rate), (1920, 1080, 60.0))
+        self.assertEqual(best.effective_bandwidth, 6000000)
+        self.assertEqual(best.codecs, ["avc1.64002a", "mp4a.40.2"])
+        self.assertEqual(best.audio, "aac")
+        self.assertEqual(master.media["aac"][0]["URI"], "audio/index.m3u8")
+
+    def test_selection_policies(self):
+        master = parse_master_playlist(MASTER)
+        self.assertEqual(master.select("1080p").uri, "1080p60/index.m3u8")
+        self.assertEqual(master.select("1080p", max_bandwidth=5500000).uri, "1080p30/index.m3u8")
+        self.assertEqual(master.select("480p").uri, "480p/index.m3u8")
+        # Nothing is picked for a height the ladder doesn't have (e.g. 852x480 vs 854x480)
+        self.assertIsNone(master.select("360p"))
+        self.assertEqual(master.select(None, max_bandwidth=3000000).uri, "720p/index.m3u8")
+        self.assertEqual(master.select(None, max_bandwidth=100).uri, "480p/index.m3u8")
+        self.assertEqual(master.select("lowest").uri, "480p/index.m3u8")
+        self.assertEqual(master.select("best").uri, "1080p60/index.m3u8")
+
+        # Ladders without RESOLUTION fall back to the label in the URI
+        bare = parse_master_playlist("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nhd/720p/a.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=2\nhd/1080p/a.m3u8\n")
+        self.assertEqual(bare.select("720p").uri, "hd/720p/a.m3u8")
+
+    def test_downloader_resolves_variant_url(self):
+        downloader = SegmentDownloader(max_bandwidth=3000000)
+        self.assertEqual(
+            downloader._extract_media_url(MASTER, "https://cdn/v/", None),
+            "https://cdn/v/720p/index.m3u8"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+from PyQt6.QtCore import QCoreApplication, QObject, pyqtSignal
+
+from core.progress_aggregator import ProgressAggregator
+
+
+class FakeJob(QObject):
+    progress_updated = pyqtSignal(int, float, int)
+    status_changed = pyqtSignal(str)
+
+
+class ProgressAggregatorTest(unittest.TestCase):
+    def setUp(self):
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.aggregator = ProgressAggregator(rate=10)
+
+    def _record(self, job):
+        received = []
+        job.progress_updated.connect(lambda *args: received.append(('progress', args)))
+        job.status_changed.connect(lambda status: received.append(('status', status)))
+        return received
+
+    def test_only_latest_changed_values_are_delivered(self):
+        job = FakeJob()
+        received = self._record(job)
+        for i in range(10):
+            self.aggregator.report_progress(job, i, 1.0, 5)
+            self.aggregator.report_status(job, f"{i}/10")
+        self.aggregator.flush()
+        self.assertEqual(received, [('status', "9/10"), ('progress', (9, 1.0, 5))])
+
+        # Same values again: nothing to deliver
+        self.aggregator.report_progress(job, 9, 1.0, 5)
+        self.aggregator.flush()
+        self.assertEqual(len(received), 2)
+
+    def test_status_function_runs_at_delivery(self):
+        job = FakeJob()
+        received = self._record(job)
+        calls = []
+        for i in range(5):
+            self.aggregator.report_status(job, lambda i=i: calls.append(i) or f"segment {i}")
+        self.aggregator.flush()
+        self.assertEqual(calls, [4])
+        self.assertEqual(received, [('status', "segment 4")])
+
+    def test_discard_drops_pending_updates(self):
+        job = FakeJob()
+        received = self._record(job)
+        self.aggregator.report_progress(job, 50, 1.0, 5)
+        self.aggregator.discard(job)
+        self.aggregator.flush()
+        self.assertEqual(received, [])
+
+        # A job that starts over gets its first update again
+        self.aggregator.report_status(job, "다운로드 중...")
+        self.aggregator.flush()
+        self.aggregator.discard(job)
+        self.aggregator.report_status(job, "다운로드 중...")
+        self.aggregator.flush()
+        self.assertEqual(received, [('status', "다운로드 중..."), ('status', "다운로드 중...")])
+
+    def test_many_jobs_are_batched_at_the_ui_rate(self):
+        jobs = [FakeJob() for _ in range(50)]
+        batches = []
+        self.aggregator.batch_delivered.connect(batches.append)
+        stop = threading.Event()
+
+        def report(job):
+            i = 0
+            while not stop.is_set():
+                i += 1
+                self.aggregator.report_progress(job, i % 100, float(i), 0)
+                self.aggregator.report_status(job, f"{i} 세그먼트")
+                time.sleep(0.001)
+
+        threads = [threading.Thread(target=report, args=(job,)) for job in jobs]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        reports, deliveries = self.aggregator.counts()
+        # At most one progress and one status signal per job and batch
+        self.assertLessEqual(len(batches), 7)
+        self.assertLessEqual(deliveries, len(batches) * len(jobs) * 2)
+        self.assertLess(deliveries * 5, reports)
+
+
+if __name__ == '__main__':
+    unittest.main()
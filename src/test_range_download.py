@@ -0,0 +1,105 @@
+import unittest
+import asyncio
+import os
+import tempfile
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.range_downloader import RangeDownloader
+from core.retry import RetryPolicy
+
+
+class FileServer:
+    """Local server for one file, with or without Range support"""
+
+    def __init__(self, path: str, ranges: bool = True, drop_after: int = 0):
+        self.path = path
+        self.ranges = ranges
+        self.drop_after = drop_after  # cut the first ranged response after this many bytes
+        self.range_requests = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/clip.mp4', self.clip)
+        return app
+
+    async def clip(self, request):
+        if not self.ranges:
+            with open(self.path, 'rb') as f:
+                return web.Response(body=f.read())
+        self.range_requests.append(request.headers.get('Range'))
+        if self.drop_after and len(self.range_requests) == 2:
+            # Send a partial body, then drop the connection
+            first = int(request.headers['Range'][6:].split('-')[0])
+            response = web.StreamResponse(status=206, headers={
+                'Content-Range': f"bytes {first}-{os.path.getsize(self.path) - 1}/{os.path.getsize(self.path)}"
+            })
+            await response.prepare(request)
+            with open(self.path, 'rb') as f:
+                f.seek(first)
+                await response.write(f.read(self.drop_after))
+            request.transport.close()
+            return response
+        return web.FileResponse(self.path)
+
+
+class TestRangeDownloader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, "source.mp4")
+        self.data = os.urandom(1024 * 1024 + 123)
+        with open(self.source, 'wb') as f:
+            f.write(self.data)
+        self.output = os.path.join(self.temp_dir.name, "output")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def download(self, server_state, **kwargs):
+        downloader = RangeDownloader(
+            connections=4, min_range_size=64 * 1024, retry_policy=RetryPolicy(base_delay=0.01), **kwargs
+        )
+        progress = []
+
+        async def run():
+            async with TestServer(server_state.app()) as server:
+                return await downloader.download(
+                    str(server.make_url('/clip.mp4')),
+                    self.output,
+                    lambda done, total: progress.append((done, total))
+                )
+
+        path = asyncio.run(run())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        return downloader, progress
+
+    def test_parallel_ranges(self):
+        state = FileServer(self.source)
+        downloader, progress = self.download(state)
+        self.assertTrue(downloader.ranged)
+        # Probe plus one request per range
+        self.assertEqual(len(state.range_requests), 5)
+        self.assertEqual(progress[-1], (len(self.data), len(self.data)))
+
+    def test_broken_range_resumes(self):
+        state = FileServer(self.source, drop_after=1000)
+        downloader, _ = self.download(state)
+        self.assertEqual(downloader.stats.retries, 1)
+        self.assertEqual(downloader.stats.bytes_received, len(self.data))
+
+    def test_falls_back_without_range_support(self):
+        state = FileServer(self.source, ranges=False)
+        downloader, progress = self.download(state)
+        self.assertFalse(downloader.ranged)
+        self.assertEqual(progress[-1], (len(self.data), len(self.data)))
+
+    def test_split(self):
+        downloader = RangeDownloader(connections=3, min_range_size=10)
+        self.assertEqual(downloader._split(100), [(0, 33), (34, 67), (68, 99)])
+        self.assertEqual(downloader._split(15), [(0, 14)])
+
+
+if __name__ == '__main__':
+    unittest.main()
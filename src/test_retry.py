@@ -0,0 +1,261 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.retry import HttpStatusError, RetryPolicy
+from core.segment_downloader import SegmentDownloader
+
+SEGMENT = bytes(range(256)) * 400  # 100 KiB
+
+PLAYLIST = "#EXTM3U\n" + "".join(f"#EXTINF:2.0,\nseg{i}.m4v\n" for i in range(4))
+
+
+class FlakyCDN:
+    """Local stand-in for the CDN that fails in configurable ways"""
+    
+    def __init__(self):
+        self.requests = []
+        self.fail_status = {}  # path -> list of statuses returned before succeeding
+        self.cut_once = set()  # paths whose first response is cut off halfway
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/playlist.m3u8', self.playlist)
+        app.router.add_get('/{name}', self.segment)
+        return app
+    
+    async def playlist(self, request):
+        return web.Response(text=PLAYLIST)
+    
+    async def segment(self, request):
+        name = request.match_info['name']
+        self.requests.append((name, request.headers.get('Range')))
+        
+        statuses = self.fail_status.get(name)
+        if statuses:
+            return web.Response(status=statuses.pop(0))
+        
+        if name in self.cut_once:
+            self.cut_once.discard(name)
+            response = web.StreamResponse(headers={'Content-Length': str(len(SEGMENT))})
+            await response.prepare(request)
+            await response.write(SEGMENT[:len(SEGMENT) // 2])
+            request.transport.close()
+            return response
+        
+        range_header = request.headers.get('Range')
+        if range_header:
+            start = int(range_header.split('=')[1].split('-')[0])
+            return web.Response(
+                status=206,
+                body=SEGMENT[start:],
+                headers={'Content-Range': f'bytes {start}-{len(SEGMENT) - 1}/{len(SEGMENT)}'}
+            )
+        return web.Response(body=SEGMENT)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classification(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retriable(HttpStatusError("u", 503)))
+        self.assertTrue(policy.is_retriable(HttpStatusError("u", 429)))
+        self.assertTrue(policy.is_retriable(asyncio.TimeoutError()))
+        self.assertTrue(policy.is_retriable(ConnectionResetError()))
+        self.assertFalse(policy.is_retriable(HttpStatusError("u", 404)))
+        self.assertFalse(policy.is_retriable(ValueError()))
+    
+    def test_backoff_grows_and_is_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=8.0, jitter=0.5)
+        for attempt in range(6):
+            delay = policy.backoff(attempt)
+            cap = min(8.0, 2 ** attempt)
+            self.assertGreaterEqual(delay, cap * 0.5)
+            self.assertLessEqual(delay, cap)
+        self.assertEqual(policy.backoff(0, HttpStatusError("u", 429, retry_after=3)), 3)
+
+
+class TestSegmentRetry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+        self.cdn = FlakyCDN()
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def download(self, policy: RetryPolicy) -> SegmentDownloader:
+        downloader = SegmentDownloader(concurrency=2, retry_policy=policy)
+        
+        async def run():
+            async with TestServer(self.cdn.app()) as server:
+                return await downloader.download_video(str(server.make_url('/playlist.m3u8')), self.output)
+        
+        with patch('core.retry.asyncio.sleep'):
+            self.path = asyncio.run(run())
+        return downloader
+    
+    def test_transient_statuses_are_retried(self):
+        self.cdn.fail_status = {'seg1.m4v': [503, 429], 'seg3.m4v': [500]}
+        downloader = self.download(RetryPolicy(attempts=3))
+        
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), SEGMENT * 4)
+        self.assertEqual(downloader.stats.retries, 3)
+        self.assertGreater(downloader.stats.retry_wait, 0)
+    
+    def test_non_retriable_status_fails_fast(self):
+        self.cdn.fail_status = {'seg2.m4v': [404]}
+        with self.assertRaises(HttpStatusError):
+            self.download(RetryPolicy(attempts=5))
+        self.assertEqual([r for r in self.cdn.requests if r[0] == 'seg2.m4v'], [('seg2.m4v', None)])
+    
+    def test_cut_transfer_resumes_with_range(self):
+        self.cdn.cut_once = {'seg2.m4v'}
+        downloader = self.download(RetryPolicy(attempts=3))
+        
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), SEGMENT * 4)
+        seg2_requests = [r for r in self.cdn.requests if r[0] == 'seg2.m4v']
+        self.assertEqual(len(seg2_requests), 2)
+        self.assertEqual(seg2_requests[1][1], f'bytes={len(SEGMENT) // 2}-')
+        self.assertEqual(downloader.stats.retries, 1)
+
+
+class SigningCDN:
+    """Local stand-in for a CDN whose playlist signatures expire"""
+    
+    def __init__(self, expire_after: int):
+        self.generation = 1
+        self.expire_after = expire_after  # successful segments before rotating
+        self.served = []
+        self.forbidden = 0
+    
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/master.m3u8', self.master)
+        app.router.add_get('/720p/playlist.m3u8', self.media)
+        app.router.add_get('/720p/{name}', self.segment)
+        return app
+    
+    def valid(self, request) -> bool:
+        return request.query.get('sig') == str(self.generation)
+    
+    async def master(self, request):
+        if not self.valid(request):
+            return web.Response(status=403)
+        return web.Response(text=(
+            "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=2000000,RESOLUTION=1280x720\n"
+            f"720p/playlist.m3u8?sig={self.generation}\n"
+        ))
+    
+    async def media(self, request):
+        if not self.valid(request):
+            return web.Response(status=403)
+        return web.Response(text="#EXTM3U\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v?sig={self.generation}\n" for i in range(6)
+        ))
+    
+    async def segment(self, request):
+        if not self.valid(request):
+            self.forbidden += 1
+            return web.Response(status=403)
+        self.served.append(request.match_info['name'])
+        if len(self.served) == self.expire_after:
+            self.generation += 1
+        return web.Response(body=request.match_info['name'].encode())
+
+
+class TestUrlRefresh(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def download(self, cdn: SigningCDN, first_url: str, rotate_on_refresh: bool = False):
+        downloader = SegmentDownloader(concurrency=1)
+        
+        async def run():
+            async with TestServer(cdn.app()) as server:
+                async def refresher():
+                    if rotate_on_refresh:
+                        cdn.generation += 1
+                    return str(server.make_url(f'/master.m3u8?sig={cdn.generation}'))
+                
+                return await downloader.download_video(
+                    str(server.make_url(first_url)),
+                    self.output,
+                    target_quality="720p",
+                    url_refresher=refresher
+                )
+        
+        self.path = asyncio.run(run())
+        return downloader
+    
+    def test_expired_signature_is_refreshed_mid_download(self):
+        cdn = SigningCDN(expire_after=3)
+        downloader = self.download(cdn, '/master.m3u8?sig=1')
+        
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b"".join(f"seg{i}.m4v".encode() for i in range(6)))
+        # Completed segments are not downloaded again
+        self.assertEqual(cdn.served, [f"seg{i}.m4v" for i in range(6)])
+        self.assertEqual(cdn.forbidden, 1)
+        self.assertEqual(downloader.stats.url_refreshes, 1)
+    
+    def test_refreshes_ahead_of_encoded_expiry(self):
+        cdn = SigningCDN(expire_after=0)
+        # The playlist URL says its signature expires in 10 s (inside the margin)
+        cdn_media = cdn.media
+        
+        async def media_with_expiry(request):
+            response = await cdn_media(request)
+            if response.status == 200 and request.query.get('sig') == '1':
+                response.text = response.text.replace("?sig=1", f"?sig=1&exp={int(time.time()) + 10}")
+            return response
+        
+        cdn.media = media_with_expiry
+        downloader = self.download(cdn, '/master.m3u8?sig=1', rotate_on_refresh=True)
+        
+        self.assertEqual(downloader.stats.url_refreshes, 1)
+        self.assertEqual(cdn.forbidden, 0)
+    
+    def test_short_lived_signatures_refresh_once(self):
+        cdn = SigningCDN(expire_after=0)
+        # Every signature, fresh ones included, expires inside the margin
+        cdn_media = cdn.media
+        
+        async def media_with_expiry(request):
+            response = await cdn_media(request)
+            if response.status == 200:
+                response.text = response.text.replace(
+                    f"?sig={cdn.generation}", f"?sig={cdn.generation}&exp={int(time.time()) + 30}"
+                )
+            return response
+        
+        cdn.media = media_with_expiry
+        downloader = self.download(cdn, '/master.m3u8?sig=1', rotate_on_refresh=True)
+        
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b"".join(f"seg{i}.m4v".encode() for i in range(6)))
+        self.assertEqual(downloader.stats.url_refreshes, 1)
+        self.assertEqual(cdn.forbidden, 0)
+    
+    def test_signature_expiry_parsing(self):
+        self.assertEqual(SegmentDownloader._signature_expiry("https://a/b.m4v?exp=1700000000&sig=x"), 1700000000)
+        self.assertEqual(SegmentDownloader._signature_expiry("https://a/b.m4v?expires=1700000000000"), 1700000000)
+        self.assertEqual(
+            SegmentDownloader._signature_expiry("https://a/b.m4v?hdnts=st%3D1~exp%3D1700000500~hmac%3Dab"),
+            1700000500
+        )
+        self.assertIsNone(SegmentDownloader._signature_expiry("https://a/b.m4v?sig=x"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from unittest.mock import patch
+from core.segment_cache import SegmentCache
+from core.segment_downloader import SegmentDownloader
+from core.segment_writer import OrderedSegmentWriter
+
+
+class TestSegmentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_ignores_signature_and_host(self):
+        key = SegmentCache.key("123", "https://a.cdn/v/720p/index.m3u8?sig=1", "https://a.cdn/v/720p/seg1.m4v?sig=1")
+        self.assertEqual(key, SegmentCache.key("123", "https://b.cdn/v/720p/index.m3u8?sig=2", "https://b.cdn/v/720p/seg1.m4v?sig=2"))
+        self.assertNotEqual(key, SegmentCache.key("456", "https://a.cdn/v/720p/index.m3u8", "https://a.cdn/v/720p/seg1.m4v"))
+        self.assertNotEqual(key, SegmentCache.key("123", "https://a.cdn/v/720p/index.m3u8", "https://a.cdn/v/720p/seg1.m4v", (0, 10)))
+
+    def test_put_get_and_lru_eviction(self):
+        cache = SegmentCache(self.cache_dir, max_size=1000)
+        cache.MIN_EVICT_AGE = 0
+        self.assertIsNone(cache.get("a" * 40))
+
+        for i, name in enumerate("abc"):
+            path = cache.put(name * 40, bytes(300))
+            os.utime(path, (i, i))
+        # Using "a" makes "b" the least recently used entry
+        os.utime(cache.get("a" * 40), (10, 10))
+        cache.put("d" * 40, bytes(300))
+
+        self.assertIsNone(cache.get("b" * 40))
+        for name in "acd":
+            with open(cache.get(name * 40), 'rb') as f:
+                self.assertEqual(f.read(), bytes(300))
+        # Sizes survive a reconfigure; no temporary files are left behind
+        cache.configure(self.cache_dir, 1000)
+        self.assertEqual(cache._size, 900)
+        self.assertFalse(any(
+            name.startswith('.tmp-') for _, _, names in os.walk(self.cache_dir) for name in names
+        ))
+
+    @patch('core.segment_downloader.SegmentDownloader._fetch_text')
+    def test_downloader_reuses_cached_segments(self, mock_fetch):
+        mock_fetch.return_value = "#EXTM3U\n#EXT-X-MAP:URI=\"init.m4s\"\n" + "".join(
+            f"#EXTINF:10.0,\nseg{i}.m4v?sig=abc\n" for i in range(6)
+        )
+        fetched = []
+
+        async def fetch(url, byterange=None):
+            fetched.append(url.rsplit('/', 1)[1].split('?')[0])
+            return fetched[-1].encode()
+
+        cache = SegmentCache(self.cache_dir, max_size=1024 * 1024)
+        output = os.path.join(self.temp_dir.name, "output")
+
+        downloader = SegmentDownloader(concurrency=2, cache=cache)
+        with patch.object(downloader, '_fetch_segment', side_effect=fetch):
+            asyncio.run(downloader.download_video(
+                "http://test.com/playlist.m3u8", output, end_time=30.0, video_id="123"
+            ))
+        self.assertEqual(downloader.stats.cache_hit_rate(), 0.0)
+        # Inserts run on the cache's thread
+        cache.flush()
+
+        # A later range of the same VOD, re-signed, only fetches the new segments
+        mock_fetch.return_value = mock_fetch.return_value.replace("sig=abc", "sig=xyz")
+        fetched.clear()
+        downloader = SegmentDownloader(concurrency=2, cache=cache)
+        with patch.object(downloader, '_fetch_segment', side_effect=fetch):
+            path = asyncio.run(downloader.download_video(
+                "http://test.com/playlist.m3u8", output, start_time=20.0, video_id="123"
+            ))
+
+        self.assertEqual(fetched, ["seg3.m4v", "seg4.m4v", "seg5.m4v"])
+        self.assertEqual(downloader.stats.cache_hits, 2)
+        self.assertEqual(downloader.stats.cache_hit_rate(), 0.4)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(2, 6)))
+
+
+    def test_hit_survives_eviction_while_buffered(self):
+        cache = SegmentCache(self.cache_dir, max_size=1024 * 1024)
+        path = cache.put("a" * 40, b"cached")
+        output = os.path.join(self.temp_dir.name, "output.mp4")
+
+        async def run():
+            writer = OrderedSegmentWriter(output)
+            writer.open()
+            # Segment 1 is a hit waiting for segment 0, which is slow
+            await writer.write_file(1, path)
+            os.remove(path)
+            await writer.write(0, b"first|")
+            await writer.aclose()
+
+        asyncio.run(run())
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), b"first|cached")
+
+
+if __name__ == '__main__':
+    unittest.main()
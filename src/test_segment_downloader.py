@@ -1,7 +1,7 @@
 import asyncio
 import os
 from contextlib import contextmanager
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from core.segment_downloader import SegmentDownloader
 
@@ -26,36 +26,35 @@ async def test_segment_downloader():
     
     downloader = SegmentDownloader()
     
-    # Mock aiohttp session and response
-    with patch('aiohttp.ClientSession') as mock_session_cls:
-        mock_session = MagicMock()
-        mock_session_cls.return_value.__aenter__.return_value = mock_session
+    # Mock the shared HTTP client's session and responses
+    mock_session = MagicMock()
+    with patch('core.http_client.HttpClient.session', return_value=mock_session):
         
         # Mock responses
         mock_response_m3u8 = MagicMock()
         mock_response_m3u8.status = 200
-        mock_response_m3u8.text = asyncio.Future()
-        mock_response_m3u8.text.set_result(MOCK_M3U8_CONTENT)
+        mock_response_m3u8.text = AsyncMock(return_value=MOCK_M3U8_CONTENT)
         
-        mock_response_segment = MagicMock()
-        mock_response_segment.status = 200
-        mock_response_segment.content.read = asyncio.Future()
-        # Simulate small chunk
-        mock_response_segment.content.read.side_effect = [b'datachunk', b'']
+        def make_segment_response():
+            mock_response_segment = MagicMock()
+            mock_response_segment.status = 200
+            # Simulate small chunk
+            mock_response_segment.content.read = AsyncMock(side_effect=[b'datachunk', b''])
+            return mock_response_segment
         
         # Configure get side effects based on URL
-        def get_side_effect(url):
+        def get_side_effect(url, **kwargs):
             mock_resp_ctx = MagicMock()
             if "playlist.m3u8" in url:
                 mock_resp_ctx.__aenter__.return_value = mock_response_m3u8
             else:
-                mock_resp_ctx.__aenter__.return_value = mock_response_segment
+                mock_resp_ctx.__aenter__ = AsyncMock(return_value=make_segment_response())
+            mock_resp_ctx.__aexit__ = AsyncMock(return_value=False)
             return mock_resp_ctx
             
         mock_session.get.side_effect = get_side_effect
         
-        # Mock combine_segments to avoid file IO
-        with patch.object(downloader, '_combine_segments') as mock_combine:
+        try:
             path = await downloader.download_video(
                 MOCK_M3U8_URL,
                 OUTPUT_PATH,
@@ -65,10 +64,16 @@ async def test_segment_downloader():
             print(f"Download completed: {path}")
             
             # Verify calls
-            assert mock_session.get.call_count >= 3  # m3u8 + init + 2 segments
-            mock_combine.assert_called_once()
+            assert mock_session.get.call_count >= 4  # m3u8 + init + 2 segments
+            
+            # Segments are streamed straight into the output file
+            with open(path, 'rb') as f:
+                assert f.read() == b'datachunk' * 3
             
             print("Test passed!")
+        finally:
+            if os.path.exists(OUTPUT_PATH):
+                os.remove(OUTPUT_PATH)
 
 if __name__ == "__main__":
     asyncio.run(test_segment_downloader())
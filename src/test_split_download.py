@@ -1,14 +1,28 @@
 
 import unittest
 import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch, AsyncMock
+from PyQt6.QtCore import QCoreApplication
+from core.download_stats import DownloadStats
+from core.downloader import DownloadManager, DownloadWorker
+from core.playlist import parse_media_playlist
 from core.segment_downloader import SegmentDownloader
 
 class TestSegmentDownloaderSplit(unittest.TestCase):
     def setUp(self):
         self.downloader = SegmentDownloader()
         self.downloader.session = AsyncMock()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.temp_dir.name, "output")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
 
     def test_parse_m3u8_with_duration(self):
         content = """#EXTM3U
@@ -22,16 +36,15 @@ segment1.ts
 #EXTINF:2.500000,
 segment2.ts
 """
-        result = self.downloader._parse_m3u8(content)
-        segments = result['media_segments']
-        self.assertEqual(len(segments), 3)
-        self.assertEqual(segments[0]['duration'], 4.0)
-        self.assertEqual(segments[2]['duration'], 2.5)
+        playlist = parse_media_playlist(content)
+        self.assertEqual(len(playlist), 3)
+        self.assertEqual(playlist.duration(0), 4.0)
+        self.assertEqual(playlist.duration(2), 2.5)
+        self.assertEqual(playlist.total_duration, 10.5)
 
-    @patch('core.segment_downloader.SegmentDownloader._download_file')
-    @patch('core.segment_downloader.SegmentDownloader._combine_segments')
+    @patch('core.segment_downloader.SegmentDownloader._fetch_segment', return_value=b'')
     @patch('core.segment_downloader.SegmentDownloader._fetch_text')
-    def test_download_video_with_range(self, mock_fetch, mock_combine, mock_download):
+    def test_download_video_with_range(self, mock_fetch, mock_download):
         # Mock m3u8 content
         mock_fetch.return_value = """#EXTM3U
 #EXTINF:10.0,
@@ -53,14 +66,14 @@ seg4.ts
         async def run_test():
              await self.downloader.download_video(
                 "http://test.com/playlist.m3u8",
-                "output",
+                self.output,
                 start_time=10.0,
                 end_time=30.0
             )
         
         asyncio.run(run_test())
         
-        # Check that _download_file was called 2 times (for seg2 and seg3)
+        # Check that _fetch_segment was called 2 times (for seg2 and seg3)
         # Plus init segment if present (not in this mock)
         self.assertEqual(mock_download.call_count, 2)
         
@@ -69,5 +82,258 @@ seg4.ts
         self.assertIn("seg2.ts", calls[0][0][0])
         self.assertIn("seg3.ts", calls[1][0][0])
 
+    @patch('core.segment_downloader.SegmentDownloader._fetch_text')
+    def test_download_video_concurrency_limit(self, mock_fetch):
+        mock_fetch.return_value = "#EXTM3U\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.ts\n" for i in range(10)
+        )
+        downloader = SegmentDownloader(concurrency=3)
+        in_flight = 0
+        peak = 0
+        
+        async def fake_fetch(url, byterange=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Random latency so segments complete out of order
+            await asyncio.sleep(random.uniform(0, 0.02))
+            in_flight -= 1
+            return url.rsplit('/', 1)[1].encode() + b'|'
+        
+        progress = []
+        with patch.object(downloader, '_fetch_segment', side_effect=fake_fetch):
+            path = asyncio.run(downloader.download_video(
+                "http://test.com/playlist.m3u8",
+                self.output,
+                lambda c, t: progress.append((c, t))
+            ))
+        
+        self.assertEqual(peak, 3)
+        self.assertEqual(progress, [(i, 10) for i in range(1, 11)])
+        
+        # Segments are streamed into the output in playlist order, no temp dir
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(f"seg{i}.ts|".encode() for i in range(10)))
+        self.assertEqual(os.listdir(self.temp_dir.name), ["output.mp4"])
+
+    @patch('core.segment_downloader.SegmentDownloader._fetch_text')
+    def test_download_video_resumes_from_journal(self, mock_fetch):
+        mock_fetch.return_value = "#EXTM3U\n#EXT-X-MAP:URI=\"init.m4s\"\n" + "".join(
+            f"#EXTINF:2.0,\nseg{i}.m4v?sig=abc\n" for i in range(8)
+        )
+        fetched = []
+        
+        async def failing_fetch(url, byterange=None):
+            if "seg5" in url:
+                raise Exception("HTTP 500")
+            fetched.append(url)
+            return url.rsplit('/', 1)[1].split('?')[0].encode()
+        
+        downloader = SegmentDownloader(concurrency=1)
+        with patch.object(downloader, '_fetch_segment', side_effect=failing_fetch):
+            with self.assertRaises(Exception):
+                asyncio.run(downloader.download_video("http://test.com/playlist.m3u8", self.output))
+        self.assertTrue(os.path.exists(self.output + ".mp4.journal"))
+        
+        # A re-signed playlist still matches the journal
+        mock_fetch.return_value = mock_fetch.return_value.replace("sig=abc", "sig=xyz")
+        fetched.clear()
+        
+        async def fetch(url, byterange=None):
+            fetched.append(url)
+            return url.rsplit('/', 1)[1].split('?')[0].encode()
+        
+        with patch.object(downloader, '_fetch_segment', side_effect=fetch):
+            path = asyncio.run(downloader.download_video("http://test.com/playlist.m3u8", self.output))
+        
+        # Only the segments after the last journaled one are fetched again
+        self.assertEqual([u.rsplit('/', 1)[1] for u in fetched], [f"seg{i}.m4v?sig=xyz" for i in range(5, 8)])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"init.m4s" + b"".join(f"seg{i}.m4v".encode() for i in range(8)))
+        self.assertFalse(os.path.exists(self.output + ".mp4.journal"))
+
+    @patch('core.segment_downloader.SegmentDownloader._fetch_text')
+    def test_download_ranges_share_segments(self, mock_fetch):
+        mock_fetch.return_value = "#EXTM3U\n#EXT-X-MAP:URI=\"init.m4s\"\n" + "".join(
+            f"#EXTINF:10.0,\nseg{i}.m4v\n" for i in range(10)
+        )
+        fetched = []
+        
+        async def fetch(url, byterange=None):
+            fetched.append(url.rsplit('/', 1)[1])
+            await asyncio.sleep(random.uniform(0, 0.01))
+            return url.rsplit('/', 1)[1].encode() + b'|'
+        
+        progress = []
+        outputs = [os.path.join(self.temp_dir.name, f"part{i}") for i in range(3)]
+        downloader = SegmentDownloader(concurrency=4)
+        with patch.object(downloader, '_fetch_segment', side_effect=fetch):
+            results = asyncio.run(downloader.download_ranges(
+                "http://test.com/playlist.m3u8",
+                [(0.0, 40.0), (30.0, 60.0), (60.0, None)],
+                outputs,
+                lambda i, c, t: progress.append((i, c, t))
+            ))
+        
+        # One fetch per distinct part, even where ranges overlap
+        self.assertEqual(sorted(fetched), sorted(["init.m4s"] + [f"seg{i}.m4v" for i in range(10)]))
+        expected = [range(0, 4), range(3, 6), range(6, 10)]
+        for path, segments in zip(results, expected):
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b"init.m4s|" + b"".join(f"seg{i}.m4v|".encode() for i in segments))
+        self.assertEqual([p for p in progress if p[0] == 1], [(1, c, 4) for c in range(1, 5)])
+        self.assertFalse(any(name.endswith(".journal") for name in os.listdir(self.temp_dir.name)))
+    
+    @patch('core.segment_downloader.SegmentDownloader._fetch_text')
+    def test_download_ranges_cancel_one_range(self, mock_fetch):
+        mock_fetch.return_value = "#EXTM3U\n" + "".join(f"#EXTINF:10.0,\nseg{i}.ts\n" for i in range(20))
+        fetched = []
+        
+        async def fetch(url, byterange=None):
+            fetched.append(url.rsplit('/', 1)[1])
+            return b'x'
+        
+        outputs = [os.path.join(self.temp_dir.name, f"part{i}") for i in range(2)]
+        downloader = SegmentDownloader(concurrency=1)
+        with patch.object(downloader, '_fetch_segment', side_effect=fetch):
+            results = asyncio.run(downloader.download_ranges(
+                "http://test.com/playlist.m3u8",
+                [(0.0, 100.0), (100.0, None)],
+                outputs,
+                range_cancelled=lambda i: i == 1 and len(fetched) >= 3
+            ))
+        
+        self.assertEqual(results[0], outputs[0] + ".mp4")
+        self.assertIsInstance(results[1], Exception)
+        # The second range is never fetched; its (empty) output stays resumable
+        self.assertEqual(fetched, [f"seg{i}.ts" for i in range(10)])
+        self.assertTrue(os.path.exists(outputs[1] + ".mp4.journal"))
+
+class TestDownloadStats(unittest.TestCase):
+    @patch('core.download_stats.time.monotonic')
+    def test_rate_progress_and_eta(self, mock_time):
+        mock_time.return_value = 0.0
+        stats = DownloadStats()
+        # 1 hour job, 10 minutes (60 MB) already on disk from an earlier attempt
+        stats.start_media(3600.0, done_bytes=60_000_000, done_duration=600.0)
+        
+        # 1 MB/s for two seconds
+        for t in (1.0, 2.0):
+            mock_time.return_value = t
+            stats.record_bytes(1_000_000)
+        stats.record_segment(2_000_000, 20.0)
+        
+        self.assertAlmostEqual(stats.rate, 1_000_000)
+        # 100 KB per media second over 620 s of media
+        self.assertAlmostEqual(stats.bytes_per_media_second(), 100_000)
+        self.assertAlmostEqual(stats.progress(), 62_000_000 / 360_000_000)
+        # 2980 s of media left at 100 KB/s of media, received at 1 MB/s
+        self.assertAlmostEqual(stats.eta(), 298.0)
+    
+    def test_unknown_until_first_segment(self):
+        stats = DownloadStats()
+        stats.start_media(100.0)
+        self.assertIsNone(stats.progress())
+        self.assertIsNone(stats.eta())
+
+class TestDownloadParts(unittest.TestCase):
+    def setUp(self):
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        playlist = "#EXTM3U\n" + "".join(f"#EXTINF:10.0,\nseg{i}.ts\n" for i in range(30))
+        
+        async def fetch_master_url(worker, api):
+            return "http://test.com/master.m3u8"
+        
+        async def fetch_text(downloader, url):
+            return playlist
+        
+        async def fetch_segment(downloader, url, byterange=None):
+            await asyncio.sleep(0.05)
+            return url.rsplit('/', 1)[1].encode()
+        
+        for target, name, fake in (
+            (DownloadWorker, '_fetch_master_url', fetch_master_url),
+            (SegmentDownloader, '_fetch_text', fetch_text),
+            (SegmentDownloader, '_fetch_segment', fetch_segment)
+        ):
+            patcher = patch.object(target, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_short_parts_free_their_slot_at_once(self):
+        manager = DownloadManager(max_active=3)
+        # Two long ranges among short ones
+        ranges = [(0, 10), (10, 100), (100, 190), (190, 200), (200, 210), (210, 220)]
+        download_ids = manager.start_range_downloads(
+            video_id="parts",
+            url="https://example.com/video/parts",
+            titles=[f"part {i}" for i in range(len(ranges))],
+            quality="1080p",
+            output_dir=self.temp_dir.name,
+            ranges=ranges,
+            concurrency=2,
+            adaptive_concurrency=False,
+            hedged_requests=False
+        )
+        completed = []
+        for download_id in download_ids:
+            manager.get_worker(download_id).download_completed.connect(
+                lambda path, download_id=download_id: completed.append(download_id)
+            )
+            manager.enqueue_download(download_id)
+        
+        deadline = time.monotonic() + 10
+        while len(completed) < len(ranges) and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        
+        self.assertEqual(sorted(completed), sorted(download_ids))
+        # The short parts queued behind the long ones ran in the slot the
+        # first short part freed, while the long ones were still going
+        self.assertEqual(set(completed[-2:]), set(download_ids[1:3]))
+        for download_id, (start, end) in zip(download_ids, ranges):
+            with open(manager.get_worker(download_id).output_path + ".mp4", 'rb') as f:
+                self.assertEqual(f.read(), b"".join(f"seg{i}.ts".encode() for i in range(start // 10, end // 10)))
+        manager.close()
+    
+    def test_cancelling_every_part_cancels_the_batch(self):
+        fetching = threading.Event()
+        
+        async def stalled_fetch(downloader, url, byterange=None):
+            fetching.set()
+            await asyncio.sleep(60)
+        
+        manager = DownloadManager(max_active=3)
+        with patch.object(SegmentDownloader, '_fetch_segment', stalled_fetch):
+            download_ids = manager.start_range_downloads(
+                video_id="stalled",
+                url="https://example.com/video/stalled",
+                titles=["part 0", "part 1"],
+                quality="1080p",
+                output_dir=self.temp_dir.name,
+                ranges=[(0, 10), (10, 20)]
+            )
+            parts = [manager.get_worker(download_id) for download_id in download_ids]
+            for download_id in download_ids:
+                manager.enqueue_download(download_id)
+            self.assertTrue(fetching.wait(5))
+            
+            started = time.monotonic()
+            for download_id in download_ids:
+                manager.cancel_download(download_id)
+            self.assertLess(time.monotonic() - started, 0.5)
+            while manager.scheduler.active_count and time.monotonic() - started < 5:
+                self.app.processEvents()
+                time.sleep(0.01)
+            self.assertLess(time.monotonic() - started, 2)
+        
+        self.assertFalse(any(part.isRunning() for part in parts))
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        manager.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+
+from core.ytdlp_process import YtdlpProcessPool
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves /slow.mp4 in small timed chunks and /stall.mp4 not at all"""
+
+    def do_GET(self):
+        if self.path == '/slow.mp4':
+            self.send_response(200)
+            self.send_header('Content-Type', 'video/mp4')
+            self.send_header('Content-Length', str(64 * 64 * 1024))
+            self.end_headers()
+            for _ in range(64):
+                self.wfile.write(b'\0' * 64 * 1024)
+                time.sleep(0.05)
+        elif self.path == '/stall.mp4':
+            time.sleep(30)
+        else:
+            super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestYtdlpProcessPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.data = os.urandom(2 * 1024 * 1024)
+        with open(os.path.join(self.root, 'video.mp4'), 'wb') as f:
+            f.write(self.data)
+
+        # Workers inherit TMPDIR, so their cookie files land here
+        self.worker_tmp = os.path.join(self.root, 'tmp')
+        os.mkdir(self.worker_tmp)
+        self._tmpdir = os.environ.get('TMPDIR')
+        os.environ['TMPDIR'] = self.worker_tmp
+
+        handler = functools.partial(SlowHandler, directory=self.root)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.pool = YtdlpProcessPool(max_workers=1)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+        if self._tmpdir is None:
+            del os.environ['TMPDIR']
+        else:
+            os.environ['TMPDIR'] = self._tmpdir
+        self.temp_dir.cleanup()
+
+    def job(self, name: str, output: str) -> dict:
+        return {
+            'url': f"http://127.0.0.1:{self.server.server_port}/{name}",
+            'output_path': os.path.join(self.root, output),
+            'cookies': "# Netscape HTTP Cookie File\n"
+        }
+
+    def test_download_relays_progress(self):
+        events = []
+        path = self.pool.run(self.job('video.mp4', 'out'), on_progress=lambda d: events.append(d) or 0)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(events[-1]['status'], 'finished')
+        self.assertTrue(any(d['status'] == 'downloading' and 'downloaded_bytes' in d for d in events))
+        # The worker removed its cookie file
+        self.assertEqual(os.listdir(self.worker_tmp), [])
+
+    def test_cancel_stops_job_and_keeps_worker(self):
+        events = []
+        with self.assertRaises(Exception) as raised:
+            self.pool.run(
+                self.job('slow.mp4', 'slow'),
+                on_progress=lambda d: events.append(d) or 0,
+                cancelled=lambda: len(events) >= 3
+            )
+        self.assertIn("cancelled", str(raised.exception))
+        self.assertLess(len(events), 10)
+
+        # The same worker process takes the next job
+        worker = self.pool._idle[0]
+        path = self.pool.run(self.job('video.mp4', 'next'))
+        self.assertEqual(os.path.getsize(path), len(self.data))
+        self.assertIs(self.pool._idle[0], worker)
+        self.assertEqual(os.listdir(self.worker_tmp), [])
+
+    def test_silent_worker_is_terminated(self):
+        self.pool.CANCEL_GRACE = 0.5
+        cancel_at = time.monotonic() + 1.0
+        started = time.monotonic()
+        with self.assertRaises(Exception):
+            self.pool.run(self.job('stall.mp4', 'stall'), cancelled=lambda: time.monotonic() > cancel_at)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(self.pool._idle, [])
+        # SIGTERM unwound the job, so its cookie file is gone too
+        self.assertEqual(os.listdir(self.worker_tmp), [])
+
+    def test_cancel_while_waiting_for_a_worker(self):
+        # Every slot is taken by another job
+        self.pool._slots.acquire()
+        cancel_at = time.monotonic() + 0.5
+        with self.assertRaises(Exception) as raised:
+            self.pool.run(self.job('video.mp4', 'queued'), cancelled=lambda: time.monotonic() > cancel_at)
+        self.assertIn("cancelled", str(raised.exception))
+        self.assertLess(time.monotonic() - cancel_at, 2)
+        self.assertEqual(self.pool._idle, [])
+
+        # The waiting job did not take or leak a slot
+        self.pool._slots.release()
+        path = self.pool.run(self.job('video.mp4', 'next'))
+        self.assertEqual(os.path.getsize(path), len(self.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
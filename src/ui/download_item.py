@@ -4,31 +4,42 @@ Custom widget for displaying download progress
 """
 from PyQt6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QLabel, 
-    QProgressBar, QPushButton, QFrame
+    QProgressBar, QPushButton, QFrame, QMenu
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QThread
 from PyQt6.QtGui import QPixmap
 import os
-import urllib.request
+
+from core.http_client import get_http_client
+from core.job_scheduler import QUEUED, RUNNING, PAUSED
 
 class ThumbnailLoader(QThread):
     """Thread for loading thumbnail images"""
     thumbnail_loaded = pyqtSignal(QPixmap)
     
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        width: int = 160,
+        height: int = 90,
+        aspect_mode: Qt.AspectRatioMode = Qt.AspectRatioMode.KeepAspectRatioByExpanding
+    ):
         super().__init__()
         self.url = url
+        self.width = width
+        self.height = height
+        self.aspect_mode = aspect_mode
     
     def run(self):
         """Download and load thumbnail"""
         try:
             if self.url:
-                data = urllib.request.urlopen(self.url).read()
+                data = get_http_client().fetch_bytes_sync(self.url)
                 pixmap = QPixmap()
                 pixmap.loadFromData(data)
                 if not pixmap.isNull():
                     # Scale to fit thumbnail size while maintaining aspect ratio
-                    scaled = pixmap.scaled(160, 90, Qt.AspectRatioMode.KeepAspectRatioByExpanding, Qt.TransformationMode.SmoothTransformation)
+                    scaled = pixmap.scaled(self.width, self.height, self.aspect_mode, Qt.TransformationMode.SmoothTransformation)
                     self.thumbnail_loaded.emit(scaled)
         except Exception as e:
             print(f"Failed to load thumbnail: {e}")
@@ -37,6 +48,10 @@ class DownloadItemWidget(QWidget):
     """Widget for a single download item"""
     
     cancel_requested = pyqtSignal(str)  # download_id
+    resume_requested = pyqtSignal(str)  # download_id
+    pause_requested = pyqtSignal(str)  # download_id
+    promote_requested = pyqtSignal(str)  # download_id
+    move_requested = pyqtSignal(str, int)  # download_id, offset in the queue
     open_file_requested = pyqtSignal(str)  # file_path
     
     def __init__(self, download_id: str, title: str, thumbnail_url: str = ""):
@@ -45,6 +60,9 @@ class DownloadItemWidget(QWidget):
         self.title = title
         self.thumbnail_url = thumbnail_url
         self.output_path = ""
+        self.status_text = "다운로드 중..."  # last status, shown next to speed/ETA
+        self.queue_state = None  # scheduling state, see core.job_scheduler
+        self.queue_position = None
         
         self._init_ui()
         
@@ -110,6 +128,26 @@ class DownloadItemWidget(QWidget):
         self.cancel_button.clicked.connect(self._on_cancel)
         button_layout.addWidget(self.cancel_button)
         
+        self.resume_button = QPushButton("재개")
+        self.resume_button.setObjectName("secondaryButton")
+        self.resume_button.setMaximumWidth(100)
+        self.resume_button.setVisible(False)
+        self.resume_button.clicked.connect(self._on_resume)
+        button_layout.addWidget(self.resume_button)
+        
+        self.pause_button = QPushButton("일시정지")
+        self.pause_button.setObjectName("secondaryButton")
+        self.pause_button.setMaximumWidth(100)
+        self.pause_button.clicked.connect(self._on_pause)
+        button_layout.addWidget(self.pause_button)
+        
+        self.promote_button = QPushButton("먼저 받기")
+        self.promote_button.setObjectName("secondaryButton")
+        self.promote_button.setMaximumWidth(100)
+        self.promote_button.setVisible(False)
+        self.promote_button.clicked.connect(self._on_promote)
+        button_layout.addWidget(self.promote_button)
+        
         self.open_button = QPushButton("파일 열기")
         self.open_button.setObjectName("secondaryButton")
         self.open_button.setMaximumWidth(100)
@@ -148,6 +186,10 @@ class DownloadItemWidget(QWidget):
         # because update_status might be showing detailed info (e.g. segment count)
         if speed == 0 and eta == 0:
             return
+        
+        # A stopping download keeps reporting briefly; keep showing the pause
+        if self.queue_state == PAUSED:
+            return
             
         # Format speed
         if speed > 0:
@@ -157,18 +199,49 @@ class DownloadItemWidget(QWidget):
             speed_text = "계산 중..."
         
         # Format ETA
-        if eta > 0:
+        if eta >= 3600:
+            eta_text = f"{eta // 3600}시간 {eta % 3600 // 60}분"
+        elif eta > 0:
             eta_min = eta // 60
             eta_sec = eta % 60
             eta_text = f"{eta_min}분 {eta_sec}초"
         else:
             eta_text = "계산 중..."
         
-        self.status_label.setText(f"다운로드 중... | 속도: {speed_text} | 남은 시간: {eta_text}")
+        self.status_label.setText(f"{self.status_text} | 속도: {speed_text} | 남은 시간: {eta_text}")
     
     def update_status(self, status: str):
         """Update status message"""
-        self.status_label.setText(status)
+        self.status_text = status
+        if self.queue_state != PAUSED:
+            self.status_label.setText(status)
+    
+    def set_queue_state(self, state: str, position=None):
+        """
+        Show the scheduling state of the download
+        
+        Args:
+            state: State from `core.job_scheduler`
+            position: 0-based place in the queue while queued
+        """
+        if (state, position) == (self.queue_state, self.queue_position):
+            return
+        previous = self.queue_state
+        self.queue_state = state
+        self.queue_position = position
+        
+        if state == QUEUED:
+            self.status_label.setText(f"⏳ 대기 중 ({position + 1}번째)")
+        elif state == PAUSED:
+            self.status_label.setText("⏸ 일시정지됨")
+        elif state == RUNNING and previous != RUNNING:
+            self.status_text = "시작 중..."
+            self.status_label.setText(self.status_text)
+        
+        # Failed and completed downloads have their own buttons
+        self.pause_button.setVisible(state in (QUEUED, RUNNING, PAUSED))
+        self.pause_button.setText("계속" if state == PAUSED else "일시정지")
+        self.promote_button.setVisible(state in (QUEUED, PAUSED))
     
     def set_completed(self, output_path: str):
         """Mark download as completed"""
@@ -178,18 +251,58 @@ class DownloadItemWidget(QWidget):
         self.status_label.setStyleSheet("color: #10b981; font-weight: 600;")
         
         self.cancel_button.setVisible(False)
+        self.pause_button.setVisible(False)
         self.open_button.setVisible(True)
     
     def set_error(self, error_message: str):
         """Mark download as failed"""
+        if self.queue_state == PAUSED:
+            # Pausing stops the download, which reports that as an error
+            return
         self.status_label.setText(f"❌ 오류: {error_message}")
         self.status_label.setStyleSheet("color: #ef4444; font-weight: 600;")
         self.cancel_button.setText("제거")
+        self.resume_button.setVisible(True)
+    
+    def set_resuming(self):
+        """Reset the error state when a failed download is queued again"""
+        self.status_label.setStyleSheet("")
+        self.cancel_button.setText("취소")
+        self.resume_button.setVisible(False)
     
     def _on_cancel(self):
         """Handle cancel button click"""
         self.cancel_requested.emit(self.download_id)
     
+    def _on_resume(self):
+        """Handle resume button click"""
+        self.resume_requested.emit(self.download_id)
+    
+    def _on_pause(self):
+        """Handle pause/continue button click"""
+        if self.queue_state == PAUSED:
+            self.resume_requested.emit(self.download_id)
+        else:
+            self.pause_requested.emit(self.download_id)
+    
+    def _on_promote(self):
+        """Handle promote button click"""
+        self.promote_requested.emit(self.download_id)
+    
+    def contextMenuEvent(self, event):
+        """Queue controls for a waiting download"""
+        if self.queue_state not in (QUEUED, PAUSED):
+            return
+        
+        menu = QMenu(self)
+        menu.addAction("맨 앞으로", self._on_promote)
+        if self.queue_state == QUEUED:
+            menu.addAction("앞으로", lambda: self.move_requested.emit(self.download_id, -1))
+            menu.addAction("뒤로", lambda: self.move_requested.emit(self.download_id, 1))
+        menu.addSeparator()
+        menu.addAction("계속" if self.queue_state == PAUSED else "일시정지", self._on_pause)
+        menu.exec(event.globalPos())
+    
     def _on_open_file(self):
         """Handle open file button click"""
         if self.output_path and os.path.exists(self.output_path):
@@ -6,7 +6,9 @@ import sys
 import subprocess
 import platform
 import os
+from functools import partial
 from pathlib import Path
+from urllib.parse import urlsplit
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QComboBox,
@@ -17,10 +19,16 @@ from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QAction, QPixmap
 from qasync import asyncSlot
 
-from ui.download_item import DownloadItemWidget
+from ui.download_item import DownloadItemWidget, ThumbnailLoader
 from ui.settings_dialog import SettingsDialog
 from core.chzzk_api import ChzzkAPI
+from core.bandwidth import get_bandwidth_limiter
+from core.segment_cache import get_segment_cache
+from core.segment_downloader import SegmentDownloader
+from core.engine_selector import MANUAL, YTDLP, EngineSelector, get_engine_selector
 from core.downloader import DownloadManager
+from core.job_scheduler import FINISHED
+from core.job_store import FAILED, JobStore
 from core.config import Config
 
 
@@ -31,9 +39,15 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.config = config
         self.api = ChzzkAPI()
-        self.download_manager = DownloadManager()
+        self.download_manager = DownloadManager(
+            self.config.get("concurrent_downloads", 3),
+            JobStore(str(self.config.get_job_store_path()))
+        )
+        self.download_manager.queue_changed.connect(self._update_queue_states)
         self.current_metadata = None
         self.download_widgets = {}  # download_id -> widget
+        self._thumbnail_loader = None  # loader of the current video's thumbnail
+        self._thumbnail_loaders = set()  # loaders still running
         
         # Load download path from config or default
         default_path = os.path.join(os.getcwd(), "downloads")
@@ -41,11 +55,16 @@ class MainWindow(QMainWindow):
         if not os.path.exists(self.download_path):
             os.makedirs(self.download_path, exist_ok=True)
         
+        self._apply_bandwidth_limits()
+        self._apply_segment_cache()
+        get_engine_selector().configure(str(self.config.get_engine_choices_path()))
+        
         self.setWindowTitle("Chzzk Downloader")
         self.setMinimumSize(900, 700)
         
         self._init_ui()
         self._create_menu_bar()
+        self._restore_downloads()
     
     def _init_ui(self):
         """Initialize the user interface"""
@@ -150,6 +169,15 @@ class MainWindow(QMainWindow):
         self.quality_combo.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
         quality_layout.addWidget(self.quality_combo)
         
+        # Per-job override of the measured engine choice
+        quality_layout.addWidget(QLabel("방식:"))
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("자동", None)
+        self.engine_combo.addItem("세그먼트", MANUAL)
+        self.engine_combo.addItem("yt-dlp", YTDLP)
+        self.engine_combo.setToolTip("자동: 처음 받는 종류의 영상은 두 방식을 잠깐 측정해 더 빠른 쪽을 기억합니다")
+        quality_layout.addWidget(self.engine_combo)
+        
         self.download_button = QPushButton("다운로드")
         self.download_button.clicked.connect(self._start_download)
         quality_layout.addWidget(self.download_button)
@@ -308,15 +336,8 @@ class MainWindow(QMainWindow):
             self.download_btn.setEnabled(True)
             self.download_btn.setText("수동 다운로드 시작")
         
-        # Load thumbnail async (assuming _load_thumbnail exists or will be added)
-        # For now, just set a placeholder or handle it if it's not critical
-        # self._load_thumbnail(metadata['thumbnail']) 
-        # Placeholder for thumbnail loading
-        pixmap = QPixmap()
-        if pixmap.loadFromData(self.api.get_thumbnail_data(metadata.get('thumbnail', ''))):
-            self.thumbnail_label.setPixmap(pixmap.scaled(self.thumbnail_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
-        else:
-            self.thumbnail_label.setText("No Thumbnail")
+        # Load thumbnail in the background; a slow CDN must not freeze the window
+        self._load_thumbnail(metadata.get('thumbnail', ''))
         
         # Update quality combo
         self.quality_combo.clear()
@@ -326,6 +347,32 @@ class MainWindow(QMainWindow):
                 res # Store the full resolution dict as data
             )
     
+    def _load_thumbnail(self, url: str):
+        """Show "No Thumbnail" until the thumbnail at `url` has loaded"""
+        self.thumbnail_label.clear()
+        self.thumbnail_label.setText("No Thumbnail")
+        self._thumbnail_loader = None
+        if not url:
+            return
+        
+        loader = ThumbnailLoader(
+            url,
+            self.thumbnail_label.width(),
+            self.thumbnail_label.height(),
+            Qt.AspectRatioMode.KeepAspectRatio
+        )
+        self._thumbnail_loader = loader
+        # Keep running loaders alive until they finish, even if superseded
+        self._thumbnail_loaders.add(loader)
+        loader.finished.connect(partial(self._thumbnail_loaders.discard, loader))
+        loader.thumbnail_loaded.connect(partial(self._set_thumbnail, loader))
+        loader.start()
+    
+    def _set_thumbnail(self, loader: ThumbnailLoader, pixmap: QPixmap):
+        """Show a loaded thumbnail unless another video was loaded since"""
+        if loader is self._thumbnail_loader:
+            self.thumbnail_label.setPixmap(pixmap)
+    
     def _start_download(self):
         """Start the download process"""
         if not self.current_metadata:
@@ -347,13 +394,23 @@ class MainWindow(QMainWindow):
         use_manual_download = (
             self.current_metadata.get('vod_status') != 'ABR_HLS' and self.current_metadata.get('type') == 'vod'
         )
+        use_manual_download, engine_key = self._select_engine(url, use_manual_download)
         
         # Check split download
         selected_parts = self.part_selector.get_selected_ranges()
         
         if not selected_parts:
             # Download full video
-            self._initiate_download(video_id, url, title, quality_label, use_manual_download)
+            self._initiate_download(video_id, url, title, quality_label, use_manual_download, engine_key=engine_key)
+        elif use_manual_download and len(selected_parts) > 1:
+            # One shared pipeline for all parts, one list item per part
+            self._initiate_range_downloads(
+                video_id,
+                url,
+                [f"{title} (Part {i+1})" for i in range(len(selected_parts))],
+                quality_label,
+                [(part['start'], part['end']) for part in selected_parts]
+            )
         else:
             # Download selected parts
             for i, part in enumerate(selected_parts):
@@ -365,7 +422,9 @@ class MainWindow(QMainWindow):
                     quality_label, 
                     use_manual_download,
                     start_time=part['start'],
-                    end_time=part['end']
+                    end_time=part['end'],
+                    # One part measures; the others use the fallback engine
+                    engine_key=engine_key if i == 0 else None
                 )
         
         # Show confirmation
@@ -375,6 +434,31 @@ class MainWindow(QMainWindow):
             f"다운로드가 시작되었습니다!\n저장 위치: {self.download_path}"
         )
         
+    def _select_engine(self, url, use_manual_download):
+        """
+        Apply the engine override or the remembered engine choice
+        
+        Returns:
+            (use_manual_download, engine selector key if the job should
+            measure both engines, else None)
+        """
+        if self.current_metadata.get('type') != 'vod':
+            return use_manual_download, None
+        
+        override = self.engine_combo.currentData()
+        if override:
+            return override == MANUAL, None
+        
+        # Only finished VODs work with both engines; yt-dlp can't follow live rewinds
+        if self.current_metadata.get('vod_status') != 'ABR_HLS':
+            return use_manual_download, None
+        
+        key = EngineSelector.key(url, f"vod:{self.current_metadata.get('vod_status')}")
+        engine = get_engine_selector().lookup(key)
+        if engine:
+            return engine == MANUAL, None
+        return use_manual_download, key
+    
     def _initiate_download(
         self, 
         video_id, 
@@ -383,7 +467,8 @@ class MainWindow(QMainWindow):
         quality, 
         use_manual, 
         start_time=None, 
-        end_time=None
+        end_time=None,
+        engine_key=None
     ):
         """Helper to start a single download task"""
         # Create output directory if not exists
@@ -393,6 +478,13 @@ class MainWindow(QMainWindow):
         # Get cookies
         cookies = self.config.get_cookies()
         
+        # Whole clips are single files; fetch them over parallel ranges
+        direct_download = (
+            self.current_metadata.get('type') == 'clip'
+            and start_time is None and end_time is None
+            and not urlsplit(url).path.endswith('.m3u8')
+        )
+        
         # Start download
         download_id = self.download_manager.start_download(
             video_id=video_id,
@@ -403,14 +495,86 @@ class MainWindow(QMainWindow):
             cookies=cookies,
             use_manual_download=use_manual,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            concurrency=self.config.get("segment_concurrency", SegmentDownloader.DEFAULT_CONCURRENCY),
+            retries=self.config.get("segment_retries", 5),
+            adaptive_concurrency=self.config.get("adaptive_concurrency", True),
+            hedged_requests=self.config.get("hedged_requests", True),
+            # Manual downloads are for VODs still being processed, whose
+            # playlists keep growing
+            follow_live=use_manual and self.config.get("follow_live_playlists", True),
+            direct_download=direct_download,
+            engine_key=engine_key,
+            thumbnail=self.current_metadata.get('thumbnail', '')
+        )
+        
+        if download_id in self.download_widgets:
+            # Same video, quality and range as a download in the list
+            self._show_existing_download(download_id)
+        elif self._add_download_item(download_id, title, self.current_metadata.get('thumbnail', '')):
+            # Starts right away unless concurrent_downloads are already running
+            self.download_manager.enqueue_download(download_id)
+    
+    def _initiate_range_downloads(self, video_id, url, titles, quality, ranges):
+        """Start several parts of one video as a single manual download"""
+        output_dir = Path(self.download_path)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        download_ids = self.download_manager.start_range_downloads(
+            video_id=video_id,
+            url=url,
+            titles=titles,
+            quality=quality,
+            output_dir=output_dir,
+            ranges=ranges,
+            cookies=self.config.get_cookies(),
+            concurrency=self.config.get("segment_concurrency", SegmentDownloader.DEFAULT_CONCURRENCY),
+            retries=self.config.get("segment_retries", 5),
+            adaptive_concurrency=self.config.get("adaptive_concurrency", True),
+            hedged_requests=self.config.get("hedged_requests", True),
+            thumbnail=self.current_metadata.get('thumbnail', '')
         )
         
+        # Connect every item before the shared worker starts
+        workers = {}
+        for download_id, title in zip(download_ids, titles):
+            if download_id in self.download_widgets:
+                self._show_existing_download(download_id)
+            else:
+                workers[download_id] = self._add_download_item(
+                    download_id, title, self.current_metadata.get('thumbnail', '')
+                )
+        for download_id, worker in workers.items():
+            if worker:
+                self.download_manager.enqueue_download(download_id)
+    
+    def _restore_downloads(self):
+        """Rebuild the download list from the stored queue and resume it"""
+        try:
+            jobs = self.download_manager.restore_jobs(self.config.get_cookies())
+        except Exception as e:
+            print(f"Error restoring downloads: {e}")
+            return
+        
+        for job in jobs:
+            params = job['params']
+            self._add_download_item(job['id'], params['title'], params.get('thumbnail', ''))
+            _, widget = self.download_widgets[job['id']]
+            widget.update_progress(job['progress'], 0, 0)
+            if job['state'] == FAILED:
+                widget.set_error(job['error'] or "중단됨")
+        
+        # Queued and running jobs continue in their old order
+        self.download_manager.resume_restored(jobs)
+        self._update_queue_states()
+    
+    def _add_download_item(self, download_id, title, thumbnail_url=""):
+        """Create the list item of a download and connect it to its worker"""
         # Create UI item
         widget = DownloadItemWidget(
             download_id=download_id,
             title=title,
-            thumbnail_url=self.current_metadata.get('thumbnail', '') # Use current metadata thumbnail
+            thumbnail_url=thumbnail_url
         )
         
         # Connect signals
@@ -420,11 +584,12 @@ class MainWindow(QMainWindow):
             worker.status_changed.connect(widget.update_status)
             worker.download_completed.connect(widget.set_completed)
             worker.download_error.connect(widget.set_error)
-            
-            # Start download
-            worker.start()
         
         widget.cancel_requested.connect(self._cancel_download)
+        widget.resume_requested.connect(self._resume_download)
+        widget.pause_requested.connect(self.download_manager.pause_download)
+        widget.promote_requested.connect(self.download_manager.promote_download)
+        widget.move_requested.connect(self.download_manager.move_download)
         widget.open_file_requested.connect(self._open_file)
         
         # Add to list
@@ -434,6 +599,7 @@ class MainWindow(QMainWindow):
         self.download_list.setItemWidget(item, widget)
         
         self.download_widgets[download_id] = (item, widget)
+        return worker
         
     def _cancel_download(self, download_id: str):
         """Cancel a download"""
@@ -446,6 +612,28 @@ class MainWindow(QMainWindow):
             self.download_list.takeItem(row)
             del self.download_widgets[download_id]
     
+    def _resume_download(self, download_id: str):
+        """Resume a paused or failed download from where it stopped"""
+        if self.download_manager.resume_download(download_id):
+            if download_id in self.download_widgets:
+                _, widget = self.download_widgets[download_id]
+                widget.set_resuming()
+    
+    def _show_existing_download(self, download_id: str):
+        """Point at the download a repeated request attached to; retry it if it failed"""
+        item, _ = self.download_widgets[download_id]
+        self.download_list.setCurrentItem(item)
+        self.download_list.scrollToItem(item)
+        if self.download_manager.get_state(download_id) == FINISHED:
+            self._resume_download(download_id)
+    
+    def _update_queue_states(self):
+        """Show every download's scheduling state and queue position"""
+        for download_id, (_, widget) in self.download_widgets.items():
+            state = self.download_manager.get_state(download_id)
+            if state:
+                widget.set_queue_state(state, self.download_manager.get_queue_position(download_id))
+    
     def _open_file(self, file_path: str):
         """Open downloaded file"""
         try:
@@ -461,7 +649,25 @@ class MainWindow(QMainWindow):
     def _open_settings(self):
         """Open settings dialog"""
         dialog = SettingsDialog(self.config, self)
-        dialog.exec()
+        if dialog.exec():
+            # Rate limits apply to running downloads without restarting them
+            self._apply_bandwidth_limits()
+            self._apply_segment_cache()
+            self.download_manager.set_max_active(self.config.get("concurrent_downloads", 3))
+    
+    def _apply_bandwidth_limits(self):
+        """Push the configured bandwidth caps to the shared limiter"""
+        get_bandwidth_limiter().configure(
+            self.config.get("bandwidth_limit", 0),
+            self.config.get("bandwidth_limit_per_job", 0)
+        )
+    
+    def _apply_segment_cache(self):
+        """Point the shared segment cache at the configured directory and size"""
+        get_segment_cache().configure(
+            str(self.config.get_segment_cache_dir()),
+            self.config.get("segment_cache_size", 0)
+        )
     
     def _show_about(self):
         """Show about dialog"""
@@ -4,7 +4,7 @@ Settings Dialog
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
     QLineEdit, QPushButton, QFileDialog, QTabWidget,
-    QWidget, QGroupBox
+    QWidget, QGroupBox, QDoubleSpinBox, QFormLayout, QSpinBox
 )
 from PyQt6.QtCore import Qt
 from pathlib import Path
@@ -80,10 +80,58 @@ class SettingsDialog(QDialog):
         path_group.setLayout(path_layout)
         layout.addWidget(path_group)
         
+        # Downloads run at once; the rest wait in the queue
+        queue_group = QGroupBox("다운로드 대기열")
+        queue_layout = QFormLayout()
+        
+        self.concurrent_input = QSpinBox()
+        self.concurrent_input.setRange(1, 20)
+        queue_layout.addRow("동시 다운로드:", self.concurrent_input)
+        
+        queue_group.setLayout(queue_layout)
+        layout.addWidget(queue_group)
+        
+        # Bandwidth limits (applied to running downloads as well)
+        bandwidth_group = QGroupBox("속도 제한 (MB/s, 0 = 무제한)")
+        bandwidth_layout = QFormLayout()
+        
+        self.total_limit_input = self._create_rate_input()
+        bandwidth_layout.addRow("전체:", self.total_limit_input)
+        
+        self.job_limit_input = self._create_rate_input()
+        bandwidth_layout.addRow("다운로드당:", self.job_limit_input)
+        
+        bandwidth_group.setLayout(bandwidth_layout)
+        layout.addWidget(bandwidth_group)
+        
+        # Segment cache (reused by later downloads of the same VOD)
+        cache_group = QGroupBox("세그먼트 캐시 (0 = 사용 안 함)")
+        cache_layout = QFormLayout()
+        
+        self.cache_size_input = QDoubleSpinBox()
+        self.cache_size_input.setRange(0, 1000)
+        self.cache_size_input.setDecimals(1)
+        self.cache_size_input.setSingleStep(0.5)
+        self.cache_size_input.setSuffix(" GB")
+        cache_layout.addRow("최대 크기:", self.cache_size_input)
+        
+        cache_group.setLayout(cache_layout)
+        layout.addWidget(cache_group)
+        
         layout.addStretch()
         widget.setLayout(layout)
         return widget
     
+    @staticmethod
+    def _create_rate_input() -> QDoubleSpinBox:
+        """Create a spin box for a rate in MB/s"""
+        spin_box = QDoubleSpinBox()
+        spin_box.setRange(0, 10000)
+        spin_box.setDecimals(1)
+        spin_box.setSingleStep(0.5)
+        spin_box.setSuffix(" MB/s")
+        return spin_box
+    
     def _create_auth_tab(self) -> QWidget:
         """Create authentication settings tab"""
         widget = QWidget()
@@ -140,6 +188,11 @@ class SettingsDialog(QDialog):
         """Load current settings into UI"""
         self.path_input.setText(self.config.get("download_path", ""))
         
+        self.concurrent_input.setValue(self.config.get("concurrent_downloads", 3))
+        self.total_limit_input.setValue(self.config.get("bandwidth_limit", 0) / (1024 * 1024))
+        self.job_limit_input.setValue(self.config.get("bandwidth_limit_per_job", 0) / (1024 * 1024))
+        self.cache_size_input.setValue(self.config.get("segment_cache_size", 0) / (1024 ** 3))
+        
         cookies = self.config.get("cookies", {})
         self.nid_aut_input.setText(cookies.get("NID_AUT", ""))
         self.nid_ses_input.setText(cookies.get("NID_SES", ""))
@@ -148,6 +201,10 @@ class SettingsDialog(QDialog):
         """Save settings and close dialog"""
         # Update config
         self.config.set("download_path", self.path_input.text())
+        self.config.set("concurrent_downloads", self.concurrent_input.value())
+        self.config.set("bandwidth_limit", int(self.total_limit_input.value() * 1024 * 1024))
+        self.config.set("bandwidth_limit_per_job", int(self.job_limit_input.value() * 1024 * 1024))
+        self.config.set("segment_cache_size", int(self.cache_size_input.value() * 1024 ** 3))
         self.config.set("cookies", {
             "NID_AUT": self.nid_aut_input.text().strip(),
             "NID_SES": self.nid_ses_input.text().strip()